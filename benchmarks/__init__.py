@@ -0,0 +1,9 @@
+"""
+Benchmark suite for the two scheduling engines.
+
+  python -m benchmarks.run --scenario all --engine both --time-limit 120
+  python -m benchmarks.report
+
+Rosters are synthetic (benchmarks/roster.py) and generated from fixed seeds, so every
+run of a scenario solves the same model. Results are appended to benchmarks/history.json.
+"""
@@ -0,0 +1,105 @@
+"""
+Compare plain CP-SAT with the LNS driver (webapp/backend/lns.py) at the same time limit.
+
+  python -m benchmarks.lns_compare --scenario base-50 --seeds 1 2 3 --time-limit 120
+  python -m benchmarks.lns_compare --scenario all --seeds 1 2 3 --time-limit 120
+  python -m benchmarks.lns_compare --year 2026-2027 --seeds 1 2 3     # a year in the web app's DB
+
+Each seed generates the roster (for a scenario) and seeds both solvers; stopping rules are off
+so both use the whole budget. Per seed the objective curves are printed at each engine's first
+schedule and ten evenly spaced points; per scenario, the median final objective of each
+engine and the median and range of the per-seed LNS-vs-plain change.
+"""
+import argparse
+import sys
+from pathlib import Path
+from statistics import median
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "webapp" / "backend"
+
+
+def summarize(results: List[dict]) -> dict:
+    """
+    Final objectives of several compare_with_plain runs (one per seed): median of each engine
+    and the median, lowest and highest per-seed LNS-vs-plain change (negative = LNS better).
+    Runs where either engine found no schedule are left out.
+    """
+    pairs = [(r["plain"]["objective"], r["lns"]["objective"]) for r in results
+             if r["plain"]["objective"] and r["lns"]["objective"]]
+    if not pairs:
+        return {"runs": 0}
+    change = [lns / plain - 1 for plain, lns in pairs]
+    return {"runs": len(pairs), "plain": median(p for p, _ in pairs), "lns": median(l for _, l in pairs),
+            "change": median(change), "change_min": min(change), "change_max": max(change)}
+
+
+def _print_curves(seed: int, result: dict, time_limit: int) -> None:
+    from telemetry import objective_at
+
+    firsts = {r["curve"][0][0] for r in result.values() if r["curve"]}
+    checkpoints = sorted(firsts | {time_limit * i / 10 for i in range(1, 11)})
+    print(f"\nseed {seed}\n{'seconds':>8}  {'plain':>14}  {'lns':>14}")
+    for t in checkpoints:
+        p = objective_at(result["plain"]["curve"], t)
+        l = objective_at(result["lns"]["curve"], t)
+        print(f"{t:>8.1f}  {p if p is not None else '-':>14}  {l if l is not None else '-':>14}")
+    print(f"Neighborhoods: {result['lns']['neighborhoods']}")
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT))
+    sys.path.insert(0, str(BACKEND))
+    from benchmarks.roster import generate_roster
+    from benchmarks.scenarios import SCENARIOS
+    from lns import compare_with_plain
+
+    parser = argparse.ArgumentParser(description="Compare plain CP-SAT with the LNS driver")
+    parser.add_argument("--scenario", nargs="+", help=f"Scenario names or 'all': {', '.join(SCENARIOS)}")
+    parser.add_argument("--year", help="Year name in the web app's database, e.g. 2026-2027")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--time-limit", type=int, default=120, help="Solver time limit per run (seconds)")
+    args = parser.parse_args(argv)
+    if bool(args.scenario) == bool(args.year):
+        parser.error("pass --scenario or --year")
+
+    if args.year:
+        from database import SessionLocal
+        from models import Year
+        from routers.schedule import _load_solver_inputs
+        with SessionLocal() as db:
+            year = db.query(Year).filter(Year.name == args.year).first()
+            if not year:
+                parser.error(f"year {args.year} not found")
+            inputs = _load_solver_inputs(db, year.id)
+        cases = {args.year: lambda seed: inputs}
+    else:
+        scenarios = list(SCENARIOS) if "all" in args.scenario else args.scenario
+        unknown = [s for s in scenarios if s not in SCENARIOS]
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+        cases = {s: (lambda seed, spec=SCENARIOS[s]: generate_roster(spec, seed)) for s in scenarios}
+
+    summaries = {}
+    for name, load in cases.items():
+        print(f"=== {name}")
+        results = []
+        for seed in args.seeds:
+            result = compare_with_plain(time_limit=args.time_limit, random_seed=seed, **load(seed))
+            results.append(result)
+            _print_curves(seed, result, args.time_limit)
+        summaries[name] = summarize(results)
+
+    print(f"\n{len(args.seeds)} seeds at {args.time_limit}s (final objective, lower is better)")
+    print(f"{'':<14}{'runs':>5}  {'plain median':>13}  {'lns median':>11}  {'lns vs plain median':>20}  {'range':>15}")
+    for name, s in summaries.items():
+        if not s["runs"]:
+            print(f"{name:<14}{0:>5}  (no run where both engines found a schedule)")
+            continue
+        print(f"{name:<14}{s['runs']:>5}  {s['plain']:>13.3g}  {s['lns']:>11.3g}  {s['change']:>+20.0%}  "
+              f"{s['change_min']:>+7.0%} to {s['change_max']:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare two benchmark batches from the JSON history.
+
+  python -m benchmarks.report                      # latest batch vs the one before it
+  python -m benchmarks.report --baseline abc1234   # latest vs a commit, label or batch timestamp
+
+Metrics are averaged over seeds; runs without a solution are left out of the averages.
+"""
+import argparse
+import sys
+from pathlib import Path
+from statistics import mean
+
+ROOT = Path(__file__).resolve().parent.parent
+
+METRICS = [
+    ("build_seconds", "build s"),
+    ("first_solution_seconds", "first sol s"),
+    ("objective", "objective"),
+    ("gap", "gap"),
+    ("peak_rss_mb", "RSS MB"),
+    ("first_page_seconds", "first page s"),  # startup runs (benchmarks/startup.py)
+]
+
+
+def _select(history: list, key: str) -> list:
+    """Records of the batch matching key (batch timestamp, commit or label); latest match wins."""
+    batches = [r["batch"] for r in history if key in (r["batch"], r.get("commit"), r.get("label"))]
+    if not batches:
+        return []
+    batch = max(batches)
+    return [r for r in history if r["batch"] == batch]
+
+
+def _summarize(records: list) -> dict:
+    out = {}
+    for r in records:
+        out.setdefault((r["scenario"], r["engine"]), []).append(r)
+    summary = {}
+    for key, runs in out.items():
+        # startup runs have no objective; they count as solved when the page came up
+        row = {"runs": len(runs), "solved": sum(1 for r in runs if r.get("objective") is not None
+                                                or r.get("first_page_seconds") is not None)}
+        for metric, _ in METRICS:
+            values = [r[metric] for r in runs if r.get(metric) is not None]
+            row[metric] = mean(values) if values else None
+        summary[key] = row
+    return summary
+
+
+def _fmt(value) -> str:
+    if value is None:
+        return "-"
+    if abs(value) >= 1e5:
+        return f"{value:.3e}"
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+
+def _delta(new, old) -> str:
+    if new is None or old is None or old == 0:
+        return ""
+    return f"{(new - old) / abs(old) * 100:+.0f}%"
+
+
+def compare(history: list, current: str = None, baseline: str = None) -> str:
+    batches = sorted({r["batch"] for r in history})
+    if not batches:
+        return "No benchmark history yet. Run: python -m benchmarks.run"
+    cur = _select(history, current) if current else [r for r in history if r["batch"] == batches[-1]]
+    if baseline:
+        base = _select(history, baseline)
+    else:
+        older = [b for b in batches if b < cur[0]["batch"]] if cur else []
+        base = [r for r in history if older and r["batch"] == older[-1]]
+    cur_s, base_s = _summarize(cur), _summarize(base)
+
+    lines = []
+    head = cur[0] if cur else {}
+    lines.append(f"Current:  {head.get('batch')} {head.get('commit', '')} {head.get('label', '')}".rstrip())
+    if base:
+        lines.append(f"Baseline: {base[0]['batch']} {base[0].get('commit', '')} {base[0].get('label', '')}".rstrip())
+    header = f"{'scenario':<14} {'engine':<9} {'solved':>6}"
+    for _, label in METRICS:
+        header += f" {label:>12} {'Δ':>6}"
+    lines += ["", header, "-" * len(header)]
+    for key in sorted(cur_s):
+        row, old = cur_s[key], base_s.get(key, {})
+        line = f"{key[0]:<14} {key[1]:<9} {row['solved']:>3}/{row['runs']:<2}"
+        for metric, _ in METRICS:
+            line += f" {_fmt(row[metric]):>12} {_delta(row[metric], old.get(metric)):>6}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.run import HISTORY, load_history
+
+    parser = argparse.ArgumentParser(description="Compare benchmark batches")
+    parser.add_argument("--current", help="Batch timestamp, commit or label (default: latest batch)")
+    parser.add_argument("--baseline", help="Batch timestamp, commit or label (default: batch before current)")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    args = parser.parse_args(argv)
+    print(compare(load_history(args.history), args.current, args.baseline))
+
+
+if __name__ == "__main__":
+    main()
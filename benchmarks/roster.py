@@ -0,0 +1,173 @@
+"""
+Parameterized synthetic roster generator.
+
+generate_roster() returns the keyword arguments of the webapp engine's solve();
+to_context() converts the same roster into a ScheduleContext for scheduler.solver.solve().
+"""
+import random
+from dataclasses import dataclass
+from typing import Dict, List
+
+from scheduler.models import (
+    CohortDef, Requirement, Resident, ScheduleContext, VacationRequest,
+)
+from scheduler.workbook_sheets import default_coverage_rules
+
+HOLIDAY_WEEKS = (26, 27)
+MAX_COHORT_SIZE = 12
+
+# Same targets as webapp/backend/seed.py
+REQUIREMENTS = {
+    "PGY1": [("FLOORS", 20), ("ICU", 8), ("CLINIC", 10), ("VACATION", 4), ("ELECTIVE", 10),
+             ("CARDIO", 0), ("ID", 0), ("ED", 0), ("NEURO", 0), ("GERIATRICS", 0)],
+    "PGY2": [("FLOORS", 16), ("ICU", 8), ("CLINIC", 10), ("VACATION", 4), ("ELECTIVE", 14),
+             ("CARDIO", 0), ("ID", 0), ("ED", 0), ("NEURO", 0), ("GERIATRICS", 0)],
+    "PGY3": [("FLOORS", 8), ("ICU", 4), ("CLINIC", 14), ("VACATION", 4), ("ELECTIVE", 6),
+             ("CARDIO", 4), ("ID", 4), ("ED", 4), ("NEURO", 2), ("GERIATRICS", 2)],
+    "TY": [("FLOORS", 24), ("ICU", 4), ("ED", 4), ("GEN SURG", 4), ("CLINIC", 4),
+           ("VACATION", 4), ("ELECTIVE", 8)],
+}
+
+
+@dataclass
+class RosterSpec:
+    """Shape of a synthetic roster."""
+    pgy1: int = 14
+    pgy2: int = 14
+    pgy3: int = 14
+    ty_anesthesia: int = 4
+    ty_neurology: int = 2
+    ty_prelim: int = 2
+    n_cohorts: int = 5
+    vacation_density: float = 0.0   # share of residents with Block A/B vacation options
+    hard_lock_density: float = 0.0  # share of residents with one hard-locked 2-week vacation
+    completion_history: bool = False  # PGY2/PGY3 carry completions from prior years
+
+    @property
+    def size(self) -> int:
+        return self.pgy1 + self.pgy2 + self.pgy3 + self.ty_anesthesia + self.ty_neurology + self.ty_prelim
+
+
+def cohort_clinic_weeks(n_cohorts: int) -> Dict[int, List[int]]:
+    """Round-robin clinic weeks over the non-holiday weeks (the 4+1 rhythm for 5 cohorts)."""
+    weeks = [w for w in range(1, 53) if w not in HOLIDAY_WEEKS]
+    out = {c: [] for c in range(1, n_cohorts + 1)}
+    for i, w in enumerate(weeks):
+        out[i % n_cohorts + 1].append(w)
+    return out
+
+
+def _prior_completions(pgy: str, rng: random.Random) -> Dict[str, int]:
+    years = {"PGY2": 1, "PGY3": 2}.get(pgy, 0)
+    comp = {}
+    for _ in range(years):
+        for cat, lo, hi in (("FLOORS", 14, 20), ("ICU", 6, 8), ("CLINIC", 8, 12), ("NF", 2, 5),
+                            ("ICU_NIGHT", 1, 4), ("CARDIO", 0, 2), ("ID", 0, 2), ("ED", 0, 2),
+                            ("NEURO", 0, 1), ("GERIATRICS", 0, 1)):
+            comp[cat] = comp.get(cat, 0) + rng.randint(lo, hi)
+    return comp
+
+
+def generate_roster(spec: RosterSpec, seed: int = 0) -> dict:
+    """
+    Build residents, requirements, completions, vacation requests and cohorts for spec.
+    The same (spec, seed) always yields the same roster.
+    """
+    rng = random.Random(seed)
+    residents = []
+    groups = [("PGY1", None, spec.pgy1), ("PGY2", None, spec.pgy2), ("PGY3", None, spec.pgy3),
+              ("TY", "anesthesia", spec.ty_anesthesia), ("TY", "neurology", spec.ty_neurology),
+              ("TY", None, spec.ty_prelim)]
+    n_non_ty = 0
+    for pgy, track, count in groups:
+        for i in range(count):
+            is_ty = pgy == "TY"
+            cohort = None if is_ty else n_non_ty % spec.n_cohorts + 1
+            n_non_ty += 0 if is_ty else 1
+            residents.append({
+                "id": len(residents) + 1,
+                "name": f"{pgy}{'-' + track if track else ''}_{i + 1}",
+                "pgy": pgy,
+                "track": track,
+                "cohort_id": cohort,
+                "is_ty": is_ty,
+                "is_intern": pgy in ("PGY1", "TY"),
+                "is_senior": pgy in ("PGY2", "PGY3"),
+                "constraints_json": {},
+            })
+    if n_non_ty > spec.n_cohorts * MAX_COHORT_SIZE:
+        raise ValueError(f"{n_non_ty} non-TY residents do not fit {spec.n_cohorts} cohorts of {MAX_COHORT_SIZE}")
+
+    clinic = cohort_clinic_weeks(spec.n_cohorts)
+    cohort_defs = [{"cohort_id": c, "name": f"Cohort {c}", "clinic_weeks": weeks} for c, weeks in clinic.items()]
+
+    requirements_by_pgy = {
+        f"{pgy}:": [{"category": cat, "required_weeks": n, "counts_as": []} for cat, n in items]
+        for pgy, items in REQUIREMENTS.items()
+    }
+
+    completions_by_resident = {}
+    if spec.completion_history:
+        for r in residents:
+            if r["is_senior"]:
+                completions_by_resident[r["id"]] = _prior_completions(r["pgy"], rng)
+
+    vacation_requests = []
+    for r in residents:
+        busy = set(clinic.get(r["cohort_id"], []))
+        free_starts = [s for s in range(2, 51) if s not in (25, 26, 27) and not {s, s + 1} & busy]
+        vreq = {"resident_id": r["id"], "block_a_options": [], "block_b_options": [], "hard_locks": []}
+        if rng.random() < spec.vacation_density:
+            vreq["block_a_options"] = rng.sample([s for s in free_starts if s < 25], 2)
+            vreq["block_b_options"] = rng.sample([s for s in free_starts if s > 27], 2)
+        if rng.random() < spec.hard_lock_density:
+            # A lock outside the resident's block options would make 6 vacation weeks
+            vreq["hard_locks"] = [(rng.choice(vreq["block_a_options"] + vreq["block_b_options"] or free_starts), 2)]
+        if vreq["block_a_options"] or vreq["hard_locks"]:
+            vacation_requests.append(vreq)
+
+    return {
+        "residents": residents,
+        "requirements_by_pgy": requirements_by_pgy,
+        "completions_by_resident": completions_by_resident,
+        "vacation_requests": vacation_requests,
+        "cohort_defs": cohort_defs,
+    }
+
+
+def to_context(roster: dict, seed: int = 0) -> ScheduleContext:
+    """Convert a generate_roster() result into the workbook engine's ScheduleContext."""
+    residents = [
+        Resident(
+            name=r["name"],
+            pgy=1 if r["is_ty"] else int(r["pgy"][-1]),
+            is_ty=r["is_ty"],
+            cohort_id=f"Cohort {r['cohort_id']}" if r["cohort_id"] else None,
+            track=r["track"],
+        )
+        for r in roster["residents"]
+    ]
+    names = {r["id"]: r["name"] for r in roster["residents"]}
+    requirements = [
+        Requirement(pgy=key.rstrip(":"), category=q["category"], required_weeks=q["required_weeks"])
+        for key, items in roster["requirements_by_pgy"].items() for q in items
+    ]
+    pgy_by_id = {r["id"]: r["pgy"] for r in roster["residents"]}
+    vacations = []
+    for v in roster["vacation_requests"]:
+        name, pgy = names[v["resident_id"]], pgy_by_id[v["resident_id"]]
+        for start, length in v.get("hard_locks", []):
+            vacations.append(VacationRequest(name, pgy, "VAC_BLOCK_1", start, length, priority=1, hard_lock=True))
+        for kind, key in (("VAC_BLOCK_1", "block_a_options"), ("VAC_BLOCK_2", "block_b_options")):
+            for i, start in enumerate(v.get(key, [])):
+                vacations.append(VacationRequest(name, pgy, kind, start, 2, priority=2 + i))
+    cohort_defs = [CohortDef(cohort_id=f"Cohort {c['cohort_id']}", clinic_weeks=list(c["clinic_weeks"]))
+                   for c in roster["cohort_defs"]]
+    return ScheduleContext(
+        residents=residents,
+        requirements=requirements,
+        vacation_requests=vacations,
+        coverage_rules=default_coverage_rules(),
+        cohort_defs=cohort_defs,
+        random_seed=seed,
+    )
@@ -0,0 +1,201 @@
+"""
+Run benchmark scenarios against the webapp engine (grid or interval formulation) and/or the
+workbook engine.
+
+  python -m benchmarks.run --scenario base-50 --engine webapp --time-limit 120 --seeds 1 2
+  python -m benchmarks.run --scenario base-50 --engine webapp --block-weeks 2 --label blocks
+  python -m benchmarks.run --scenario base-50 large-66 --engine webapp interval
+  python -m benchmarks.run --scenario base-50 --engine webapp --deterministic --time-limit 40
+  python -m benchmarks.run --scenario base-50 --engine webapp --stagnation-seconds 0   # no early stop
+
+Each (scenario, engine, seed) runs in its own process so peak RSS is per run.
+Records are appended to the JSON history (default benchmarks/history.json). Runs use the
+engines' default stopping rules (scheduler/stopping.py) unless overridden; stop_reason in
+each record says whether the time limit or a rule ended the search.
+"""
+import argparse
+import io
+import json
+import multiprocessing as mp
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "webapp" / "backend"
+HISTORY = Path(__file__).resolve().parent / "history.json"
+ENGINES = ("webapp", "interval", "workbook")  # interval: the webapp engine's interval formulation
+# scheduler.stopping.StopRules fields and their command-line types
+STOP_RULES = (("relative_gap", float), ("absolute_gap", float), ("stagnation_seconds", float),
+              ("max_clean_solutions", int))
+
+
+def _peak_rss_mb() -> float:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_one(scenario: str, engine: str, seed: int, time_limit: int, block_weeks: int, params, deterministic: bool,
+             stop, queue) -> None:
+    """Child process: generate the roster, solve it, put one record on queue."""
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.roster import generate_roster, to_context
+    from benchmarks.scenarios import SCENARIOS
+    from scheduler.stopping import stop_rules
+
+    roster = generate_roster(SCENARIOS[scenario], seed)
+    rules = stop_rules(**(stop or {}))
+    stats = {}
+    t0 = time.time()
+    with redirect_stdout(io.StringIO()):
+        if engine == "webapp":
+            sys.path.insert(0, str(BACKEND))
+            from engine import solve
+            solve(**roster, time_limit=time_limit, random_seed=seed, stats=stats, block_weeks=block_weeks,
+                  solver_params=params, deterministic=deterministic, stop_rules=rules)
+        elif engine == "interval":
+            sys.path.insert(0, str(BACKEND))
+            from interval_engine import solve
+            solve(**roster, time_limit=time_limit, random_seed=seed, stats=stats, solver_params=params,
+                  deterministic=deterministic, stop_rules=rules)
+        else:
+            from scheduler.solver import solve
+            solve(to_context(roster, seed), time_limit_seconds=time_limit, stats=stats, solver_params=params,
+                  deterministic=deterministic, stop_rules=rules)
+    obj, bound = stats.get("objective"), stats.get("best_bound")
+    queue.put({
+        "status": stats.get("status"),
+        "stop_reason": stats.get("stop_reason"),
+        "build_seconds": stats.get("build_seconds"),
+        "presolve_seconds": stats.get("presolve_seconds"),
+        "first_solution_seconds": stats.get("first_solution_seconds"),
+        "solve_seconds": stats.get("solve_seconds"),
+        "wall_seconds": round(time.time() - t0, 3),
+        "objective": obj,
+        "best_bound": bound,
+        "gap": round(abs(obj - bound) / max(1.0, abs(obj)), 6) if obj is not None and bound is not None else None,
+        "solutions": len(stats.get("curve", [])),
+        "num_branches": stats.get("num_branches"),
+        "num_conflicts": stats.get("num_conflicts"),
+        "peak_rss_mb": _peak_rss_mb(),
+        "residents": len(roster["residents"]),
+        "solver_params": stats.get("solver_params"),
+        "model_hash": stats.get("model_hash"),
+        "reproducible": stats.get("reproducible"),
+    })
+
+
+def run_benchmark(scenario: str, engine: str, seed: int, time_limit: int, block_weeks: int = 1,
+                  params: Optional[dict] = None, deterministic: bool = False, stop: Optional[dict] = None) -> dict:
+    """
+    One run in a fresh process; params are CP-SAT parameters set over the engine's tuned profile.
+    deterministic: reproducible solve, time_limit is then a deterministic time budget.
+    stop: stopping rules over the defaults, {rule: value} (scheduler/stopping.py; 0 turns one off).
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_one,
+                       args=(scenario, engine, seed, time_limit, block_weeks, params, deterministic, stop, queue))
+    proc.start()
+    try:
+        # Generous margin over the solver limit for model build and process start-up
+        result = queue.get(timeout=time_limit * 3 + 300)
+    except Exception as exc:
+        proc.kill()
+        result = {"status": "ERROR", "error": str(exc) or type(exc).__name__}
+    proc.join()
+    if proc.exitcode not in (0, None) and "error" not in result:
+        result = {"status": "ERROR", "error": f"exit code {proc.exitcode}"}
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def load_history(path: Path = HISTORY) -> list:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def append_history(records: list, path: Path = HISTORY) -> None:
+    history = load_history(path)
+    history.extend(records)
+    path.write_text(json.dumps(history, indent=1))
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description="Run scheduling engine benchmarks")
+    parser.add_argument("--scenario", nargs="+", default=["all"], help=f"Scenario names or 'all': {', '.join(SCENARIOS)}")
+    parser.add_argument("--engine", nargs="+", choices=ENGINES + ("both", "all"), default=["both"],
+                        help="both = webapp and workbook; all = every engine")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1])
+    parser.add_argument("--time-limit", type=int, default=None,
+                        help="Solver time limit per run (seconds, default 120; required with --deterministic)")
+    parser.add_argument("--block-weeks", type=int, choices=(1, 2), default=1,
+                        help="Webapp engine granularity: 1 = weekly, 2 = two-week blocks")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="Reproducible solves; --time-limit becomes a deterministic time budget "
+                             "(CP-SAT units, about 6 s each on one CPU)")
+    for rule, kind in STOP_RULES:
+        parser.add_argument(f"--{rule.replace('_', '-')}", type=kind, default=None,
+                            help="Stopping rule over the engine default (0 = off)")
+    parser.add_argument("--label", default="", help="Free-form label stored with the batch, e.g. 'before lns'")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    args = parser.parse_args(argv)
+
+    if args.time_limit is None:
+        if args.deterministic:
+            parser.error("--deterministic needs an explicit --time-limit budget (deterministic time units)")
+        args.time_limit = 120
+    scenarios = list(SCENARIOS) if "all" in args.scenario else args.scenario
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if "all" in args.engine:
+        engines = ENGINES
+    elif "both" in args.engine:
+        engines = ("webapp", "workbook")
+    else:
+        engines = tuple(args.engine)
+
+    stop = {rule: getattr(args, rule) for rule, _ in STOP_RULES if getattr(args, rule) is not None}
+    batch = datetime.now().isoformat(timespec="seconds")
+    commit = _git_commit()
+    records = []
+    for scenario in scenarios:
+        for engine in engines:
+            for seed in args.seeds:
+                print(f"{scenario:<14} {engine:<9} seed={seed} ...", end=" ", flush=True)
+                result = run_benchmark(scenario, engine, seed, args.time_limit, args.block_weeks,
+                                       deterministic=args.deterministic, stop=stop)
+                records.append({
+                    "batch": batch, "commit": commit, "label": args.label,
+                    "scenario": scenario, "engine": engine, "seed": seed,
+                    "time_limit": args.time_limit, "block_weeks": args.block_weeks,
+                    "deterministic": args.deterministic, "stop": stop, **result,
+                })
+                first = result.get("first_solution_seconds")
+                print(f"{result.get('status')} ({result.get('stop_reason')})  first={first if first is not None else '-'}s  "
+                      f"obj={result.get('objective')}  rss={result.get('peak_rss_mb')}MB")
+    append_history(records, args.history)
+    print(f"\n{len(records)} run(s) appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
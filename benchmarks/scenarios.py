@@ -0,0 +1,18 @@
+"""
+Fixed benchmark scenarios, smallest to largest.
+
+The webapp engine needs roughly 44+ residents (holiday weeks take 22 residents each and
+nobody works both), so "small" is the smallest roster it can solve.
+"""
+from benchmarks.roster import RosterSpec
+
+SCENARIOS = {
+    "small-44": RosterSpec(pgy1=12, pgy2=12, pgy3=12, ty_anesthesia=4, ty_neurology=2, ty_prelim=2),
+    "base-50": RosterSpec(),
+    "vacations-50": RosterSpec(vacation_density=0.6, hard_lock_density=0.1),
+    "history-56": RosterSpec(pgy1=15, pgy2=16, pgy3=17, completion_history=True),
+    "large-66": RosterSpec(pgy1=16, pgy2=18, pgy3=22, ty_anesthesia=5, ty_neurology=3, ty_prelim=2,
+                           n_cohorts=6, vacation_density=0.5, completion_history=True),
+    "xl-82": RosterSpec(pgy1=18, pgy2=20, pgy3=34, ty_anesthesia=5, ty_neurology=3, ty_prelim=2,
+                        n_cohorts=7, vacation_density=0.5, hard_lock_density=0.05, completion_history=True),
+}
@@ -0,0 +1,125 @@
+"""
+Measure backend cold start: per-module import profile and time to first page.
+
+  python -m benchmarks.startup                 # 3 runs, appended to the history
+  python -m benchmarks.startup --profile-only  # import profile only, nothing recorded
+
+Each run starts webapp/backend/run.py --no-browser on a free port in a fresh process and
+times it from spawn until GET / answers (first_page_seconds, interpreter start included).
+The app's own phase marks (GET /api/health, see backend startup.py) are stored alongside.
+Records go to the benchmark history with scenario "startup", so benchmarks.report compares
+them across commits like solver runs.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from statistics import mean
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "webapp" / "backend"
+START_TIMEOUT = 120
+
+
+def import_profile(top: int = 15) -> tuple:
+    """
+    Run `python -X importtime -c "import main"` and return (total seconds, rows) where rows
+    are (package, self seconds) summed per top-level package, largest first.
+    """
+    # The scheduler package at the repo root goes on PYTHONPATH, as under a plain uvicorn
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (str(ROOT), os.environ.get("PYTHONPATH"))))}
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, timeout=START_TIMEOUT)
+    by_package, total = {}, 0.0
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0.0) + int(self_us) / 1e6
+        if name.strip() == "main":
+            total = int(cumulative_us) / 1e6
+    rows = sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+    return total, rows
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 1.0) -> bytes:
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        return r.read()
+
+
+def time_to_first_page() -> dict:
+    """Start the app in a fresh process; seconds until / answers, plus its /api/health marks."""
+    import json
+    port = _free_port()
+    t0 = time.time()
+    proc = subprocess.Popen([sys.executable, "run.py", "--no-browser", "--port", str(port)], cwd=BACKEND,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                return {"status": "ERROR", "error": f"exit code {proc.returncode}"}
+            if time.time() - t0 > START_TIMEOUT:
+                return {"status": "ERROR", "error": "timeout"}
+            try:
+                _get(f"http://127.0.0.1:{port}/")
+                break
+            except OSError:
+                time.sleep(0.02)
+        first_page = round(time.time() - t0, 3)
+        marks = json.loads(_get(f"http://127.0.0.1:{port}/api/health"))["startup"]
+        return {"status": "OK", "first_page_seconds": first_page,
+                **{f"app_{k}": v for k, v in marks.items()}}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.run import HISTORY, _git_commit, append_history
+
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Packages shown in the import profile")
+    parser.add_argument("--profile-only", action="store_true")
+    parser.add_argument("--label", default="")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    args = parser.parse_args(argv)
+
+    total, rows = import_profile(args.top)
+    print(f"import main: {total:.3f}s")
+    for package, secs in rows:
+        print(f"  {package:<24} {secs:7.3f}s")
+    if args.profile_only:
+        return
+
+    batch = datetime.now().isoformat(timespec="seconds")
+    commit = _git_commit()
+    records = []
+    for run in range(1, args.runs + 1):
+        result = time_to_first_page()
+        records.append({"batch": batch, "commit": commit, "label": args.label, "scenario": "startup",
+                        "engine": "webapp", "seed": run, "import_seconds": round(total, 3), **result})
+        print(f"run {run}: {result.get('status')}  first page={result.get('first_page_seconds', '-')}s  "
+              f"app={ {k: v for k, v in result.items() if k.startswith('app_')} }")
+    ok = [r["first_page_seconds"] for r in records if r.get("first_page_seconds") is not None]
+    if ok:
+        print(f"mean first page: {mean(ok):.3f}s")
+    append_history(records, args.history)
+    print(f"\n{len(records)} run(s) appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Tune CP-SAT parameters per engine and roster-size bucket, and store the winners as profiles.
+
+  python -m benchmarks.tune --engine webapp workbook        # every scenario, grouped by bucket
+  python -m benchmarks.tune --engine webapp --scenario small-44 base-50 vacations-50 --seeds 1 2 3 --time-limit 60
+  python -m benchmarks.tune --engine webapp --scenario base-50 --no-write      # report only
+
+The sweep is coordinate descent over SEARCH_SPACE: starting from the engine's current
+parameters, each parameter in turn is tried at every value with the others at their best
+so far, and a value is kept when it scores better over all scenarios and seeds of the
+bucket. Score, compared in order: runs without a schedule, mean log10 objective at the
+time limit, mean seconds to the first schedule. The best profile per (engine, bucket) goes
+to scheduler/solver_profiles.json, which both engines load on every solve; storing one needs
+MIN_SEEDS seeds and every scenario of the bucket. Every run is also appended to the benchmark
+history (label "tune <engine> <bucket>").
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from statistics import mean
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Candidates are scored at the time limit, so no stopping rule may end a run early
+NO_STOP = {"relative_gap": 0, "absolute_gap": 0, "stagnation_seconds": 0, "max_clean_solutions": 0}
+
+# Stored profiles must hold over seed noise: fewer seeds, or a bucket tuned on only some of its
+# scenarios, can only be reported (--no-write). One seed of base-50 at 45s picked profiles that
+# did not carry over to the other scenarios
+MIN_SEEDS = 3
+
+# Parameter -> values tried, in sweep order
+SEARCH_SPACE = {
+    "num_workers": [1, 2, 4, 8],
+    "linearization_level": [0, 1, 2],
+    "cp_model_probing_level": [0, 1, 2],
+    "max_presolve_iterations": [1, 3],
+    "use_lns_only": [False, True],
+    "symmetry_level": [0, 1, 2],
+}
+
+
+def _size(spec) -> int:
+    return spec.pgy1 + spec.pgy2 + spec.pgy3 + spec.ty_anesthesia + spec.ty_neurology + spec.ty_prelim
+
+
+def score(results: list) -> tuple:
+    """(runs without a schedule, mean log10 objective, mean first-schedule seconds); lower is better."""
+    solved = [r for r in results if r.get("objective") is not None]
+    if not solved:
+        return (len(results), math.inf, math.inf)
+    return (len(results) - len(solved),
+            round(mean(math.log10(max(1.0, r["objective"])) for r in solved), 3),
+            round(mean(r["first_solution_seconds"] for r in solved), 3))
+
+
+def _score_dict(key: tuple) -> dict:
+    return dict(zip(("failures", "mean_log10_objective", "mean_first_solution_seconds"), key))
+
+
+def tune_bucket(engine: str, scenarios: list, seeds: list, time_limit: int, on_run, start: dict = None) -> tuple:
+    """
+    Coordinate descent for one engine and bucket from the stored profile's params (start).
+    Returns (best params, best score, baseline score).
+    """
+    from ortools.sat.python import cp_model
+    from benchmarks.run import run_benchmark
+
+    def evaluate(params: dict) -> tuple:
+        results = []
+        for scenario in scenarios:
+            for seed in seeds:
+                result = run_benchmark(scenario, engine, seed, time_limit, params=params, stop=NO_STOP)
+                on_run(scenario, seed, params, result)
+                results.append(result)
+        return score(results), results
+
+    best = dict(start or {})
+    best_key, results = evaluate(best)
+    baseline_key = best_key
+    # The engine's parameters as actually set (defaults + any stored profile), CP-SAT defaults otherwise
+    current = next((r["solver_params"] for r in results if r.get("solver_params")), {})
+    defaults = cp_model.CpSolver().parameters
+    print(f"  baseline {current}: {_score_dict(best_key)}")
+    for name, values in SEARCH_SPACE.items():
+        incumbent = best.get(name, current.get(name, getattr(defaults, name)))
+        for value in values:
+            if value == incumbent:
+                continue  # the best so far already runs with it
+            candidate = {**best, name: value}
+            key, _ = evaluate(candidate)
+            print(f"  {candidate}: {_score_dict(key)}")
+            if key < best_key:
+                best, best_key = candidate, key
+    return best, best_key, baseline_key
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT))
+    from benchmarks.run import ENGINES, HISTORY, _git_commit, append_history
+    from benchmarks.scenarios import SCENARIOS
+    from scheduler.solver_profiles import PROFILES, bucket, load_profiles
+
+    parser = argparse.ArgumentParser(description="Tune CP-SAT parameters per engine and roster size")
+    parser.add_argument("--scenario", nargs="+", default=["all"], help=f"Scenario names or 'all': {', '.join(SCENARIOS)}")
+    parser.add_argument("--engine", nargs="+", choices=ENGINES, default=["webapp", "workbook"])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--time-limit", type=int, default=60, help="Solver time limit per run (seconds)")
+    parser.add_argument("--profiles", type=Path, default=PROFILES)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--no-write", action="store_true", help="Report the best profiles without storing them")
+    args = parser.parse_args(argv)
+
+    scenarios = list(SCENARIOS) if "all" in args.scenario else args.scenario
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    buckets = {}
+    for s in scenarios:
+        buckets.setdefault(bucket(_size(SCENARIOS[s])), []).append(s)
+    if not args.no_write:
+        if len(set(args.seeds)) < MIN_SEEDS:
+            parser.error(f"storing profiles needs at least {MIN_SEEDS} seeds (or pass --no-write)")
+        for name, members in buckets.items():
+            missing = [s for s in SCENARIOS if bucket(_size(SCENARIOS[s])) == name and s not in members]
+            if missing:
+                parser.error(f"storing the {name} profile needs all its scenarios; missing {', '.join(missing)} "
+                             "(or pass --no-write)")
+
+    import ortools
+    batch = datetime.now().isoformat(timespec="seconds")
+    commit = _git_commit()
+    profiles = load_profiles(args.profiles)
+    for engine in args.engine:
+        for name, members in buckets.items():
+            print(f"{engine} {name} ({', '.join(members)}):")
+            records = []
+
+            def on_run(scenario, seed, params, result):
+                records.append({"batch": batch, "commit": commit, "label": f"tune {engine} {name}",
+                                "scenario": scenario, "engine": engine, "seed": seed,
+                                "time_limit": args.time_limit, "candidate": params, **result})
+
+            best, best_key, baseline_key = tune_bucket(engine, members, args.seeds, args.time_limit, on_run,
+                                                       profiles.get(engine, {}).get(name, {}).get("params"))
+            append_history(records, args.history)
+            print(f"  best {best}: {_score_dict(best_key)}")
+            profiles.setdefault(engine, {})[name] = {
+                "params": best, "score": _score_dict(best_key), "baseline_score": _score_dict(baseline_key),
+                "scenarios": members, "seeds": args.seeds, "time_limit": args.time_limit,
+                "cpus": os.cpu_count(), "ortools": ortools.__version__, "commit": commit, "tuned": batch,
+            }
+    if args.no_write:
+        return
+    args.profiles.write_text(json.dumps(profiles, indent=1, sort_keys=True) + "\n")
+    print(f"\nprofiles written to {args.profiles}")
+
+
+if __name__ == "__main__":
+    main()
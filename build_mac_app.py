@@ -68,7 +68,24 @@ def main():
         "--hidden-import=sqlalchemy.sql.default_comparator",
         "--hidden-import=ortools",
         "--hidden-import=pandas",
+        # engine.py imports the coverage compiler from the workbook package at the repo root
+        "--hidden-import=scheduler.coverage",
+        # Loaded on first use inside the routers, not at startup
+        "--hidden-import=engine",
+        "--hidden-import=lns",
+        "--hidden-import=anytime",
+        "--hidden-import=interval_engine",
+        "--hidden-import=precheck",
+        "--hidden-import=validation",
+        "--hidden-import=openpyxl",
     ]
+    # Never imported by the app; keeping them out shrinks the bundle the app unpacks and scans
+    excludes = [f"--exclude-module={m}" for m in ("tkinter", "matplotlib", "IPython", "pytest", "notebook")]
+    # Tuned solver parameters, when benchmarks.tune has stored some (scheduler/solver_profiles.py
+    # reads them next to itself; without the file the engines keep their defaults)
+    profiles = []
+    if (ROOT_DIR / "scheduler" / "solver_profiles.json").exists():
+        profiles = [f"--add-data=../../scheduler/solver_profiles.json{sep}scheduler"]
     
     cmd = [
         # Call pyinstaller module instead of command just in case
@@ -78,10 +95,13 @@ def main():
         "--windowed", # No terminal window
         "--clean",
         "--noconfirm",
+        "--noupx",  # UPX-compressed libraries are decompressed on every launch
+        "--paths=../..",
         f"--add-data=static{sep}static", # Include the static folder
         # Include schedule.db as a template
         f"--add-data=schedule.db{sep}.", 
-    ] + hidden_imports + [
+        "--hidden-import=scheduler.solver_profiles",
+    ] + profiles + hidden_imports + excludes + [
         "run.py"
     ]
     
@@ -94,6 +114,7 @@ def main():
 
     print("\n✨ Build Complete!")
     print(f"👉 Application is at: {DIST_DIR / 'KendallScheduler.app'}")
+    print("   Cold start: GET /api/health in the running app reports imported/ready/first_page seconds.")
     print("   You may need to manually copy 'schedule.db' to ~/Documents/KendallScheduler/ if specific data is needed.")
 
 if __name__ == "__main__":
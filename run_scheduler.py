@@ -32,6 +32,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 from scheduler.workbook_sheets import setup_all_sheets
 from scheduler.parse_inputs import parse_workbook
 from scheduler.solver import solve
+from scheduler.stopping import stop_rules
 from scheduler.write_schedule import write_schedule, add_conflicts_sheet
 from scheduler.validate import validate_assignments, dry_run_vacation_feasibility
 from scheduler.year_promotion import build_next_year
@@ -91,8 +92,19 @@ def cmd_solve(args):
             print(f"  {m}")
 
     # Step 2: solve
-    print(f"\nSolving (time limit {args.time_limit}s)...")
-    assignments, status, conflicts = solve(ctx, time_limit_seconds=args.time_limit)
+    stats = {}
+    if args.deterministic:
+        print(f"\nSolving deterministically (budget {args.time_limit} deterministic time units, seed {args.seed or 0})...")
+    else:
+        print(f"\nSolving (time limit {args.time_limit}s)...")
+    assignments, status, conflicts = solve(ctx, time_limit_seconds=args.time_limit, stats=stats,
+                                           deterministic=args.deterministic,
+                                           stop_rules=stop_rules(stagnation_seconds=args.stagnation_seconds))
+    print(f"  Stopped: {stats['stop_reason']} after {stats['solve_seconds']}s")
+    if args.deterministic:
+        print(f"  OR-Tools {stats['solver_version']}, model {stats['model_hash'][:16]}, "
+              f"parameters {stats['solver_params']}"
+              + ("" if stats["reproducible"] else " (stopped by the wall-clock safety limit: not reproducible)"))
 
     if assignments is None:
         print(f"\nSolver INFEASIBLE: {status}")
@@ -166,8 +178,14 @@ def main():
     p_solve = sub.add_parser("solve", help="Run solver and produce schedule")
     p_solve.add_argument("--workbook", required=True, help="Workbook path")
     p_solve.add_argument("--out", default="2026 Master Schedule - Auto.xlsx")
-    p_solve.add_argument("--time-limit", type=int, default=300)
+    p_solve.add_argument("--time-limit", type=int, default=None,
+                         help="Seconds (default 300); with --deterministic a budget that must be given")
     p_solve.add_argument("--seed", type=int, default=None)
+    p_solve.add_argument("--deterministic", action="store_true",
+                         help="Reproducible solve: --time-limit becomes a deterministic time budget "
+                              "(CP-SAT units, about 6 s each on one CPU)")
+    p_solve.add_argument("--stagnation-seconds", type=float, default=None,
+                         help="Stop after this long without a better schedule (0 = run to the time limit)")
 
     # next-year
     p_next = sub.add_parser("next-year", help="Promote PGY and create fresh workbook")
@@ -185,6 +203,10 @@ def main():
         "solve": cmd_solve,
         "next-year": cmd_next_year,
     }
+    if args.command == "solve" and args.time_limit is None:
+        if args.deterministic:
+            p_solve.error("--deterministic needs an explicit --time-limit budget (deterministic time units)")
+        args.time_limit = 300
     dispatch[args.command](args)
 
 
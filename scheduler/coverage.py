@@ -0,0 +1,219 @@
+"""
+Coverage rule compiler shared by the workbook solver and the web engine.
+
+CoverageRule rows (pool, units per week, seniors/interns per unit, week scope, optional)
+are compiled once per solve into CoveragePlans: the rotation indices that fill each pool
+in that engine's code table, the weeks the rule applies to, and the per-week senior /
+intern counts. emit_coverage() then adds the constraints for every plan.
+
+Pool names: FLOOR_<X> (floor team X, e.g. FLOOR_E for a fifth team), TEAM_G, ICU_DAY,
+NF, ICUN / ICU_NIGHT, SWING.
+"""
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+HOLIDAY_WEEKS = (26, 27)
+
+# pool -> (kind, candidate rotation codes); each engine keeps the codes it has
+POOLS = {
+    "TEAM_G": ("senior_team", ("G",)),
+    "ICU_DAY": ("icu", ("ICU", "ICU E")),
+    "NF": ("night", ("NF",)),
+    "ICUN": ("night", ("ICU N",)),
+    "ICU_NIGHT": ("night", ("ICU N",)),
+    "SWING": ("night", ("SWING",)),
+}
+FLOOR_POOL = re.compile(r"^FLOOR_([A-Z])$")
+
+# The web engine's built-in coverage, used when a year has no coverage_rules rows
+DEFAULT_RULES = [
+    {"pool": "FLOOR_A", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 2},
+    {"pool": "FLOOR_B", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 2},
+    {"pool": "FLOOR_C", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 2},
+    {"pool": "FLOOR_D", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 2},
+    {"pool": "ICU_DAY", "required_units_per_week": 1, "seniors_per_unit": 2, "interns_per_unit": 2},
+    {"pool": "NF", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 1},
+    {"pool": "ICUN", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 1},
+    {"pool": "SWING", "required_units_per_week": 1, "seniors_per_unit": 1, "interns_per_unit": 1},
+    {"pool": "TEAM_G", "required_units_per_week": 0, "seniors_per_unit": 1, "interns_per_unit": 0, "optional": True},
+]
+
+
+@dataclass
+class CoveragePlan:
+    """One compiled coverage rule."""
+    pool: str
+    kind: str                 # floor, senior_team, icu, night
+    codes: Tuple[str, ...]    # rotation codes that fill the pool
+    idx: Tuple[int, ...]      # the same codes as indices in the engine's code table
+    weeks: Tuple[int, ...]    # regular weeks the rule applies to
+    holiday_weeks: Tuple[int, ...]
+    seniors: int              # per regular week
+    interns: int
+    optional: bool = False
+
+    @property
+    def label(self) -> str:
+        return "/".join(self.codes)
+
+    @property
+    def holiday_total(self) -> int:
+        """Residents on the pool in a holiday week: the regular team size, seniors and interns interchangeable."""
+        return 0 if self.optional else self.seniors + self.interns
+
+    @property
+    def holiday_min_seniors(self) -> int:
+        """Floor teams and ICU keep a senior on holidays (one per unit)."""
+        if self.optional or self.kind not in ("floor", "icu") or not self.seniors:
+            return 0
+        return min(self.seniors, max(1, self.seniors // 2))
+
+
+def _field(rule, *names, default=None):
+    for name in names:
+        value = rule.get(name) if isinstance(rule, dict) else getattr(rule, name, None)
+        if value is not None:
+            return value
+    return default
+
+
+def pool_codes(pool: str) -> Tuple[str, Tuple[str, ...]]:
+    """(kind, candidate codes) for a pool name; raises ValueError for unknown pools."""
+    key = pool.strip().upper()
+    if key in POOLS:
+        return POOLS[key]
+    m = FLOOR_POOL.match(key)
+    if m and m.group(1) != "G":
+        return "floor", (m.group(1),)
+    raise ValueError(f"Unknown coverage pool '{pool}'")
+
+
+def parse_week_scope(scope: Optional[str], week_count: int = 52) -> List[int]:
+    """'all' (default), 'regular', 'holiday', or an explicit list such as '1-25,28-52'."""
+    scope = (scope or "all").strip().lower()
+    weeks = list(range(1, week_count + 1))
+    if scope in ("all", "specific", ""):
+        return weeks
+    if scope == "regular":
+        return [w for w in weeks if w not in HOLIDAY_WEEKS]
+    if scope == "holiday":
+        return [w for w in weeks if w in HOLIDAY_WEEKS]
+    out = set()
+    for part in scope.split(","):
+        lo, _, hi = part.strip().partition("-")
+        try:
+            out.update(range(int(lo), int(hi or lo) + 1))
+        except ValueError:
+            raise ValueError(f"Bad coverage week scope '{scope}'")
+    return [w for w in weeks if w in out]
+
+
+def extra_floor_codes(rules: Sequence, known_codes: Sequence[str]) -> List[str]:
+    """Floor team codes used by the rules that are not in known_codes (e.g. 'E' for FLOOR_E)."""
+    out = []
+    for rule in rules:
+        kind, codes = pool_codes(_field(rule, "pool", "rotation_pool"))
+        if kind == "floor":
+            out.extend(c for c in codes if c not in known_codes and c not in out)
+    return out
+
+
+def compile_rules(
+    rules: Sequence,
+    rot_idx: Dict[str, int],
+    week_count: int = 52,
+    holiday_weeks: Sequence[int] = HOLIDAY_WEEKS,
+    skip_unknown: bool = False,
+) -> List[CoveragePlan]:
+    """
+    Compile CoverageRule rows into plans for one engine.
+    rules: web CoverageRule rows / dicts (pool, required_units_per_week, seniors_per_unit,
+           interns_per_unit, optional, week_scope) or workbook CoverageRules
+           (rotation_pool, required_per_week, senior_per_unit, intern_per_unit).
+    rot_idx: the engine's {rotation_code: index}.
+    holiday_weeks: weeks given the holiday variant of each rule; () treats every week alike.
+    skip_unknown: warn about and skip a rule whose pool is unknown or has no rotation code in
+           this engine instead of raising ValueError (the workbook solver, which always skipped them).
+    """
+    plans = []
+    for rule in rules:
+        pool = _field(rule, "pool", "rotation_pool")
+        try:
+            kind, candidates = pool_codes(pool)
+            codes = tuple(c for c in candidates if c in rot_idx)
+            if not codes:
+                raise ValueError(f"Coverage pool '{pool}' has no rotation code in this engine")
+        except ValueError as e:
+            if not skip_unknown:
+                raise
+            warnings.warn(f"{e}; rule skipped")
+            continue
+        units = int(_field(rule, "required_units_per_week", "required_per_week", default=0))
+        sr = int(_field(rule, "seniors_per_unit", "senior_per_unit", default=0))
+        jr = int(_field(rule, "interns_per_unit", "intern_per_unit", default=0))
+        optional = bool(_field(rule, "optional", default=False))
+        if optional:
+            # An optional pool is either off or staffed as one full unit
+            units = max(units, 1)
+        weeks = parse_week_scope(_field(rule, "week_scope"), week_count)
+        plans.append(CoveragePlan(
+            pool=pool,
+            kind=kind,
+            codes=codes,
+            idx=tuple(rot_idx[c] for c in codes),
+            weeks=tuple(w for w in weeks if w not in holiday_weeks),
+            holiday_weeks=tuple(w for w in weeks if w in holiday_weeks),
+            seniors=units * sr,
+            interns=units * jr,
+            optional=optional,
+        ))
+    return plans
+
+
+def emit_coverage(
+    model,
+    plans: List[CoveragePlan],
+    senior_idxs: Sequence[int],
+    intern_idxs: Sequence[int],
+    indicator: Callable,
+    exact: bool = True,
+    hard: Optional[Callable] = None,
+    on_optional: Optional[Callable] = None,
+) -> None:
+    """
+    Add coverage constraints for every plan.
+    indicator(r, w, idx_list, tag) returns the literal "resident r is on one of idx_list in week w".
+    exact: counts must match exactly (web engine) rather than be at least the requirement (workbook).
+    hard(ct, family) tags a hard constraint with its rule family (engine diagnose mode).
+    on_optional(w, plan, active) receives the literal that is true when an optional pool is staffed.
+    """
+    hard = hard or (lambda ct, family: ct)
+
+    def add(expr_sum, target, family):
+        if exact:
+            hard(model.Add(expr_sum == target), family)
+        elif not isinstance(target, int) or target > 0:
+            hard(model.Add(expr_sum >= target), family)
+
+    for plan in plans:
+        tag = plan.pool.lower()
+        for w in plan.weeks:
+            sr = sum(indicator(r, w, plan.idx, tag) for r in senior_idxs)
+            jr = sum(indicator(r, w, plan.idx, tag) for r in intern_idxs)
+            if plan.optional:
+                active = model.NewBoolVar(f"{tag}_on_{w}")
+                add(sr, plan.seniors * active, f"{plan.label} team week {w}")
+                add(jr, plan.interns * active, f"{plan.label} team week {w}")
+                if on_optional:
+                    on_optional(w, plan, active)
+                continue
+            add(sr, plan.seniors, f"{plan.label} senior coverage week {w}")
+            add(jr, plan.interns, f"{plan.label} intern coverage week {w}")
+        for w in plan.holiday_weeks:
+            sr = sum(indicator(r, w, plan.idx, tag) for r in senior_idxs)
+            jr = sum(indicator(r, w, plan.idx, tag) for r in intern_idxs)
+            add(sr + jr, plan.holiday_total, f"holiday {plan.label} coverage week {w}")
+            if plan.holiday_min_seniors:
+                hard(model.Add(sr >= plan.holiday_min_seniors), f"holiday {plan.label} coverage week {w}")
@@ -6,9 +6,15 @@ night limits, ED rules, Ramirez restriction, clinic cadence, and vacation.
 Grounded in the actual workbook structure.
 """
 
+import time
+from dataclasses import replace
+
 from ortools.sat.python import cp_model
 from typing import Dict, List, Optional, Tuple
 
+from .coverage import compile_rules, emit_coverage
+from .solver_profiles import apply_profile, default_workers, deterministic_params, reproducibility, set_params
+from .stopping import DEFAULT_STOP_RULES, Stopper, StopRules
 from .models import (
     ScheduleContext, Resident, VacationRequest, CoverageRule,
     SOLVER_ROTATION_CODES, NIGHT_CODES, FLOOR_CODES,
@@ -66,14 +72,39 @@ def _indicator_in(model, var, idx_list, name=""):
     return b
 
 
+class _ObjectiveCurve(cp_model.CpSolverSolutionCallback):
+    """Records (elapsed_seconds, objective) for every improving solution and reports it to stopper."""
+
+    def __init__(self, stopper: Stopper):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._start = time.time()
+        self._stopper = stopper
+        self.points = []
+
+    def on_solution_callback(self):
+        self.points.append((round(time.time() - self._start, 3), self.ObjectiveValue()))
+        self._stopper.on_solution(self)
+
+
 def solve(
     ctx: ScheduleContext,
     time_limit_seconds: int = 300,
+    stats: Optional[dict] = None,
+    solver_params: Optional[dict] = None,
+    deterministic: bool = False,
+    stop_rules: Optional[StopRules] = None,
 ) -> Tuple[Optional[Dict[str, Dict[int, str]]], str, List[str]]:
     """
     Returns (assignments, status_str, conflict_messages).
     assignments = {resident_name: {week: rotation_code}} or None if infeasible.
+    stats: optional dict filled with the objective curve, bound and build/solve timings
+    (same keys as the webapp engine's solve()).
+    solver_params: CP-SAT parameters set over the tuned profile (solver_profiles.py).
+    deterministic: reproducible solve; time_limit_seconds is then a deterministic time budget.
+    stop_rules: when to end the search early (stopping.py); None = DEFAULT_STOP_RULES. A clean
+    solution has no requirement deficit; deterministic solves ignore stagnation_seconds.
     """
+    t_build = time.time()
     model = cp_model.CpModel()
     residents = ctx.residents
     names = [r.name for r in residents]
@@ -131,41 +162,24 @@ def solve(
     # ══════════════════════════════════════════════════════════
     # 3. COVERAGE — drove by COVERAGE_RULES sheet
     # ══════════════════════════════════════════════════════════
-    POOL_MAP = {
-        "FLOOR_A": [IDX_A],
-        "FLOOR_B": [IDX_B],
-        "FLOOR_C": [IDX_C],
-        "FLOOR_D": [IDX_D],
-        "ICU_DAY": ICU_DAY,
-        "NF":      [IDX_NF],
-        "ICU_NIGHT": [IDX_ICUN],
-        "SWING":   [IDX_SWING],
-        "TEAM_G":  [IDX_G],
-    }
+    # Pools are compiled by scheduler.coverage (shared with the web engine);
+    # the workbook treats every rule as a minimum and has no holiday variant.
+    # Rows with a pool this solver does not know are skipped with a warning.
+    plans = compile_rules(
+        [rule for rule in ctx.coverage_rules if rule.required_per_week > 0],
+        ROT_IDX, week_count=ctx.week_count, holiday_weeks=(), skip_unknown=True,
+    )
+    emit_coverage(
+        model, plans, senior_idxs, intern_idxs,
+        lambda r, w, idx, tag: get_ind_set(r, w, list(idx), tag),
+        exact=False,
+    )
 
-    for rule in ctx.coverage_rules:
-        idx_list = POOL_MAP.get(rule.rotation_pool)
-        if not idx_list or rule.required_per_week <= 0:
-            if rule.rotation_pool == "TEAM_G":
-                # Special: restrict interns from G even if 0 required
-                for r in intern_idxs:
-                    for w in weeks:
-                        model.Add(assign[(r, w)] != IDX_G)
-            continue
-        
-        for w in weeks:
-            sr_pool = [get_ind_set(r, w, idx_list, rule.rotation_pool.lower()) for r in senior_idxs]
-            jr_pool = [get_ind_set(r, w, idx_list, rule.rotation_pool.lower()) for r in intern_idxs]
-            
-            if rule.senior_per_unit > 0:
-                model.Add(sum(sr_pool) >= rule.senior_per_unit * rule.required_per_week)
-            if rule.intern_per_unit > 0:
-                model.Add(sum(jr_pool) >= rule.intern_per_unit * rule.required_per_week)
-            
-            if rule.rotation_pool == "TEAM_G":
-                # Stay seniors-only
-                for r in intern_idxs:
-                    model.Add(assign[(r, w)] != IDX_G)
+    if any(rule.rotation_pool == "TEAM_G" for rule in ctx.coverage_rules):
+        # Team G stays seniors-only even if 0 required
+        for r in intern_idxs:
+            for w in weeks:
+                model.Add(assign[(r, w)] != IDX_G)
 
     # ══════════════════════════════════════════════════════════
     # 4. ED: max N per week, no PGY1 in July
@@ -290,13 +304,39 @@ def solve(
 
     # ── Solve ──
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = time_limit_seconds
-    solver.parameters.num_workers = 8
-    if ctx.random_seed is not None:
-        solver.parameters.random_seed = ctx.random_seed
-
-    status = solver.Solve(model)
+    rules = DEFAULT_STOP_RULES if stop_rules is None else stop_rules
+    if deterministic:
+        solver_params = set_params(solver.parameters, {**deterministic_params(time_limit_seconds, ctx.random_seed),
+                                                       **(solver_params or {})})
+        rules = replace(rules, stagnation_seconds=None)
+    else:
+        solver_params = apply_profile(solver.parameters, "workbook", N, defaults={"num_workers": default_workers()},
+                                      overrides=solver_params)
+        solver.parameters.max_time_in_seconds = time_limit_seconds
+        if ctx.random_seed is not None:
+            solver.parameters.random_seed = ctx.random_seed
+
+    build_seconds = time.time() - t_build
+    stopper = Stopper(solver, rules, clean=sum(total_deficit) if total_deficit else None)
+    curve = _ObjectiveCurve(stopper)
+    with stopper:
+        status = solver.Solve(model, curve)
     conflicts = []
+    if stats is not None:
+        stats.update({
+            "curve": curve.points,
+            "objective": solver.ObjectiveValue() if curve.points else None,
+            "best_bound": solver.BestObjectiveBound() if curve.points else None,
+            "build_seconds": round(build_seconds, 3),
+            "first_solution_seconds": curve.points[0][0] if curve.points else None,
+            "solve_seconds": round(solver.WallTime(), 3),
+            "status": solver.StatusName(status),
+            "stop_reason": stopper.reason(solver.StatusName(status),
+                                          solver.ObjectiveValue() if curve.points else None,
+                                          solver.BestObjectiveBound() if curve.points else None),
+            "solver_params": solver_params,
+            **(reproducibility(solver, solver_params, model) if deterministic else {"reproducible": False}),
+        })
 
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
         assignments = {}
@@ -0,0 +1,129 @@
+"""
+Tuned CP-SAT parameters per engine and roster size, applied by both engines at solve time.
+
+solver_profiles.json (next to this module) maps engine -> size bucket -> profile:
+
+  {"webapp": {"up-to-50": {"params": {"linearization_level": 2, ...}, "cpus": 8, ...}}}
+
+Engines are the benchmark engine names (webapp, interval, workbook); buckets come from the
+resident count (BUCKETS). benchmarks/tune.py writes the file on the machine that runs the
+solves; none is shipped. A missing file, engine or bucket leaves the engine's own defaults.
+num_workers only applies on a machine with the CPU count the profile was tuned on, and
+parameter names this OR-Tools does not know are skipped.
+
+Deterministic solves (deterministic_params) use no profile: a fixed worker count, interleaved
+search and a deterministic time budget, so the same inputs, parameters and OR-Tools version
+give the same schedule on any machine. model_hash() fingerprints the model they solved.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+PROFILES = Path(__file__).resolve().parent / "solver_profiles.json"
+
+# (largest resident count, bucket name), smallest first; None = no upper limit
+BUCKETS = ((50, "up-to-50"), (66, "51-66"), (None, "67-plus"))
+
+# Fixed so a schedule does not depend on the machine's CPU count. base-50 at 40 units: two
+# workers found a schedule with objective 4.5e8, eight found 1.0e9
+DETERMINISTIC_WORKERS = 2
+# Wall-clock safety net: a multiple of the deterministic budget, at least DETERMINISTIC_MIN_WALL
+# seconds (presolve of a 44-resident model alone took over 40s on one CPU). A solve stopped by
+# it is not reproducible. One unit took about 6 wall seconds on one CPU with two workers
+DETERMINISTIC_WALL_FACTOR = 20
+DETERMINISTIC_MIN_WALL = 600
+
+
+def default_workers(cap: int = 8) -> int:
+    """
+    Workers for a solve outside the web app's CPU governor (the workbook engine): the CPUs left
+    after SCHEDULER_RESERVE_CPUS, like the governor, at least 2 (a portfolio) and at most cap.
+    """
+    usable = (os.cpu_count() or 1) - int(os.environ.get("SCHEDULER_RESERVE_CPUS", "1"))
+    return max(2, min(cap, usable))
+
+
+def bucket(n_residents: int) -> str:
+    for limit, name in BUCKETS:
+        if limit is None or n_residents <= limit:
+            return name
+    return BUCKETS[-1][1]
+
+
+def load_profiles(path: Path = PROFILES) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def profile_params(engine: str, n_residents: int, path: Path = PROFILES) -> Dict[str, object]:
+    """The tuned parameters for this engine and roster size ({} if none are stored)."""
+    profile = load_profiles(path).get(engine, {}).get(bucket(n_residents))
+    if not profile:
+        return {}
+    params = dict(profile.get("params", {}))
+    if profile.get("cpus") != os.cpu_count():
+        params.pop("num_workers", None)
+    return params
+
+
+def apply_profile(parameters, engine: str, n_residents: int, defaults: Optional[dict] = None,
+                  overrides: Optional[dict] = None) -> Dict[str, object]:
+    """
+    Set defaults, then the stored profile, then overrides on a CpSolver's parameters.
+    Returns the parameters actually set (stats record them as solver_params).
+    """
+    return set_params(parameters, {**(defaults or {}), **profile_params(engine, n_residents), **(overrides or {})})
+
+
+def set_params(parameters, params: dict) -> Dict[str, object]:
+    """Set params on a CpSolver's parameters, skipping unknown names; returns the ones set."""
+    applied = {}
+    for name, value in params.items():
+        if hasattr(parameters, name):
+            setattr(parameters, name, value)
+            applied[name] = value
+    return applied
+
+
+def deterministic_params(budget: float, random_seed: Optional[int] = None) -> Dict[str, object]:
+    """Parameters of a reproducible solve; budget is in CP-SAT deterministic time units (> 0)."""
+    if not budget or budget <= 0:
+        raise ValueError("a deterministic solve needs a positive budget (CP-SAT deterministic time units)")
+    return {
+        "num_workers": DETERMINISTIC_WORKERS,
+        "interleave_search": True,
+        "max_deterministic_time": float(budget),
+        "max_time_in_seconds": float(max(DETERMINISTIC_MIN_WALL, budget * DETERMINISTIC_WALL_FACTOR)),
+        "random_seed": random_seed or 0,
+    }
+
+
+def model_hash(model) -> str:
+    """sha256 of a CpModel's serialized proto: equal hashes mean the solver saw the same model."""
+    proto = model.proto
+    if hasattr(proto, "SerializeToString"):
+        return hashlib.sha256(proto.SerializeToString(deterministic=True)).hexdigest()
+    # OR-Tools 9.13+ wraps the proto without a bytes serializer; its text format took 8x the
+    # export's time (2s, 60 MB for base-50), so the binary export goes through a temporary file
+    fd, path = tempfile.mkstemp(suffix=".pb")
+    os.close(fd)
+    try:
+        model.export_to_file(path)
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    finally:
+        os.remove(path)
+
+
+def reproducibility(solver, params: dict, model) -> dict:
+    """What a stored schedule needs to be solved again bit-for-bit (stats keys)."""
+    from ortools import __version__ as ortools_version
+    return {
+        "solver_version": ortools_version,
+        "model_hash": model_hash(model),
+        "reproducible": solver.wall_time < params.get("max_time_in_seconds", float("inf")),
+    }
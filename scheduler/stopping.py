@@ -0,0 +1,129 @@
+"""
+Stopping rules shared by both engines: end a solve before its time limit once more search is
+unlikely to pay off.
+
+  relative_gap, absolute_gap  CP-SAT's gap limits (the solve ends as OPTIMAL within them)
+  stagnation_seconds          no significant improvement for this long after the first solution
+  max_clean_solutions         this many solutions without any penalty (requirement deficits
+                              and other soft-rule costs); later ones only trade rotation changes
+
+The solution callback reports every improving solution to a Stopper; a watchdog thread stops
+the search on stagnation, since a callback only runs when a solution arrives. reason() names
+what ended the solve (one of the rule names, or optimal / infeasible / time_limit).
+A rule set to None or 0 is off; engines given no rules use DEFAULT_STOP_RULES.
+"""
+import threading
+import time
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Optional
+
+WATCH_INTERVAL = 0.5  # seconds between stagnation checks
+# base-50 improved every few seconds for all of a 300s solve (objective 3.3e9 -> 1.5e8, never
+# 8s without a better solution), so 60s only ends searches that have really converged
+STAGNATION_SECONDS = 60.0
+# Smaller improvements do not reset the stagnation clock: rotation-change tie-breakers worth a
+# few units keep arriving long after the requirement deficits stop moving
+STAGNATION_MIN_IMPROVEMENT = 1e-3
+
+
+@dataclass
+class StopRules:
+    relative_gap: Optional[float] = None
+    absolute_gap: Optional[float] = None
+    stagnation_seconds: Optional[float] = None
+    max_clean_solutions: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        """Every rule, 0 where off (stop_rules(**to_dict()) gives the same rules back)."""
+        return {k: v or 0 for k, v in asdict(self).items()}
+
+
+DEFAULT_STOP_RULES = StopRules(stagnation_seconds=STAGNATION_SECONDS)
+
+
+def stop_rules(**values) -> StopRules:
+    """DEFAULT_STOP_RULES with every rule given a value other than None replaced (0 turns it off)."""
+    return replace(DEFAULT_STOP_RULES, **{f.name: values[f.name] for f in fields(StopRules)
+                                          if values.get(f.name) is not None})
+
+
+class Stopper:
+    """
+    Applies StopRules to one CpSolver.Solve(). Use as a context manager around the solve and
+    call on_solution(callback) from the solution callback. clean is the objective's penalty
+    expression (a solution is clean when it is 0); without it max_clean_solutions is ignored.
+    """
+
+    def __init__(self, solver, rules: Optional[StopRules], clean=None):
+        self.rules = rules or StopRules()
+        self.fired: Optional[str] = None
+        self.clean_solutions = 0
+        self._solver = solver
+        self._clean = clean
+        self._last: Optional[float] = None
+        self._best: Optional[float] = None
+        self._done = threading.Event()
+        self._thread = None
+        if self.rules.relative_gap:
+            solver.parameters.relative_gap_limit = self.rules.relative_gap
+        if self.rules.absolute_gap:
+            solver.parameters.absolute_gap_limit = self.rules.absolute_gap
+
+    def __enter__(self):
+        if self.rules.stagnation_seconds:
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+    def on_solution(self, callback) -> None:
+        objective = callback.ObjectiveValue()
+        if significant(self._best, objective):
+            self._best, self._last = objective, time.time()
+        if self._clean is None or not self.rules.max_clean_solutions:
+            return
+        if callback.Value(self._clean) == 0:
+            self.clean_solutions += 1
+            if self.clean_solutions >= self.rules.max_clean_solutions:
+                self._fire("max_clean_solutions")
+
+    def _watch(self):
+        while not self._done.wait(WATCH_INTERVAL):
+            if self._last is not None and time.time() - self._last >= self.rules.stagnation_seconds:
+                self._fire("stagnation_seconds")
+                return
+
+    def _fire(self, rule: str):
+        if self.fired is None:
+            self.fired = rule
+            self._solver.stop_search()
+
+    def reason(self, status: str, objective: Optional[float], bound: Optional[float]) -> str:
+        """The rule that ended the solve, else optimal / infeasible / time_limit (status is a status name)."""
+        if self.fired:
+            return self.fired
+        if status == "OPTIMAL":
+            return within_gap(self.rules, objective, bound) or "optimal"
+        return "infeasible" if status == "INFEASIBLE" else "time_limit"
+
+
+def significant(best: Optional[float], objective: float) -> bool:
+    """Whether objective improves on best enough to reset the stagnation clock."""
+    return best is None or best - objective >= STAGNATION_MIN_IMPROVEMENT * max(1.0, abs(best))
+
+
+def within_gap(rules: StopRules, objective: Optional[float], bound: Optional[float]) -> Optional[str]:
+    """The gap rule the objective meets against the bound (CP-SAT's definitions), if any."""
+    if objective is None or bound is None or objective == bound:
+        return None
+    gap = abs(objective - bound)
+    if rules.absolute_gap and gap <= rules.absolute_gap:
+        return "absolute_gap"
+    if rules.relative_gap and gap <= rules.relative_gap * max(1.0, abs(objective)):
+        return "relative_gap"
+    return None
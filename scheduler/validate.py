@@ -74,30 +74,45 @@ def validate_assignments(
 
 
 def dry_run_vacation_feasibility(ctx: ScheduleContext) -> Tuple[bool, List[str]]:
-    """Check if hard vacation requests leave enough residents for coverage."""
+    """
+    Check, per week and per role, that hard vacation locks and cohort clinic weeks
+    leave enough seniors and interns for the coverage rules.
+    """
     msgs = []
-    vac_per_week = {}
+    names = {r.name for r in ctx.residents}
+    locked = {}
     for vreq in ctx.vacation_requests:
-        if not vreq.hard_lock:
+        if not vreq.hard_lock or vreq.resident_name not in names:
             continue
         for w in range(vreq.start_week, vreq.start_week + vreq.length_weeks):
             if 1 <= w <= ctx.week_count:
-                vac_per_week[w] = vac_per_week.get(w, 0) + 1
+                locked.setdefault(w, set()).add(vreq.resident_name)
+
+    in_clinic = {}
+    for coh in ctx.cohort_defs:
+        members = {r.name for r in ctx.residents if r.cohort_id == coh.cohort_id}
+        for w in coh.clinic_weeks:
+            if 1 <= w <= ctx.week_count:
+                in_clinic.setdefault(w, set()).update(members)
 
-    n = len(ctx.residents)
-    
-    # Calculate required working residents from CoverageRules
     sr_required = sum(r.senior_per_unit * r.required_per_week for r in ctx.coverage_rules)
     jr_required = sum(r.intern_per_unit * r.required_per_week for r in ctx.coverage_rules)
-    total_required = sr_required + jr_required
-    
     # Use config threshold if it's higher than the calculated sum
-    min_working = max(total_required, ctx.config.min_working_residents)
-    
-    for w, cnt in sorted(vac_per_week.items()):
-        avail = n - cnt
-        if avail < min_working:
+    min_working = max(sr_required + jr_required, ctx.config.min_working_residents)
+
+    for w in range(1, ctx.week_count + 1):
+        off = locked.get(w, set())
+        busy = off | in_clinic.get(w, set())
+        sr_avail = sum(1 for r in ctx.residents if r.is_senior and r.name not in busy)
+        jr_avail = sum(1 for r in ctx.residents if r.is_intern and r.name not in busy)
+        reason = f"{len(off)} on vacation, {len(busy - off)} in cohort clinic"
+        if sr_avail < sr_required:
+            msgs.append(f"Week {w}: seniors {sr_avail} available (need ≥{sr_required}) — {reason}")
+        if jr_avail < jr_required:
+            msgs.append(f"Week {w}: interns {jr_avail} available (need ≥{jr_required}) — {reason}")
+        avail = len(ctx.residents) - len(off)
+        if off and avail < min_working:
             msgs.append(
-                f"Week {w}: {cnt} on vacation → {avail} available (need ≥{min_working})")
-    
+                f"Week {w}: {len(off)} on vacation → {avail} available (need ≥{min_working})")
+
     return len(msgs) == 0, msgs
@@ -20,7 +20,7 @@ else
     source venv/bin/activate
 fi
 # Run in background
-nohup python3 -m uvicorn main:app --host 127.0.0.1 --port 8000 --reload > backend.log 2>&1 &
+PYTHONPATH="$DIR" nohup python3 -m uvicorn main:app --host 127.0.0.1 --port 8000 --reload > backend.log 2>&1 &
 BACKEND_PID=$!
 echo "Backend running on http://127.0.0.1:8000 (PID: $BACKEND_PID)"
 
@@ -0,0 +1,151 @@
+"""Anytime driver: a valid schedule within seconds, then optimization in the background.
+
+Phase 1 solves a copy of the model with the objective cleared and aggressive feasibility
+parameters (light presolve, no LP relaxation or symmetry detection) and stops at the first
+schedule. Phase 2 optimizes the full model with that schedule as a hint, until the time limit
+or a stopping rule (scheduler/stopping.py). Every schedule found along the way is passed to
+on_draft() so the caller can store it as a draft version the grid can show immediately; a
+crash or time-out keeps the drafts already written.
+"""
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from engine import BuiltModel, ObjectiveCurve, SearchLog, build_model, response_stats, stop_reason, tuned_solver
+from scheduler.stopping import DEFAULT_STOP_RULES, Stopper, StopRules
+
+# Phase 1 parameters: trade presolve and propagation strength for time to first schedule
+FEASIBILITY_PARAMS = {
+    "stop_after_first_solution": True,
+    "linearization_level": 0,
+    "symmetry_level": 0,
+    "cp_model_probing_level": 0,
+    "max_presolve_iterations": 1,
+}
+FEASIBILITY_SHARE = 0.5  # at most this share of the time limit goes to phase 1
+DRAFT_INTERVAL = 5.0     # seconds between stored drafts; the last improvement is always stored
+
+# on_draft(assignments, objective, elapsed_seconds, phase)
+DraftSink = Callable[[Dict[int, Dict[int, str]], Optional[float], float, str], None]
+
+
+class DraftCallback(ObjectiveCurve):
+    """ObjectiveCurve that also hands improving schedules to on_draft, at most one per interval."""
+
+    def __init__(self, built: BuiltModel, on_draft: DraftSink, offset: float = 0.0,
+                 interval: float = DRAFT_INTERVAL, stopper: Optional[Stopper] = None):
+        ObjectiveCurve.__init__(self, offset, stopper)
+        self._built = built
+        self._on_draft = on_draft
+        self._interval = interval
+        self._last_sent = float("-inf")
+        self._pending = None
+
+    def on_solution_callback(self):
+        ObjectiveCurve.on_solution_callback(self)
+        elapsed, objective = self.points[-1]
+        self._pending = (self._built.read(self.Value), objective, elapsed)
+        if elapsed - self._last_sent >= self._interval:
+            self.flush()
+
+    def flush(self):
+        """Store the newest schedule not yet passed to on_draft."""
+        if self._pending is None:
+            return
+        cells, objective, elapsed = self._pending
+        self._pending = None
+        self._last_sent = elapsed
+        self._on_draft(self._built.extract(cells), objective, elapsed, "optimize")
+
+
+def solve_anytime(
+    residents: List[dict],
+    requirements_by_pgy: Dict[str, List[dict]],
+    completions_by_resident: Dict[int, Dict[str, int]],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    time_limit: int = 300,
+    random_seed: Optional[int] = None,
+    on_draft: Optional[DraftSink] = None,
+    num_workers: Optional[int] = None,
+    stats: Optional[dict] = None,
+    stop_rules: Optional[StopRules] = None,
+    **build_kwargs,
+) -> Tuple[Optional[Dict[int, Dict[int, str]]], str, List[str]]:
+    """
+    Same inputs and return value as engine.solve(); stats are filled the same way, with
+    first_solution_seconds the end of phase 1. on_draft receives every stored schedule.
+    """
+    t0 = time.time()
+    lim = time_limit if time_limit > 0 else 300
+    on_draft = on_draft or (lambda *args: None)
+    built = build_model(residents, requirements_by_pgy, completions_by_resident, vacation_requests,
+                        cohort_defs=cohort_defs, **build_kwargs)
+    build_seconds = time.time() - t0
+    formulation = build_kwargs.get("formulation", "grid")
+    workers = {"num_workers": num_workers} if num_workers else None
+
+    # Phase 1: feasibility only
+    feasibility = built.model.Clone()
+    feasibility.ClearObjective()
+    solver, solver_params = tuned_solver(len(residents), formulation, workers)
+    solver.parameters.max_time_in_seconds = float(max(1.0, lim * FEASIBILITY_SHARE))
+    for name, value in FEASIBILITY_PARAMS.items():
+        setattr(solver.parameters, name, value)
+    if random_seed is not None:
+        solver.parameters.random_seed = random_seed
+    search_log = SearchLog(solver) if stats is not None else None
+    status = solver.Solve(feasibility)
+    effort = response_stats(solver)
+    first_seconds = round(time.time() - t0, 3)
+    timing = {
+        "build_seconds": round(build_seconds, 3),
+        "presolve_seconds": search_log.presolve_seconds if search_log else None,
+        "first_solution_seconds": first_seconds if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+    }
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if stats is not None:
+            stats.update({"curve": [], "objective": None, "best_bound": None, "status": solver.StatusName(status),
+                          "stop_reason": stop_reason(solver, status, None, False),
+                          "solve_seconds": round(time.time() - t0 - build_seconds, 3), **timing, **effort})
+        return None, solver.StatusName(status), [solver.StatusName(status)]
+    first = built.read(solver.Value)
+    on_draft(built.extract(first), None, first_seconds, "feasibility")
+
+    # Phase 2: optimize from the first schedule
+    for key, var in built.distinct():
+        built.model.AddHint(var, first[key])
+    solver, solver_params = tuned_solver(len(residents), formulation, workers)
+    solver.parameters.max_time_in_seconds = float(max(1.0, lim - (time.time() - t0)))
+    if random_seed is not None:
+        solver.parameters.random_seed = random_seed
+    stopper = Stopper(solver, DEFAULT_STOP_RULES if stop_rules is None else stop_rules, clean=built.penalty)
+    drafts = DraftCallback(built, on_draft, offset=time.time() - t0, stopper=stopper)
+    with stopper:
+        status = solver.Solve(built.model, drafts)
+    drafts.flush()
+    for key, n in response_stats(solver).items():
+        effort[key] = round(effort[key] + n, 3)
+
+    reason = stop_reason(solver, status, stopper, bool(drafts.points))
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        assignments = built.extract(built.read(solver.Value))
+        final_status = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
+        objective, bound = solver.ObjectiveValue(), solver.BestObjectiveBound()
+    else:
+        # Phase 2 found nothing better than the hint in time: the first schedule stands
+        assignments, final_status, objective, bound = built.extract(first), "FEASIBLE", None, None
+    if stats is not None:
+        stats.update({
+            "curve": drafts.points,
+            "objective": objective,
+            "best_bound": bound,
+            "status": final_status,
+            "stop_reason": reason,
+            "solve_seconds": round(time.time() - t0 - build_seconds, 3),
+            **timing,
+            "solver_params": solver_params,
+            **effort,
+        })
+    return assignments, final_status, []
@@ -0,0 +1,87 @@
+"""
+Per-year change feed over schedule_versions.
+
+Every write path records its cell delta with versions.record(), so a year's version ids are a
+monotonic sequence of cell changes. changes_since() folds the versions after a sequence
+number into one net patch ([[resident_id, week, old, new], ...], first old and last new per
+cell); a client that holds the grid as of seq applies it instead of reloading the year.
+A patch is replaced by reset=True when the client must reload: it spans a baseline or
+imported-backup version (a grid with no delta), or it is larger than MAX_PATCH_CELLS.
+
+Push: versions.bump() marks the session's year as changed, and after that transaction
+commits the year's in-memory counter advances. Stream handlers poll the counter (no
+database access) and read the feed only when it moves; they also re-read every
+POLL_SECONDS to pick up writes from other processes.
+"""
+import json
+import threading
+from typing import Dict, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import ScheduleVersion
+
+MAX_PATCH_CELLS = 1000
+POLL_SECONDS = 5.0
+SNAPSHOT_ONLY = ("baseline", "backup")  # versions that set a grid without a delta from their parent
+
+_counters: Dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def mark(db: Session, year_id: int) -> None:
+    """Notify stream listeners of year_id once db's current transaction commits."""
+    db.info.setdefault("changed_years", set()).add(year_id)
+
+
+def notify(year_ids: Iterable[int]) -> None:
+    with _lock:
+        for y in year_ids:
+            _counters[y] = _counters.get(y, 0) + 1
+
+
+def counter(year_id: int) -> int:
+    with _lock:
+        return _counters.get(year_id, 0)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    years = session.info.pop("changed_years", None)
+    if years:
+        notify(years)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("changed_years", None)
+
+
+def latest_seq(db: Session, year_id: int) -> int:
+    row = db.query(ScheduleVersion.id).filter(ScheduleVersion.year_id == year_id) \
+        .order_by(ScheduleVersion.id.desc()).first()
+    return row[0] if row else 0
+
+
+def changes_since(db: Session, year_id: int, since: int) -> dict:
+    """{"seq", "reset", "changes"}: the net cell patch from sequence number since to seq."""
+    rows = db.query(ScheduleVersion.id, ScheduleVersion.source, ScheduleVersion.delta_json).filter(
+        ScheduleVersion.year_id == year_id,
+        ScheduleVersion.id > since,
+    ).order_by(ScheduleVersion.id).all()
+    if not rows:
+        seq = latest_seq(db, year_id)
+        # A seq past the year's last version comes from another database state
+        return {"seq": seq, "reset": since > seq, "changes": []}
+    seq = rows[-1][0]
+    net: Dict[tuple, list] = {}
+    for _, source, delta_json in rows:
+        if source in SNAPSHOT_ONLY:
+            return {"seq": seq, "reset": True, "changes": []}
+        for rid, w, old, new in json.loads(delta_json):
+            cell = net.setdefault((rid, w), [rid, w, old, new])
+            cell[3] = new
+        if len(net) > MAX_PATCH_CELLS:
+            return {"seq": seq, "reset": True, "changes": []}
+    return {"seq": seq, "reset": False, "changes": [c for c in net.values() if c[2] != c[3]]}
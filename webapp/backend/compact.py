@@ -0,0 +1,68 @@
+"""
+Compact columnar payloads for the schedule grid and remaining-requirements views.
+
+The nested /assignments JSON repeats a rotation string per cell and /remaining one object
+per resident and category. The compact form sends each string once:
+
+  grid:      {"codes": [codebook], "residents": [ids], "weeks": 52,
+              "cells": [flat resident-major array of codebook indices, 0 = empty]}
+  remaining: {"residents": [ids], "categories": [...],
+              "required": [[per category] per resident], "completed": [...]}  (null = no row)
+
+Cell of resident i, week w is cells[i * weeks + w - 1]. Responses are serialized with orjson
+when it is installed (stdlib json otherwise); gzip is applied by the app middleware.
+"""
+import json
+from typing import Iterable, List, Optional
+
+from fastapi.responses import Response
+
+from versions import Grid
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used when missing
+    orjson = None
+
+WEEKS = 52
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def json_response(payload, headers: Optional[dict] = None) -> Response:
+    return Response(content=dumps(payload), media_type="application/json", headers=headers)
+
+
+def codebook(grids: Iterable[Grid]) -> List[str]:
+    """Sorted distinct rotation codes of the grids, after "" (index 0, the empty cell)."""
+    return [""] + sorted({code for grid in grids for code in grid.values() if code})
+
+
+def pack_grid(grid: Grid, resident_ids: List[int], codes: List[str]) -> dict:
+    index = {code: i for i, code in enumerate(codes)}
+    row = {rid: i for i, rid in enumerate(resident_ids)}
+    cells = [0] * (len(resident_ids) * WEEKS)
+    for (rid, w), code in grid.items():
+        i = row.get(rid)
+        if i is not None and 1 <= w <= WEEKS:
+            cells[i * WEEKS + w - 1] = index[code]
+    return {"residents": resident_ids, "weeks": WEEKS, "cells": cells}
+
+
+def pack_remaining(rows: List[dict], resident_ids: List[int]) -> dict:
+    """Matrix form of get_remaining_requirements() rows; remaining is max(0, required - completed)."""
+    categories = sorted({r["category"] for r in rows})
+    col = {c: j for j, c in enumerate(categories)}
+    row = {rid: i for i, rid in enumerate(resident_ids)}
+    required: List[List[Optional[int]]] = [[None] * len(categories) for _ in resident_ids]
+    completed: List[List[Optional[int]]] = [[None] * len(categories) for _ in resident_ids]
+    for r in rows:
+        i = row.get(r["resident_id"])
+        if i is not None:
+            required[i][col[r["category"]]] = r["required"]
+            completed[i][col[r["category"]]] = r["completed"]
+    return {"residents": resident_ids, "categories": categories, "required": required, "completed": completed}
@@ -1,6 +1,6 @@
 """Database setup for SQLite (MVP)."""
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 import sys
@@ -34,6 +34,14 @@ engine = create_engine(
     echo=False,
 )
 
+
+
+@event.listens_for(engine, "connect")
+def _enable_foreign_keys(dbapi_conn, _):
+    # SQLite enforces foreign keys (and their ON DELETE actions) only when each connection asks
+    dbapi_conn.execute("PRAGMA foreign_keys=ON")
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -0,0 +1,164 @@
+"""
+Per-cell domain reduction: the rotations each (resident, week) cell may take.
+
+Every single-cell rule of the engine (TY / anesthesia / neurology restrictions, interns off
+Team G and Geriatrics, ICU H outside the holidays, PGY2 week 1, Ramirez, no ED in July,
+forced anesthesia weeks, hard vacation locks, cohort clinic weeks, holiday-week rotations,
+teams without a coverage rule) is applied here once, before the model is built. build_model()
+creates each cell with only its allowed values and skips indicator literals for values a
+cell cannot take. The removed values keep the rule labels that removed them, which answers
+"why can't this resident do X in week Y" without a solve. Partial regeneration freezes cells
+the same way: a frozen cell's only value is the rotation it already holds.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+HOLIDAY_WEEKS = (26, 27)
+ANESTHESIA_WEEKS = range(49, 53)
+# Stands in for a frozen cell whose code the engine does not schedule (or an empty cell):
+# no coverage rule or requirement counts it
+FROZEN = "FROZEN"
+
+
+@dataclass
+class CellDomains:
+    rot_codes: List[str]
+    # (r, w) -> {rotation index: [labels of the rules that remove it]}
+    removed: Dict[Tuple[int, int], Dict[int, List[str]]] = field(default_factory=dict)
+
+    @property
+    def full(self) -> FrozenSet[int]:
+        return frozenset(range(len(self.rot_codes)))
+
+    def allowed(self, r: int, w: int) -> FrozenSet[int]:
+        return self.full - set(self.removed.get((r, w), {}))
+
+    def by_label(self, r: int, w: int) -> Dict[str, FrozenSet[int]]:
+        """Rule label -> every value that rule removes from the cell."""
+        out: Dict[str, set] = {}
+        for idx, labels in self.removed.get((r, w), {}).items():
+            for label in labels:
+                out.setdefault(label, set()).add(idx)
+        return {label: frozenset(v) for label, v in out.items()}
+
+    def why(self, r: int, w: int, code: str) -> List[str]:
+        """Labels of the rules that keep resident r off rotation code in week w ([] if allowed)."""
+        if code not in self.rot_codes:
+            return [f"{code} is not a schedulable rotation"]
+        return list(self.removed.get((r, w), {}).get(self.rot_codes.index(code), []))
+
+    def stats(self) -> dict:
+        n = len(self.rot_codes)
+        sizes = [n - len(cell) for cell in self.removed.values()]
+        return {"reduced_cells": len(sizes), "fixed_cells": sizes.count(1), "empty_cells": sizes.count(0),
+                "values_removed": len(sizes) * n - sum(sizes)}
+
+
+def cell_domains(
+    residents: List[dict],
+    rot_codes: List[str],
+    floor_codes: Sequence[str],
+    uncovered_codes: Sequence[str],
+    vacation_requests: List[dict],
+    cohort_defs: Optional[List[dict]] = None,
+    july_weeks: Optional[List[int]] = None,
+    ramirez_until_week: int = 7,
+    weeks: Sequence[int] = range(1, 53),
+    frozen: Optional[Dict[Tuple[int, int], Optional[str]]] = None,
+) -> CellDomains:
+    """
+    Apply the engine's single-cell rules. Arguments are build_model()'s; floor_codes are the
+    floor teams with a coverage rule and uncovered_codes the teams (A-D, G) without one.
+    Rule labels match the engine's hard-rule families (see diagnose_infeasibility).
+    frozen: {(resident_id, week): code} cells fixed to their code, or to FROZEN (which must
+    then be in rot_codes) when the engine has no such code; FROZEN is banned everywhere else.
+    """
+    july_weeks = july_weeks or [1, 2, 3, 4]
+    idx = {c: i for i, c in enumerate(rot_codes)}
+    full = set(range(len(rot_codes)))
+    dom = CellDomains(rot_codes=rot_codes)
+
+    def ban(r, w, codes, label):
+        cell = dom.removed.setdefault((r, w), {})
+        for c in codes:
+            cell.setdefault(idx[c], []).append(label)
+
+    def only(r, w, codes, label):
+        cell = dom.removed.setdefault((r, w), {})
+        for i in full - {idx[c] for c in codes}:
+            cell.setdefault(i, []).append(label)
+
+    def nm(r):
+        return residents[r].get("name") or f"resident {residents[r]['id']}"
+
+    # Floors, ICU and nights: the coverage rotations (PGY2s start them from week 2)
+    essential = list(floor_codes) + ["G", "NF", "SWING", "ICU", "ICU N"]
+    holiday_ok = essential + ["CLINIC", "CLINIC *", "TY CLINIC", "ICU H"]
+
+    for r, res in enumerate(residents):
+        pgy = res.get("pgy")
+        track = (res.get("track") or "").lower()
+        is_ty = pgy == "TY" or res.get("is_ty", False)
+        cj = res.get("constraints_json") or {}
+        until = cj.get("no_cardio_before_week", ramirez_until_week)
+        for w in weeks:
+            for code in uncovered_codes:
+                ban(r, w, [code], f"Team {code} not in coverage rules")
+            if res.get("is_intern"):
+                ban(r, w, ["G"], "interns off Team G")
+                ban(r, w, ["GERIATRICS"], "interns off GERIATRICS")
+            if not is_ty:
+                ban(r, w, ["TY CLINIC"], "TY CLINIC for TYs only")
+            if not (is_ty and track == "anesthesia"):
+                ban(r, w, ["GEN SURG"], "GEN SURG for anesthesia TYs only")
+            if is_ty:
+                ban(r, w, ["CLINIC", "CLINIC *"], "TYs off IM clinic")
+                if track != "neurology":
+                    ban(r, w, ["NEURO"], "NEURO for neurology TYs only")
+                if track == "anesthesia" and w in ANESTHESIA_WEEKS:
+                    only(r, w, ["ELECTIVE"], f"{nm(r)} anesthesia weeks 49-52")
+            if w in july_weeks:
+                ban(r, w, ["ED"], "no ED in July")
+            if pgy == "PGY1" and not res.get("is_ty", False) and w <= until:
+                ban(r, w, ["CARDIO"], f"{nm(r)} no CARDIO before week {until}")
+            if pgy == "PGY2" and w == 1:
+                ban(r, w, essential, "PGY2 week-1 exclusion")
+            if w in HOLIDAY_WEEKS:
+                only(r, w, holiday_ok, f"holiday week {w} rotations")
+            else:
+                ban(r, w, ["ICU H"], "ICU H on holiday weeks only")
+
+    # Hard vacation locks (ignored on holiday weeks)
+    by_id = {res["id"]: r for r, res in enumerate(residents)}
+    for vreq in vacation_requests:
+        r = by_id.get(vreq["resident_id"])
+        if r is None:
+            continue
+        for start, length in vreq.get("hard_locks", []):
+            for w in range(start, start + length):
+                if w in weeks and w not in HOLIDAY_WEEKS:
+                    only(r, w, ["VACATION"], f"{nm(r)} vacation lock weeks {start}-{start + length - 1}")
+
+    # Cohort clinic weeks: every non-TY member is in IM clinic
+    for cd in cohort_defs or []:
+        cname = cd.get("name") or f"cohort {cd['cohort_id']}"
+        members = [r for r, res in enumerate(residents)
+                   if res.get("cohort_id") == cd["cohort_id"] and not res.get("is_ty")]
+        for w in cd.get("clinic_weeks") or []:
+            if w in weeks and w not in HOLIDAY_WEEKS:
+                for r in members:
+                    only(r, w, ["CLINIC", "CLINIC *"], f"{cname} clinic week {w}")
+
+    # Frozen cells keep what they hold, whatever the rules above say: the past is not re-solved
+    kept = {}
+    for (rid, w), code in (frozen or {}).items():
+        if rid in by_id and w in weeks:
+            kept[(by_id[rid], w)] = idx[code] if code in idx else idx[FROZEN]
+    if FROZEN in idx:
+        for r in range(len(residents)):
+            for w in weeks:
+                if (r, w) not in kept:
+                    ban(r, w, [FROZEN], "FROZEN for frozen cells only")
+    for (r, w), i in kept.items():
+        dom.removed[(r, w)] = {j: ["frozen cells"] for j in full - {i}}
+    return dom
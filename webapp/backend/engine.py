@@ -1,7 +1,18 @@
 """OR-Tools CP-SAT scheduling engine for resident-dependent schedules."""
+import time
+from dataclasses import dataclass, field, replace
 from typing import Dict, List, Optional, Tuple
 from ortools.sat.python import cp_model
 
+# Coverage rules are compiled by the workbook package at the repo root (the entry point puts
+# the root on sys.path)
+from scheduler.coverage import DEFAULT_RULES, compile_rules, emit_coverage, extra_floor_codes
+from scheduler.solver_profiles import apply_profile, deterministic_params, reproducibility, set_params
+from scheduler.stopping import DEFAULT_STOP_RULES, Stopper, StopRules
+from rotation_catalog import get_catalog
+from domains import FROZEN, cell_domains
+import governor
+
 # Rotation indices — SIMPLIFIED to only allowed rotations
 ROT_CODES = [
     "A", "B", "C", "D", "G",
@@ -61,7 +72,165 @@ def _indicator_in(model, var, idx_list, name=""):
     return b
 
 
-def solve(
+@dataclass
+class BuiltModel:
+    """A CP-SAT model built by build_model(), with handles the solve drivers need."""
+    model: cp_model.CpModel
+    assign: Dict[Tuple[int, int], cp_model.IntVar]
+    residents: List[dict]
+    weeks: List[int]
+    # Objective terms attributable to one resident (requirement deficits, staggering, holiday work)
+    penalty_by_resident: Dict[int, list] = field(default_factory=dict)
+    # Hard-rule family label -> enforcement literal (only when built with diagnose=True)
+    guards: Dict[str, cp_model.IntVar] = field(default_factory=dict)
+    # Rotation code per index: ROT_CODES plus any extra floor teams from the coverage rules
+    rot_codes: List[str] = field(default_factory=lambda: list(ROT_CODES))
+    # The objective without rotation changes (None if it has no penalty terms); 0 = a clean schedule
+    penalty: Optional[cp_model.LinearExpr] = None
+    # Partial regeneration: (resident_id, week) -> the code the cell keeps (None = stays empty)
+    frozen: Dict[Tuple[int, int], Optional[str]] = field(default_factory=dict)
+
+    def distinct(self):
+        """(cell, variable) once per decision variable; tied block weeks share one (block_weeks=2)."""
+        seen = set()
+        for key, var in self.assign.items():
+            if var.Index() not in seen:
+                seen.add(var.Index())
+                yield key, var
+
+    def read(self, value) -> Dict[Tuple[int, int], int]:
+        """Rotation index per (r, w), using value(var) from a solver or solution callback."""
+        return {key: int(value(var)) for key, var in self.assign.items()}
+
+    def extract(self, cells: Dict[Tuple[int, int], int]) -> Dict[int, Dict[int, str]]:
+        """Convert read() output to {resident_id: {week: rotation_code}}; frozen cells keep their own code."""
+        out = {}
+        for r, res in enumerate(self.residents):
+            out[res["id"]] = {w: self.rot_codes[cells[(r, w)]] for w in self.weeks}
+        for (rid, w), code in self.frozen.items():
+            if rid in out:
+                if code:
+                    out[rid][w] = code
+                else:
+                    out[rid].pop(w, None)
+        return out
+
+
+class ObjectiveCurve(cp_model.CpSolverSolutionCallback):
+    """Records (elapsed_seconds, objective) for every improving solution and reports it to stopper."""
+
+    def __init__(self, offset: float = 0.0, stopper: Optional[Stopper] = None):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._start = time.time()
+        self._offset = offset
+        self._stopper = stopper
+        self.points: List[Tuple[float, float]] = []
+
+    def on_solution_callback(self):
+        elapsed = round(self._offset + time.time() - self._start, 3)
+        self.points.append((elapsed, self.ObjectiveValue()))
+        print(f"Solution {len(self.points)} found at {elapsed}s: objective value = {self.ObjectiveValue()}")
+        if self._stopper is not None:
+            self._stopper.on_solution(self)
+
+
+def stop_reason(solver: cp_model.CpSolver, status, stopper: Optional[Stopper], found: bool) -> str:
+    """Why a finished Solve() stopped (stopper None: it ran without rules); found = it reported a solution."""
+    stopper = stopper or Stopper(solver, None)
+    if not found:
+        return stopper.reason(solver.StatusName(status), None, None)
+    return stopper.reason(solver.StatusName(status), solver.ObjectiveValue(), solver.BestObjectiveBound())
+
+
+class SearchLog:
+    """Reads the presolve time off CP-SAT's search log ("Starting search at 1.23s")."""
+
+    def __init__(self, solver: cp_model.CpSolver):
+        self.presolve_seconds: Optional[float] = None
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self._line
+
+    def _line(self, line: str):
+        if self.presolve_seconds is None and line.startswith("Starting search at "):
+            self.presolve_seconds = float(line.split()[3].rstrip("s"))
+
+
+def response_stats(solver: cp_model.CpSolver) -> dict:
+    """Search effort counters of the last Solve()."""
+    return {
+        "num_branches": solver.NumBranches(),
+        "num_conflicts": solver.NumConflicts(),
+        "deterministic_time": round(solver.deterministic_time, 3),
+    }
+
+
+def _cell_domains(residents, rot_codes, plans, vacation_requests, cohort_defs, july_weeks, ramirez_until_week,
+                  frozen=None):
+    covered = {rot_codes[i] for p in plans for i in p.idx}
+    return cell_domains(
+        residents, rot_codes,
+        floor_codes=[p.codes[0] for p in plans if p.kind == "floor"],
+        uncovered_codes=[c for c in ["A", "B", "C", "D", "G"] if c not in covered],
+        vacation_requests=vacation_requests, cohort_defs=cohort_defs,
+        july_weeks=july_weeks, ramirez_until_week=ramirez_until_week, frozen=frozen,
+    )
+
+
+def _frozen_credit(completions_by_resident, frozen, rot_codes):
+    """
+    Completions plus the requirement weeks of frozen cells the model holds as FROZEN (codes the
+    engine does not schedule), which the requirement rows cannot count themselves.
+    """
+    held = {}
+    for (rid, _), code in frozen.items():
+        if code and code not in rot_codes:
+            held.setdefault(rid, []).append(code)
+    out = {rid: dict(comp) for rid, comp in completions_by_resident.items()}
+    for rid, codes in held.items():
+        comp = out.setdefault(rid, {})
+        for cat, n in get_catalog().credit_tally(codes).items():
+            comp[cat] = comp.get(cat, 0) + n
+    return out
+
+
+def _block_ties(residents, domains, vacation_requests, weeks) -> set:
+    """
+    Cells (r, w) that take week w-1's variable in two-week block mode: the second week of each
+    block (1-2, 3-4, ..., 51-52) unless the single-cell rules differ between the two weeks
+    (holiday weeks 26/27, cohort clinic weeks, PGY2 week 1, locks, ...) or one of the
+    resident's vacation options starts mid-block.
+    """
+    by_id = {res["id"]: r for r, res in enumerate(residents)}
+    split = set()  # (r, first week of a block) left week by week
+    for vreq in vacation_requests:
+        r = by_id.get(vreq["resident_id"])
+        if r is None:
+            continue
+        for start in vreq.get("block_a_options", []) + vreq.get("block_b_options", []):
+            if start % 2 == 0:
+                split.update({(r, start - 1), (r, start + 1)})
+    return {(r, w + 1) for r in range(len(residents)) for w in weeks[::2]
+            if w + 1 in weeks and (r, w) not in split and domains.allowed(r, w) == domains.allowed(r, w + 1)}
+
+
+def compile_domains(
+    residents: List[dict],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    coverage_rules: Optional[List] = None,
+    july_weeks: List[int] = None,
+    ramirez_until_week: int = 7,
+    **_,
+):
+    """The per-cell domains build_model() would use, without building the model. Accepts solve() kwargs."""
+    coverage_rules = coverage_rules or DEFAULT_RULES
+    rot_codes = ROT_CODES + extra_floor_codes(coverage_rules, ROT_CODES)
+    plans = compile_rules(coverage_rules, {c: i for i, c in enumerate(rot_codes)})
+    return _cell_domains(residents, rot_codes, plans, vacation_requests, cohort_defs, july_weeks, ramirez_until_week)
+
+
+def build_model(
     residents: List[dict],
     requirements_by_pgy: Dict[str, List[dict]],
     completions_by_resident: Dict[int, Dict[str, int]],
@@ -69,19 +238,45 @@ def solve(
     cohort_defs: List[dict] = None,
     july_weeks: List[int] = None,
     ramirez_until_week: int = 7,
-    time_limit: int = 300,
-    random_seed: Optional[int] = None,
     relax_vacation_blocks: bool = False,
     relax_geriatrics_coverage: bool = False,
-) -> Tuple[Optional[Dict[int, Dict[int, str]]], str, List[str]]:
+    coverage_rules: Optional[List] = None,
+    diagnose: bool = False,
+    block_weeks: int = 1,
+    formulation: str = "grid",
+    family_change_weight: int = 0,
+    frozen: Optional[Dict[Tuple[int, int], Optional[str]]] = None,
+) -> BuiltModel:
     """
-    residents: [{id, name, pgy, is_senior, is_intern, cohort_id, constraints_json}]
-    requirements_by_pgy: {pgy: [{category, required_weeks, counts_as}]}
-    completions_by_resident: {resident_id: {category: weeks}}
-    vacation_requests: [{resident_id, start_week, length_weeks, hard_lock}]
-    cohort_defs: [{cohort_id, clinic_weeks}]
+    Build the full CP-SAT model without solving it. Arguments are the same as solve().
+    diagnose=True guards every hard-rule family with an enforcement literal (see diagnose_infeasibility).
+    block_weeks=2 assigns rotations per 2-week block: both weeks of a block share one variable,
+    except where the week-level rules need them apart (see _block_ties). Ignored with diagnose.
+    formulation="interval" builds the cells from rotation blocks (interval_engine.py) instead
+    of one variable per cell; the other rules are the same.
+    family_change_weight adds that cost to each rotation change that is not a floor team swap.
+    frozen ({(resident_id, week): code or None}) keeps those cells as they are (partial
+    regeneration): a cell holding an engine code is fixed to it; any other code, or an empty
+    cell, becomes FROZEN, which no rule covers or counts, and its requirement weeks are
+    credited to completions. Rules spanning frozen and free weeks still see the whole year.
     """
+    if block_weeks not in (1, 2):
+        raise ValueError(f"block_weeks must be 1 or 2, not {block_weeks}")
+    if formulation not in ("grid", "interval"):
+        raise ValueError(f"formulation must be 'grid' or 'interval', not {formulation!r}")
+    if formulation == "interval" and (diagnose or block_weeks != 1 or frozen):
+        raise ValueError("the interval formulation has no diagnose, block or partial mode")
     july_weeks = july_weeks or [1, 2, 3, 4]
+    coverage_rules = coverage_rules or DEFAULT_RULES
+    # Extra floor teams (FLOOR_E, ...) get codes after the fixed ones
+    rot_codes = ROT_CODES + extra_floor_codes(coverage_rules, ROT_CODES)
+    frozen = frozen or {}
+    if any(code not in rot_codes for code in frozen.values()):
+        completions_by_resident = _frozen_credit(completions_by_resident, frozen, rot_codes)
+        rot_codes = rot_codes + [FROZEN]
+    rot_idx = {c: i for i, c in enumerate(rot_codes)}
+    plans = compile_rules(coverage_rules, rot_idx)
+    floor_teams = [p.idx[0] for p in plans if p.kind == "floor"]
     model = cp_model.CpModel()
     N = len(residents)
     weeks = list(range(1, 53))
@@ -97,52 +292,125 @@ def solve(
     total_deficit = []
     together_bonus = []
     change_cost = []
+    penalty_by_resident = {}
+
+    def add_penalty(term, r):
+        total_deficit.append(term)
+        penalty_by_resident.setdefault(r, []).append(term)
+
+    guards = {}
+    # Partial regeneration: a hard rule over frozen cells (and constants) only cannot be repaired,
+    # since the kept weeks may already break it, so it is switched off
+    lit_false, lit_true = model.NewConstant(0), model.NewConstant(1)
+    kept_vars = {lit_false.Index(), lit_true.Index()}
+
+    def hard(ct, family):
+        """Tag a hard constraint with its rule family; in diagnose mode the family's literal enforces it."""
+        if frozen and kept_vars.issuperset(ct.proto.linear.vars):
+            ct.OnlyEnforceIf(lit_false)
+            return ct
+        if diagnose:
+            if family not in guards:
+                guards[family] = model.NewBoolVar(f"guard_{len(guards)}")
+            ct.OnlyEnforceIf(guards[family])
+        return ct
+
+    def nm(r):
+        return residents[r].get("name") or f"resident {residents[r]['id']}"
     
+    # Single-cell rules become variable domains; singleton cells are fixed outright.
+    # In diagnose mode (or if a cell has no value left) they are posted as guarded constraints instead.
+    domains = _cell_domains(residents, rot_codes, plans, vacation_requests, cohort_defs, july_weeks, ramirez_until_week,
+                            frozen)
+    frozen_cells = {(r, w) for r, res in enumerate(residents) for w in weeks if (res["id"], w) in frozen}
+    tied = _block_ties(residents, domains, vacation_requests, weeks) if block_weeks == 2 and not diagnose else set()
     assign = {}
-    for r in range(N):
+    cell_dom = {}
+    cells = None
+    if formulation == "interval":
+        from interval_engine import interval_cells
+        cells = interval_cells(model, residents, weeks, domains, rot_codes, [rot_codes[i] for i in floor_teams])
+        assign, cell_dom = cells.assign, cells.domains
+    for r in range(N if cells is None else 0):
         for w in weeks:
-            assign[(r, w)] = model.NewIntVar(0, N_ROT - 1, f"a_{r}_{w}")
+            if (r, w) in tied:
+                assign[(r, w)], cell_dom[(r, w)] = assign[(r, w - 1)], cell_dom[(r, w - 1)]
+                continue
+            allowed = domains.allowed(r, w)
+            if (r, w) in frozen_cells:
+                # Fixed in diagnose mode too: the kept weeks are not a rule a diagnosis could relax
+                cell_dom[(r, w)] = allowed
+                assign[(r, w)] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted(allowed)), f"a_{r}_{w}")
+                kept_vars.add(assign[(r, w)].Index())
+                continue
+            if allowed and not diagnose:
+                cell_dom[(r, w)] = allowed
+                assign[(r, w)] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted(allowed)), f"a_{r}_{w}")
+                continue
+            cell_dom[(r, w)] = domains.full
+            assign[(r, w)] = model.NewIntVar(0, len(rot_codes) - 1, f"a_{r}_{w}")
+            for label, values in domains.by_label(r, w).items():
+                keep = cp_model.Domain.FromValues(sorted(domains.full - values))
+                hard(model.AddLinearExpressionInDomain(assign[(r, w)], keep), label)
 
+    # Indicator literals are cached per variable, so tied block weeks share them too
     is_on = {}
 
     def get_ind(r, w, idx):
-        key = (r, w, idx)
+        key = (assign[(r, w)].Index(), idx)
         if key not in is_on:
-            is_on[key] = _indicator(model, assign[(r, w)], idx, "")
+            dom = cell_dom[(r, w)]
+            if idx not in dom:
+                is_on[key] = lit_false
+            elif len(dom) == 1:
+                is_on[key] = lit_true
+            elif cells is not None:
+                is_on[key] = cells.literal(r, w, idx)
+            else:
+                is_on[key] = _indicator(model, assign[(r, w)], idx, "")
         return is_on[key]
 
     def get_ind_set(r, w, idx_list, tag=""):
-        key = (r, w, tuple(idx_list))
+        key = (assign[(r, w)].Index(), tuple(idx_list))
         if key not in is_on:
-            is_on[key] = _indicator_in(model, assign[(r, w)], idx_list, f"{tag}_{r}_{w}")
+            dom = cell_dom[(r, w)]
+            live = [i for i in idx_list if i in dom]
+            if not live:
+                is_on[key] = lit_false
+            elif len(live) == len(dom):
+                is_on[key] = lit_true
+            elif cells is not None:
+                is_on[key] = cells.literal(r, w, live[0]) if len(live) == 1 else cells.literal_in(r, w, live)
+            else:
+                is_on[key] = _indicator_in(model, assign[(r, w)], live, f"{tag}_{r}_{w}")
         return is_on[key]
 
     # 1. Vacation: 4 weeks per resident, STRICTLY in two 2-week blocks (non-negotiable).
     for r in range(N):
         vac_bools = [get_ind(r, w, IDX_VAC) for w in weeks]
-        model.Add(sum(vac_bools) == 4)
+        hard(model.Add(sum(vac_bools) == 4), f"{nm(r)} vacation 2+2 blocks")
         # No isolated 1-week vacations. Forces blocks of 2+ weeks.
         for w in range(52):
             if w == 0:
-                model.Add(vac_bools[0] <= vac_bools[1])
+                hard(model.Add(vac_bools[0] <= vac_bools[1]), f"{nm(r)} vacation 2+2 blocks")
             elif w == 51:
-                model.Add(vac_bools[51] <= vac_bools[50])
+                hard(model.Add(vac_bools[51] <= vac_bools[50]), f"{nm(r)} vacation 2+2 blocks")
             else:
-                model.Add(vac_bools[w] <= vac_bools[w-1] + vac_bools[w+1])
+                hard(model.Add(vac_bools[w] <= vac_bools[w-1] + vac_bools[w+1]), f"{nm(r)} vacation 2+2 blocks")
         # Prevent 3-week or 4-week blocks — force exactly 2+2 split
         for w in range(50):
-            model.Add(sum(vac_bools[w:w+3]) <= 2)
+            hard(model.Add(sum(vac_bools[w:w+3]) <= 2), f"{nm(r)} vacation 2+2 blocks")
 
         # Soft preference for vacation separation: Try to keep at least 8 weeks between blocks.
         for s in range(52 - 9):
             excess_vac = model.NewBoolVar(f"vac_gap_exc_{r}_{s}")
             # If > 2 weeks in a 10-week window, penalize
             model.Add(sum(vac_bools[s:s + 10]) >= 3).OnlyEnforceIf(excess_vac)
-            total_deficit.append(excess_vac * 500000)
+            add_penalty(excess_vac * 500000, r)
 
         # 1c. Holiday Lock (Hard)
-        model.Add(vac_bools[25] == 0) # Week 26
-        model.Add(vac_bools[26] == 0) # Week 27
+        hard(model.Add(vac_bools[25] == 0), "no vacation on holiday weeks")  # Week 26
+        hard(model.Add(vac_bools[26] == 0), "no vacation on holiday weeks")  # Week 27
 
     # 2. Vacation requests: Block A (2 options) + Block B (2 options); solver picks best fit.
     # Incoming interns (placeholders) have no requests—solver places their vacation freely.
@@ -153,17 +421,7 @@ def solve(
             continue
         vac_by_ri[ri] = vreq
 
-    for vreq in vacation_requests:
-        for start, length in vreq.get("hard_locks", []):
-            ri = next((i for i, res in enumerate(residents) if res["id"] == vreq["resident_id"]), None)
-            if ri is None:
-                continue
-            for w in range(start, start + length):
-                if 1 <= w <= 52:
-                    # BLOCK: vacation cannot be on holiday weeks
-                    if w in [26, 27]:
-                        continue
-                    model.Add(assign[(ri, w)] == IDX_VAC)
+    # Hard locks are fixed in the cell domains (domains.py)
 
     def add_block_options(ri, options, tag):
         """Constrain resident ri to take 2 weeks vacation in one of the given start-week options."""
@@ -178,78 +436,30 @@ def solve(
         
         opts = sorted(set(w for w in valid_opts if 1 <= w <= 51))
         choose = [model.NewBoolVar(f"vac_{tag}_opt{i}_{ri}") for i in range(len(opts))]
-        model.Add(sum(choose) == 1)
+        hard(model.Add(sum(choose) == 1), f"{nm(ri)} vacation Block {tag.upper()} options")
         for i, start in enumerate(opts):
             for w in range(start, min(start + 2, 53)):
                 if 1 <= w <= 52:
-                    model.Add(assign[(ri, w)] == IDX_VAC).OnlyEnforceIf(choose[i])
+                    hard(model.Add(assign[(ri, w)] == IDX_VAC), f"{nm(ri)} vacation Block {tag.upper()} options").OnlyEnforceIf(choose[i])
 
     if not relax_vacation_blocks:
         for ri, vreq in vac_by_ri.items():
             add_block_options(ri, vreq.get("block_a_options", []), "a")
             add_block_options(ri, vreq.get("block_b_options", []), "b")
 
-    # 3. Coverage (Strict Team Counts)
-    # 3. Coverage (Strict Team Counts)
-    for floor_idx in FLOOR_ABCD:
-        for w in weeks:
-            sr = [get_ind(r, w, floor_idx) for r in senior_idxs]
-            jr = [get_ind(r, w, floor_idx) for r in intern_idxs]
-            
-            if w in [26, 27]:
-                # Holiday: Support from PGY3s allowed to count toward "intern" slots
-                # if we have interns who are off.
-                model.Add(sum(sr) + sum(jr) == 3)
-                model.Add(sum(sr) >= 1)
-            else:
-                model.Add(sum(sr) == 1) # Exactly 1 senior per floor team
-                model.Add(sum(jr) == 2) # Exactly 2 interns per floor team
+    # 3. Coverage (Strict Team Counts), compiled from the year's coverage rules.
+    # Holiday weeks: each pool keeps its team size with seniors and interns interchangeable.
+    def cov_ind(r, w, idx, tag):
+        return get_ind(r, w, idx[0]) if len(idx) == 1 else get_ind_set(r, w, idx, tag)
 
-    for w in weeks:
-        # ICU Day
-        sr = [get_ind_set(r, w, ICU_DAY, "icu") for r in senior_idxs]
-        jr = [get_ind_set(r, w, ICU_DAY, "icu") for r in intern_idxs]
-        if w in [26, 27]:
-            model.Add(sum(sr) + sum(jr) == 4)
-            model.Add(sum(sr) >= 1)
-        else:
-            model.Add(sum(sr) == 2)
-            model.Add(sum(jr) == 2)
+    def g_reward(w, plan, active):
+        # Optional teams (Team G) are PREFERRED (rewarded) but can be turned off if seniors are capped.
+        total_deficit.append(active.Not() * 300000)
 
-    # Night shifts and special teams: ICU Night, NF, Swing, Team G
-    for w in weeks:
-        jr_nf = [get_ind(r, w, IDX_NF) for r in intern_idxs]
-        jr_icun = [get_ind(r, w, IDX_ICUN) for r in intern_idxs]
-        jr_swing = [get_ind(r, w, IDX_SWING) for r in intern_idxs]
-        
-        sr_nf = [get_ind(r, w, IDX_NF) for r in senior_idxs]
-        sr_icun = [get_ind(r, w, IDX_ICUN) for r in senior_idxs]
-        sr_swing = [get_ind(r, w, IDX_SWING) for r in senior_idxs]
-        sr_g = [get_ind(r, w, IDX_G) for r in senior_idxs]
+    emit_coverage(model, plans, senior_idxs, intern_idxs, cov_ind, exact=True, hard=hard, on_optional=g_reward)
 
-        if w in [26, 27]:
-            # Combined total for each team (usually 2 people)
-            model.Add(sum(jr_nf) + sum(sr_nf) == 2)
-            model.Add(sum(jr_icun) + sum(sr_icun) == 2)
-            model.Add(sum(jr_swing) + sum(sr_swing) == 2)
-            # FIX: Team G is NOT scheduled on holiday weeks.
-            model.Add(sum(sr_g) == 0)
-        else:
-            model.Add(sum(jr_nf) == 1)
-            model.Add(sum(jr_icun) == 1)
-            model.Add(sum(jr_swing) == 1)
-            model.Add(sum(sr_nf) == 1)
-            model.Add(sum(sr_icun) == 1)
-            model.Add(sum(sr_swing) == 1)
-            # FIX: Team G is PREFERRED (rewarded) but can be turned off if seniors are capped.
-            is_g_active = model.NewBoolVar(f"is_all_g_on_{w}")
-            model.Add(sum(sr_g) == is_g_active)
-            # 300k reward for having Team G active
-            total_deficit.append(is_g_active.Not() * 300000)
-
-        # No interns on Team G (Senior only)
-        jr_g = [get_ind(r, w, IDX_G) for r in intern_idxs]
-        model.Add(sum(jr_g) == 0)
+    # Floor teams and Team G without a coverage rule, and interns on Team G, are
+    # removed from the cell domains (domains.py)
 
     IDX_GERIATRICS = ROT_IDX["GERIATRICS"]
     IDX_NEURO = ROT_IDX["NEURO"]
@@ -269,91 +479,37 @@ def solve(
             model.Add(sum(sr_neuro_bools) == 0).OnlyEnforceIf(has_neuro.Not())
             total_deficit.append(has_neuro.Not() * 1000000)
 
-    for r in intern_idxs:
-        for w in weeks:
-            model.Add(assign[(r, w)] != IDX_G)
-
-    # 3b. Geriatrics: SENIORS ONLY (PGY2/PGY3). Interns cannot do Geriatrics.
-    IDX_GERI = ROT_IDX["GERIATRICS"]
-    for r in intern_idxs:
-        for w in weeks:
-            model.Add(assign[(r, w)] != IDX_GERI)
-
-    # FIX 1: TY CLINIC and GEN SURG restriction.
-    # GEN SURG is ONLY for TY Anesthesia.
-    # TY CLINIC is ONLY for TY residents.
-    # TY residents MUST NOT do regular IM CLINIC.
-    IDX_GEN_SURG = ROT_IDX["GEN SURG"]
-    for r in range(N):
-        res = residents[r]
-        pgy = res.get("pgy")
-        track = res.get("track") or ""
-        is_ty = (pgy == "TY" or res.get("is_ty", False))
-        is_ty_anesthesia = (is_ty and track == "anesthesia")
-
-        for w in weeks:
-            # 1a. TY CLINIC restriction
-            if not is_ty:
-                model.Add(assign[(r, w)] != IDX_TY_CLINIC)
-            
-            # 1b. GEN SURG restriction (ONLY for Anesthesia TYs)
-            # General Surgery is strictly for anesthesia track TYs per user rule.
-            if not is_ty_anesthesia:
-                model.Add(assign[(r, w)] != IDX_GEN_SURG)
-
-            # 1c. TYs cannot do standard IM CLINIC
-            if is_ty:
-                model.Add(assign[(r, w)] != ROT_IDX["CLINIC"])
-                model.Add(assign[(r, w)] != ROT_IDX["CLINIC *"])
+    # 3b. Geriatrics and Team G: SENIORS ONLY. TY CLINIC / GEN SURG / IM clinic restrictions,
+    # no ED in July, Ramirez and the PGY-2 delayed start are single-cell rules (domains.py).
 
-    # 4. ED: max 3, no one in July
+    # 4. ED: max 3 per week
     for w in weeks:
-        ed_all = [_indicator(model, assign[(r, w)], IDX_ED, "") for r in range(N)]
-        model.Add(sum(ed_all) <= 3)
-        if w in july_weeks:
-            model.Add(sum(ed_all) == 0)
-
-    # 5. Ramirez & PGY-2 Delayed Start
-    for r in range(N):
-        res = residents[r]
-        pgy = res["pgy"]
-        
-        # PGY-1 Ramirez Rule: No Cardio until mid-August
-        if pgy == "PGY1" and not res.get("is_ty", False):
-            cj = res.get("constraints_json") or {}
-            until = cj.get("no_cardio_before_week", ramirez_until_week)
-            for w in range(1, until + 1):
-                model.Add(assign[(r, w)] != IDX_CARDIO)
-        
-        # PGY-2 Delayed Start Rule: No Floors/ICU Week 1
-        if pgy == "PGY2":
-            for w in range(1, 2):
-                for idx in FLOOR_ABCD + [IDX_G, IDX_NF, IDX_SWING] + ICU_DAY + [IDX_ICUN]:
-                     model.Add(assign[(r, w)] != idx)
+        ed_all = [get_ind(r, w, IDX_ED) for r in range(N)]
+        hard(model.Add(sum(ed_all) <= 3), f"ED cap week {w}")
 
     # 6. ICU/Night caps: max 8 weeks/year, max 16 total, strictly max 2 consecutive
     ICU_TOTAL_IDX = ICU_DAY + [IDX_ICUN]
     for r in range(N):
         night_bools = [get_ind_set(r, w, NIGHT_IDX, "n") for w in weeks]
-        model.Add(sum(night_bools) <= 8)
+        hard(model.Add(sum(night_bools) <= 8), f"{nm(r)} night cap")
         prior_nights = completions_by_resident.get(residents[r]["id"], {}).get("NF", 0) + completions_by_resident.get(residents[r]["id"], {}).get("ICU_NIGHT", 0)
-        model.Add(prior_nights + sum(night_bools) <= 16)
+        hard(model.Add(prior_nights + sum(night_bools) <= 16), f"{nm(r)} night cap")
         
         # Max 2 consecutive nights (hard)
         for s in range(51):
-            model.Add(sum(night_bools[s:s+3]) <= 2)
+            hard(model.Add(sum(night_bools[s:s+3]) <= 2), f"{nm(r)} max 2 consecutive nights")
             
         # Max 2 consecutive ICU (hard)
         icu_bools = [get_ind_set(r, w, ICU_TOTAL_IDX, "icu_tot") for w in weeks]
         for s in range(51):
-            model.Add(sum(icu_bools[s:s+3]) <= 2)
+            hard(model.Add(sum(icu_bools[s:s+3]) <= 2), f"{nm(r)} max 2 consecutive ICU")
 
     # 6b. Max 4 consecutive FLOOR weeks (A/B/C/D/G/NF/SWING).
-    ALL_FLOOR_IDX = FLOOR_ABCD + [IDX_G, IDX_NF, IDX_SWING]
+    ALL_FLOOR_IDX = floor_teams + [IDX_G, IDX_NF, IDX_SWING]
     for r in range(N):
         floor_bools = [get_ind_set(r, w, ALL_FLOOR_IDX, "fl") for w in weeks]
         for s in range(49):  # 52 - 4 + 1
-            model.Add(sum(floor_bools[s:s + 5]) <= 4)
+            hard(model.Add(sum(floor_bools[s:s + 5]) <= 4), f"{nm(r)} max 4 consecutive floor weeks")
 
     # 6c. Max consecutive weeks on the SAME floor team (A, B, C, D, or G).
     # Team G (Seniors): STRICTLY 2 weeks max consecutively.
@@ -365,14 +521,14 @@ def solve(
         # TEAM G: Hard 2-week consecutive cap (User: "1 or 2 max consecutively")
         g_bools = [get_ind(r, w, IDX_G) for w in weeks]
         for s in range(50):
-            model.Add(sum(g_bools[s:s+3]) <= 2)
+            hard(model.Add(sum(g_bools[s:s+3]) <= 2), f"{nm(r)} max 2 consecutive Team G")
 
         # ABCD TEAMS (Hard Limits)
         limit = 2 if is_sr else 4
-        for team_idx in FLOOR_ABCD:
+        for team_idx in floor_teams:
             team_bools = [get_ind(r, w, team_idx) for w in weeks]
             for s in range(52 - limit):
-                model.Add(sum(team_bools[s:s + limit + 1]) <= limit)
+                hard(model.Add(sum(team_bools[s:s + limit + 1]) <= limit), f"{nm(r)} same-team consecutive cap")
 
     # 6d. STAGGER ELECTIVES & CLINIC
     # PGY1/2: Max 2-3 consecutive weeks of Electives.
@@ -391,22 +547,22 @@ def solve(
                 # Soft penalty for 3rd consecutive week (strong deterrent)
                 exc_3 = model.NewBoolVar(f"el_exc3_{r}_{s}")
                 model.Add(sum(el_bools[s:s+3]) >= 3).OnlyEnforceIf(exc_3)
-                total_deficit.append(exc_3 * 500000)
+                add_penalty(exc_3 * 500000, r)
                 # Stronger penalty for 4th consecutive
                 exc_4 = model.NewBoolVar(f"el_exc4_{r}_{s}")
                 model.Add(sum(el_bools[s:s+4]) >= 4).OnlyEnforceIf(exc_4)
-                total_deficit.append(exc_4 * 5000000)
+                add_penalty(exc_4 * 5000000, r)
 
     # 6e. STAGGER CLINIC: Hard limit 4, Soft limit 2.
     for r in range(N):
         clinic_bool_list = [get_ind_set(r, w, CLINIC_ALL_IDX, "cl") for w in weeks]
         for s in range(48): 
             # Hard limit 4 (Safety Net)
-            model.Add(sum(clinic_bool_list[s:s+5]) <= 4)
+            hard(model.Add(sum(clinic_bool_list[s:s+5]) <= 4), f"{nm(r)} max 4 clinic weeks in 5")
             # Soft penalty for 3rd consecutive week
             exc_3 = model.NewBoolVar(f"cl_exc3_{r}_{s}")
             model.Add(sum(clinic_bool_list[s:s+3]) >= 3).OnlyEnforceIf(exc_3)
-            total_deficit.append(exc_3 * 500000)
+            add_penalty(exc_3 * 500000, r)
 
     # 6f. Global Staggering Safety Net: STRICTLY 4 weeks max in any 5-week window.
     # Only applies to rotation categories NOT already capped above (Floors, Nights handled by 6b).
@@ -420,38 +576,43 @@ def solve(
         for idx in STAGGER_INDIVIDUAL_IDX:
             rot_bools = [get_ind(r, w, idx) for w in weeks]
             for s in range(48):
-                model.Add(sum(rot_bools[s:s+5]) <= 4)
-
-    # Block Stability: Soft preference for same rotation in consecutive weeks.
-    # SIMPLIFIED: just track changes in the objective, no intermediate variables.
-    # This massively reduces the model size and speeds up solving.
-    change_cost = []
+                hard(model.Add(sum(rot_bools[s:s+5]) <= 4), f"{nm(r)} max 4 weeks in 5 on {ROT_CODES[idx]}")
+
+    # Block Stability: soft preference for the same rotation in consecutive weeks.
+    # A change between w and w+1 is some rotation starting at w+1, so ch >= on(w+1, x) - on(w, x)
+    # for every rotation x the cell allows; the objective keeps ch at 0 otherwise. These rows
+    # over the per-rotation literals propagate better than a reified assign[w] != assign[w+1].
+    # (interval formulation: one per block, which is the number of changes plus one per resident)
+    # With family_change_weight, a change that also leaves the floor teams (A-D, G, extra
+    # teams), or moves between any two other rotations, costs that much more than a team swap.
+    change_cost = list(cells.blocks) if cells is not None else []
+    floor_family = sorted(set(floor_teams) | {IDX_G})
     for r_idx in range(N):
         for w in range(1, 52):
-            diff = model.NewBoolVar(f"ch_{r_idx}_{w}")
-            model.Add(assign[(r_idx, w)] != assign[(r_idx, w + 1)]).OnlyEnforceIf(diff)
-            model.Add(assign[(r_idx, w)] == assign[(r_idx, w + 1)]).OnlyEnforceIf(diff.Not())
-            change_cost.append(diff)
+            if assign[(r_idx, w)] is assign[(r_idx, w + 1)]:
+                continue  # one block: never a change
+            nxt = cell_dom[(r_idx, w + 1)]
+            if cells is None:
+                diff = model.NewBoolVar(f"ch_{r_idx}_{w}")
+                for x in nxt:
+                    model.Add(diff >= get_ind(r_idx, w + 1, x) - get_ind(r_idx, w, x))
+                change_cost.append(diff)
+            if family_change_weight:
+                leave = model.NewBoolVar(f"fam_ch_{r_idx}_{w}")
+                model.Add(leave >= get_ind_set(r_idx, w + 1, floor_family, "fam")
+                          - get_ind_set(r_idx, w, floor_family, "fam"))
+                for x in nxt:
+                    if x not in floor_family:
+                        model.Add(leave >= get_ind(r_idx, w + 1, x) - get_ind(r_idx, w, x))
+                change_cost.append(leave * family_change_weight)
 
     # 7. Requirements (remaining = required - completed)
-    # NF counts as FLOORS. SWING counts as NF/Floor or ICUN. ICU days/nights interchangeable.
-    REQ_TO_IDX = {
-        "ICU": ICU_DAY + [IDX_ICUN, IDX_SWING],
-        "ICU_NIGHT": [IDX_ICUN, IDX_SWING],
-        "FLOORS": FLOOR_ABCD + [IDX_G, IDX_NF, IDX_SWING],
-        "CLINIC": CLINIC_ALL_IDX + [IDX_TY_CLINIC],
-        "CARDIO": [ROT_IDX["CARDIO"]],
-        "ID": [ROT_IDX["ID"]],
-        "ED": [IDX_ED],
-        "NEURO": [ROT_IDX["NEURO"]],
-        "NF": [IDX_NF, IDX_SWING],
-        "GERIATRICS": [ROT_IDX["GERIATRICS"]],
-        "GEN SURG": [ROT_IDX["GEN SURG"]],
-        "ELECTIVE": [ROT_IDX["ELECTIVE"], ROT_IDX["CARDIO"],
-                     ROT_IDX["ID"], ROT_IDX["NEURO"], ROT_IDX["GERIATRICS"],
-                     ROT_IDX["GEN SURG"], ROT_IDX["ICU H"], IDX_TY_CLINIC],
-        "TY CLINIC": [IDX_TY_CLINIC],
-    }
+    # Category membership comes from the rotation catalog: NF counts as FLOORS,
+    # SWING counts as NF/Floor or ICUN, ICU days/nights interchangeable.
+    catalog = get_catalog()
+    REQ_TO_IDX = {cat: catalog.indices(cat, rot_idx) for cat in catalog.categories}
+    REQ_TO_IDX["FLOORS"] = sorted(set(REQ_TO_IDX.get("FLOORS", [])) | set(floor_teams))
+    REQ_TO_IDX = {cat: idx for cat, idx in REQ_TO_IDX.items() if idx}
 
     ty_idxs = [r for r in range(N) if residents[r].get("pgy") == "TY" or residents[r].get("is_ty", False)]
 
@@ -465,21 +626,12 @@ def solve(
         comp = completions_by_resident.get(res["id"], {})
         
         # 7a. Special TY / Anesthesia & Neurology Logic
+        # Anesthesia TYs are fixed to ELECTIVE in weeks 49-52 and only neurology TYs
+        # rotate through NEURO (cell domains, domains.py).
         if pgy == "TY":
             track_clean = (track or "").lower()
             is_anes = (track_clean == "anesthesia")
-            is_neuro = (track_clean == "neurology")
-
-            if is_anes:
-                # Anesthesia: Last 4 weeks = Anesthesia (Elective)
-                for w in range(49, 53):
-                    model.Add(assign[(r_idx, w)] == IDX_ANESTHESIA)
 
-            # NEURO: Only Neuro TYs rotate through Neuro. Others block it.
-            if not is_neuro:
-                for w in weeks:
-                    model.Add(assign[(r_idx, w)] != ROT_IDX["NEURO"])
-            
             # TY shared core requirements: (Use soft constraints with high penalties for solvability)
             def add_ty_soft_req(idx_set, needed, name, weight=1000000):
                 # Penalty for over-scheduling core - REMOVED for speed
@@ -488,7 +640,7 @@ def solve(
                 actual = sum(get_ind_set(r_idx, w, idx_set) for w in weeks)
                 deficit = model.NewIntVar(0, needed, f"ty_def_{r_idx}_{name}")
                 model.Add(actual + deficit >= needed)
-                total_deficit.append(deficit * weight)
+                add_penalty(deficit * weight, r_idx)
 
             # 24 Floors (User: 24 weeks of floor)
             # floors = ABCD + G + NF + SWING
@@ -551,25 +703,25 @@ def solve(
             if cat in ["FLOORS", "ICU", "CLINIC", "ED", "NEURO", "GERIATRICS", "CARDIO", "ID"]:
                 deficit = model.NewIntVar(0, 52, f"def_{r_idx}_{cat}")
                 model.Add(sum(cat_bools) + deficit >= needed)
-                total_deficit.append(deficit * 10000000)  # 10M per missing week
+                add_penalty(deficit * 10000000, r_idx)  # 10M per missing week
                 
                 # SURPLUS PENALTY: Prevent residents from going way past their floor requirements
                 # High priority to stop G-team bleed, but lower than mandatory coverage.
                 surplus = model.NewIntVar(0, 52, f"sur_{r_idx}_{cat}")
                 model.Add(sum(cat_bools) <= needed + surplus)
                 if cat == "FLOORS":
-                    total_deficit.append(surplus * 1000000) # 1M penalty per extra floor week
+                    add_penalty(surplus * 1000000, r_idx) # 1M penalty per extra floor week
 
                 # FIX 4: Hard cap on CORE ELECTIVE rotations.
                 # Cannot exceed required_weeks. FLOORS/ICU/CLINIC are exempt (coverage needs).
                 if cat in ["CARDIO", "NEURO", "GERIATRICS", "ID", "ED"]:
-                    model.Add(sum(cat_bools) <= req_min)
+                    hard(model.Add(sum(cat_bools) <= req_min), f"{nm(r_idx)} {cat} cap")
                 
                 # PGY-3 Front-Loading Soft Constraint: Reward doing Floors/ICU early (Weeks 1-30)
                 if pgy == "PGY3" and cat in ["FLOORS", "ICU"]:
                     late_weeks = [b for w, b in zip(weeks, cat_bools) if w > 30]
                     for b in late_weeks:
-                        total_deficit.append(b * 500) # Moderate penalty for late scheduling
+                        add_penalty(b * 500, r_idx) # Moderate penalty for late scheduling
             else:
                 # SOFT REQUIREMENTS (Electives, etc.)
                 deficit = model.NewIntVar(0, 52, f"def_{r_idx}_{cat}")
@@ -577,7 +729,7 @@ def solve(
                 model.Add(sum(cat_bools) + (clinic_overflow if cat == "ELECTIVE" else 0) + deficit >= needed)
                 # Higher penalty for electives too — 1M per missing week
                 penalty = 1000000
-                total_deficit.append(deficit * penalty)
+                add_penalty(deficit * penalty, r_idx)
 
         # 7c. Cumulative Core Electives (Cardio, Neuro, Geri, ID, ED)
         # Ensure that by graduation, these minimums are met.
@@ -594,34 +746,17 @@ def solve(
                 
                 deficit = model.NewIntVar(0, min_val, f"cum_def_{r_idx}_{cat}")
                 model.Add(done + this_year + deficit >= min_val)
-                total_deficit.append(deficit * 20000000) # 20M - Graduation requirements are absolute priority
-
-    # 8. Clinic: designated cohort must be present; total 10-12 (3-5 extras from any cohort)
-    # Cohorts are capped at MAX_COHORT_SIZE (9), so all cohort members fit in clinic.
-    cohort_defs = cohort_defs or []
-    for cd in cohort_defs:
-        # TYs do not attend IM clinic; they have their own clinic elsewhere.
-        # So we exclude them from the cohort forcing that puts them in our resident clinic.
-        coh_res = [i for i, r in enumerate(residents) if r.get("cohort_id") == cd["cohort_id"] and not r.get("is_ty")]
-        if not coh_res:
-            continue
-        for w in cd.get("clinic_weeks", []):
-            if 1 <= w <= 52:
-                if w in [26, 27]:
-                    continue # Holiday rules override cohort
-                for r in coh_res:
-                    # If TY, use TY CLINIC. Otherwise use regular IM CLINIC.
-                    is_ty_res = (residents[r].get("pgy") == "TY" or residents[r].get("is_ty", False))
-                    target_cl_idx = [IDX_TY_CLINIC] if is_ty_res else CLINIC_ALL_IDX
-                    b = get_ind_set(r, w, target_cl_idx, "cl")
-                    model.Add(b == 1)
+                add_penalty(deficit * 20000000, r_idx) # 20M - Graduation requirements are absolute priority
+
+    # 8. Clinic: designated cohort must be present (cell domains, domains.py); total 8-12
+    # (the rest from any cohort). Cohorts are capped at MAX_COHORT_SIZE, so all members fit.
     for w in weeks:
         if w in [26, 27]:
             continue # Holiday schedule handles clinic differently
         # TYs do not attend our clinic (they have their own elsewhere), so they don't count toward local minimums
         clinic_count = sum(get_ind_set(r, w, CLINIC_ALL_IDX, "cl") for r in range(N) if r not in ty_idxs)
-        model.Add(clinic_count >= CLINIC_MIN_PER_WEEK)
-        model.Add(clinic_count <= CLINIC_MAX_PER_WEEK)
+        hard(model.Add(clinic_count >= CLINIC_MIN_PER_WEEK), f"clinic 8-12 week {w}")
+        hard(model.Add(clinic_count <= CLINIC_MAX_PER_WEEK), f"clinic 8-12 week {w}")
 
 
     # Co-intern pairing: HARD constraint
@@ -641,36 +776,25 @@ def solve(
     for (i, j) in co_intern_pairs:
         for w in weeks:
             # If BOTH are on any floor team (A/B/C/D), force same assignment
-            fi = get_ind_set(i, w, FLOOR_ABCD, "floor")
-            fj = get_ind_set(j, w, FLOOR_ABCD, "floor")
+            fi = get_ind_set(i, w, floor_teams, "floor")
+            fj = get_ind_set(j, w, floor_teams, "floor")
             # assign[i,w] == assign[j,w] when both on floors
-            model.Add(assign[(i, w)] == assign[(j, w)]).OnlyEnforceIf(fi, fj)
+            if fi is not lit_false and fj is not lit_false:
+                hard(model.Add(assign[(i, w)] == assign[(j, w)]), f"co-interns {nm(i)} / {nm(j)}").OnlyEnforceIf(fi, fj)
 
             # Same for ICU: if both on ICU day, force same assignment
             ui = get_ind_set(i, w, ICU_DAY, "icu")
             uj = get_ind_set(j, w, ICU_DAY, "icu")
-            model.Add(assign[(i, w)] == assign[(j, w)]).OnlyEnforceIf(ui, uj)
+            if ui is not lit_false and uj is not lit_false:
+                hard(model.Add(assign[(i, w)] == assign[(j, w)]), f"co-interns {nm(i)} / {nm(j)}").OnlyEnforceIf(ui, uj)
 
     # 10. HOLIDAY SCHEDULE (Weeks 26 & 27)
     # Essential Coverage: Floors, ICU, NF, SWING, ICU N, TEAM G.
     # All others must be ICU H. Reciprocity: work one, off one.
     HOLIDAY_WEEKS = [26, 27]
-    ESSENTIAL_COV_IDX = ALL_FLOOR_IDX + ICU_DAY + [IDX_ICUN]
-    CLINIC_HOL_IDX = CLINIC_ALL_IDX + [IDX_TY_CLINIC]
     
-    # HARD RESTRICTION: ICU H is ONLY for holiday weeks 26 & 27.
-    for r in range(N):
-        for w in weeks:
-            if w not in HOLIDAY_WEEKS:
-                model.Add(assign[(r, w)] != IDX_ICUH)
-
-    # HARD RESTRICTION: No other rotations except Essential, Clinic, or ICU H in these weeks.
-    for w in HOLIDAY_WEEKS:
-        for r in range(N):
-            w_is_cov = get_ind_set(r, w, ESSENTIAL_COV_IDX, f"hol_is_cov_{w}")
-            w_is_cl = get_ind_set(r, w, CLINIC_HOL_IDX, f"hol_is_cl_{w}")
-            w_is_off = get_ind(r, w, IDX_ICUH)
-            model.Add(w_is_cov + w_is_cl + w_is_off == 1)
+    # HARD RESTRICTION: ICU H is ONLY for holiday weeks 26 & 27, and holiday weeks allow only
+    # Essential, Clinic or ICU H (cell domains, domains.py).
 
     for r in range(N):
         res = residents[r]
@@ -682,11 +806,11 @@ def solve(
         w2_off = get_ind(r, 27, IDX_ICUH)
 
         # MANDATORY: No one works both weeks.
-        model.Add(w1_off + w2_off >= 1)
+        hard(model.Add(w1_off + w2_off >= 1), f"{nm(r)} holiday reciprocity")
 
         # 1. Non-PGY3s: MUST work exactly one week.
         if pgy != "PGY3":
-            model.Add(w1_off + w2_off == 1)
+            hard(model.Add(w1_off + w2_off == 1), f"{nm(r)} holiday reciprocity")
         else:
             # 2. PGY3: Can work 0 or 1 weeks. 
             # Weighted penalty for working based on core completion progress.
@@ -699,68 +823,145 @@ def solve(
             w1_any_work = model.NewBoolVar(f"pgy3_w1_work_{r}")
             model.Add(w1_off == 0).OnlyEnforceIf(w1_any_work)
             model.Add(w1_off == 1).OnlyEnforceIf(w1_any_work.Not())
-            total_deficit.append(w1_any_work * pgy3_work_penalty)
+            add_penalty(w1_any_work * pgy3_work_penalty, r)
             
             w2_any_work = model.NewBoolVar(f"pgy3_w2_work_{r}")
             model.Add(w2_off == 0).OnlyEnforceIf(w2_any_work)
             model.Add(w2_off == 1).OnlyEnforceIf(w2_any_work.Not())
-            total_deficit.append(w2_any_work * pgy3_work_penalty)
+            add_penalty(w2_any_work * pgy3_work_penalty, r)
             
     # Holiday Clinic Cap: Max 3 per week (Week 26, 27)
     # 3 is the limit to allow 22 coverage + 3 clinic = 25 residents (half of 50)
     clinic_total_idx = CLINIC_ALL_IDX + [IDX_TY_CLINIC]
     for w in HOLIDAY_WEEKS:
         clinic_holiday = [get_ind_set(r, w, clinic_total_idx, f"hol_cl_cap_{w}") for r in range(N)]
-        model.Add(sum(clinic_holiday) <= 3)
+        hard(model.Add(sum(clinic_holiday) <= 3), f"holiday clinic cap week {w}")
 
     # Objective: minimize deficits (highest priority), then minimize rotation changes (tie-breaker)
+    penalty = sum(total_deficit)
     model.Minimize(
-        sum(total_deficit)
-        + sum(change_cost)  # change_cost items are just 0/1 booleans, so they're tie-breakers
+        penalty
+        + sum(change_cost)  # change_cost items are 0/1 booleans (or small multiples), so they're tie-breakers
     )
+    return BuiltModel(model=model, assign=assign, residents=residents, weeks=weeks,
+                      penalty_by_resident=penalty_by_resident, guards=guards, rot_codes=rot_codes,
+                      penalty=penalty if total_deficit else None, frozen=frozen)
 
-    # Solve
-    # Callback to log progress
-    class ProgressPrinter(cp_model.CpSolverSolutionCallback):
-        def __init__(self, limit):
-            cp_model.CpSolverSolutionCallback.__init__(self)
-            self.__limit = limit
-            self.__solution_count = 0
-
-        def on_solution_callback(self):
-            self.__solution_count += 1
-            print(f"Solution {self.__solution_count} found: objective value = {self.ObjectiveValue()}")
-            if self.__solution_count >= self.__limit:
-                self.StopSearch()
 
+def tuned_solver(n_residents: int, formulation: str = "grid",
+                 overrides: Optional[dict] = None) -> Tuple[cp_model.CpSolver, dict]:
+    """
+    A CpSolver with the stored profile for this engine and roster size applied
+    (scheduler/solver_profiles.py), then overrides. Returns it with the parameters set.
+    The worker count is the CPU governor's share (governor.py); a tuned profile may ask for fewer.
+    """
     solver = cp_model.CpSolver()
-    # Performance Optimization: Use half of available cores to avoid freezing the PC
-    # 8 cores was too aggressive and starved the OS. 4 is safer.
-    solver.parameters.num_search_workers = 4
-    
-    
+    limit = governor.workers()
+    params = apply_profile(solver.parameters, "interval" if formulation == "interval" else "webapp",
+                           n_residents, defaults={"num_workers": limit}, overrides=overrides)
+    if params["num_workers"] > limit and "num_workers" not in (overrides or {}):
+        solver.parameters.num_workers = params["num_workers"] = limit
+    return solver, params
+
+
+def solve(
+    residents: List[dict],
+    requirements_by_pgy: Dict[str, List[dict]],
+    completions_by_resident: Dict[int, Dict[str, int]],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    july_weeks: List[int] = None,
+    ramirez_until_week: int = 7,
+    time_limit: int = 300,
+    random_seed: Optional[int] = None,
+    relax_vacation_blocks: bool = False,
+    relax_geriatrics_coverage: bool = False,
+    coverage_rules: Optional[List] = None,
+    stats: Optional[dict] = None,
+    block_weeks: int = 1,
+    formulation: str = "grid",
+    family_change_weight: int = 0,
+    solver_params: Optional[dict] = None,
+    deterministic: bool = False,
+    stop_rules: Optional[StopRules] = None,
+    frozen: Optional[Dict[Tuple[int, int], Optional[str]]] = None,
+) -> Tuple[Optional[Dict[int, Dict[int, str]]], str, List[str]]:
+    """
+    residents: [{id, name, pgy, is_senior, is_intern, cohort_id, constraints_json}]
+    requirements_by_pgy: {pgy: [{category, required_weeks, counts_as}]}
+    completions_by_resident: {resident_id: {category: weeks}}
+    vacation_requests: [{resident_id, start_week, length_weeks, hard_lock}]
+    cohort_defs: [{cohort_id, clinic_weeks}]
+    coverage_rules: the year's CoverageRule rows (or dicts); None uses scheduler.coverage.DEFAULT_RULES
+    block_weeks: 1 decides every week; 2 assigns rotations per 2-week block (see build_model)
+    formulation: "grid" (a variable per cell) or "interval" (rotation blocks, interval_engine.py)
+    family_change_weight: extra cost of a change that is not a floor team swap (0 = all changes cost 1)
+    solver_params: CP-SAT parameters set over the tuned profile (see tuned_solver)
+    deterministic: reproducible solve (scheduler/solver_profiles.py deterministic_params); time_limit
+           is then a deterministic time budget, which must be given (> 0), and stats add
+           solver_version and model_hash
+    stop_rules: when to end the search early (scheduler/stopping.py); None = DEFAULT_STOP_RULES.
+           A deterministic solve ignores stagnation_seconds, which depends on wall-clock time
+    frozen: {(resident_id, week): code or None} cells kept as they are; only the rest is solved
+           (partial regeneration, see build_model)
+    stats: optional dict filled with {"curve": [(seconds, objective), ...], "objective", "best_bound",
+           "build_seconds", "presolve_seconds", "first_solution_seconds", "solve_seconds", "status",
+           "stop_reason", "num_branches", "num_conflicts", "deterministic_time", "solver_params",
+           "reproducible"}
+    """
+    t_build = time.time()
+    built = build_model(
+        residents, requirements_by_pgy, completions_by_resident, vacation_requests,
+        cohort_defs=cohort_defs, july_weeks=july_weeks, ramirez_until_week=ramirez_until_week,
+        relax_vacation_blocks=relax_vacation_blocks, relax_geriatrics_coverage=relax_geriatrics_coverage,
+        coverage_rules=coverage_rules, block_weeks=block_weeks, formulation=formulation,
+        family_change_weight=family_change_weight, frozen=frozen,
+    )
+
     # Priority: Find a feasible solution quickly
     # solver.parameters.search_branching = cp_model.AUTOMATIC_SEARCH # Default is automatic
     
     # Quick timeout to prevent 502/Gateway Timeouts on frontend
     # Increased default to 300 seconds as the 22-intern roster is very tight.
     lim = time_limit if time_limit > 0 else 300
-    solver.parameters.max_time_in_seconds = float(lim)
-    
-    if random_seed is not None:
-        solver.parameters.random_seed = random_seed
-
-    status = solver.Solve(model)
+    rules = DEFAULT_STOP_RULES if stop_rules is None else stop_rules
+    if deterministic:
+        # Reproducible: time_limit is a deterministic time budget (no default); no tuned profile or CPU governor
+        solver = cp_model.CpSolver()
+        solver_params = set_params(solver.parameters, {**deterministic_params(time_limit, random_seed),
+                                                       **(solver_params or {})})
+        rules = replace(rules, stagnation_seconds=None)
+    else:
+        solver, solver_params = tuned_solver(len(residents), formulation, solver_params)
+        solver.parameters.max_time_in_seconds = float(lim)
+        if random_seed is not None:
+            solver.parameters.random_seed = random_seed
+
+    build_seconds = time.time() - t_build
+    search_log = SearchLog(solver) if stats is not None else None
+    stopper = Stopper(solver, rules, clean=built.penalty)
+    curve = ObjectiveCurve(stopper=stopper)
+    with stopper:
+        status = solver.Solve(built.model, curve)
     conflicts = []
+    if stats is not None:
+        stats.update({
+            "curve": curve.points,
+            "objective": solver.ObjectiveValue() if curve.points else None,
+            "best_bound": solver.BestObjectiveBound() if curve.points else None,
+            "build_seconds": round(build_seconds, 3),
+            "presolve_seconds": search_log.presolve_seconds,
+            "first_solution_seconds": curve.points[0][0] if curve.points else None,
+            "solve_seconds": round(solver.WallTime(), 3),
+            "status": solver.StatusName(status),
+            "stop_reason": stop_reason(solver, status, stopper, bool(curve.points)),
+            "solver_params": solver_params,
+            **(reproducibility(solver, solver_params, built.model) if deterministic else {"reproducible": False}),
+            **response_stats(solver),
+        })
 
     if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        assignments = {}
-        for r in range(N):
-            rid = residents[r]["id"]
-            assignments[rid] = {}
-            for w in weeks:
-                idx = int(solver.Value(assign[(r, w)]))
-                assignments[rid][w] = ROT_CODES[idx]
+        assignments = built.extract(built.read(solver.Value))
         st = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
         return assignments, st, conflicts
 
@@ -769,3 +970,59 @@ def solve(
         if v.get("hard_lock"):
             conflicts.append(f"Hard lock: resident {v['resident_id']} weeks {v['start_week']}-{v['start_week']+v.get('length_weeks',2)-1}")
     return None, solver.StatusName(status), conflicts
+
+
+def diagnose_infeasibility(
+    residents: List[dict],
+    requirements_by_pgy: Dict[str, List[dict]],
+    completions_by_resident: Dict[int, Dict[str, int]],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    time_limit: int = 120,
+    max_rounds: int = 3,
+    **build_kwargs,
+) -> Tuple[str, List[str]]:
+    """
+    Name the hard-rule families that conflict. Every family is guarded by an enforcement
+    literal passed as an assumption; CP-SAT returns a sufficient subset of assumptions for
+    infeasibility, which is re-solved with only that subset enforced until it stops shrinking.
+    Returns (status, families), e.g. ("INFEASIBLE", ["Cohort 3 clinic week 21", "ICU senior coverage week 21"]).
+    """
+    t0 = time.time()
+    built = build_model(
+        residents, requirements_by_pgy, completions_by_resident, vacation_requests,
+        cohort_defs=cohort_defs, diagnose=True, **build_kwargs,
+    )
+    # Only satisfiability of the hard rules matters here
+    built.model.ClearObjective()
+    by_index = {lit.Index(): label for label, lit in built.guards.items()}
+    core = list(built.guards)
+    status_name = "UNKNOWN"
+    for _ in range(max_rounds):
+        remaining = time_limit - (time.time() - t0)
+        if remaining < 1:
+            break
+        built.model.ClearAssumptions()
+        built.model.AddAssumptions([built.guards[label] for label in core])
+        solver = cp_model.CpSolver()
+        solver.parameters.num_search_workers = 1  # core extraction needs a single worker
+        solver.parameters.max_time_in_seconds = float(remaining)
+        status = solver.Solve(built.model)
+        if status != cp_model.INFEASIBLE:
+            # Feasible with all families means the failure was a time-out, not a conflict
+            if status_name == "UNKNOWN":
+                status_name = solver.StatusName(status)
+            break
+        status_name = "INFEASIBLE"
+        smaller = [by_index[i] for i in solver.SufficientAssumptionsForInfeasibility()]
+        if not smaller or len(smaller) >= len(core):
+            break
+        core = smaller
+    if status_name != "INFEASIBLE":
+        return status_name, []
+    return status_name, core
+
+
+def format_core(families: List[str]) -> str:
+    """One-line diagnosis from diagnose_infeasibility() families."""
+    return " + ".join(families)
@@ -0,0 +1,340 @@
+"""
+Streaming Excel import of a year's roster and schedule.
+
+The master schedule workbooks carry ~17k conditional-format styles, and openpyxl parses the
+whole stylesheet before it yields a cell (about 1s per workbook, read-only mode included).
+The import only needs cached cell values, so read_rows() streams the sheet XML straight out
+of the xlsx archive (values as openpyxl's iter_rows(values_only=True), without date
+conversion). Then:
+
+  parse_schedule()  SCHEDULE sheet rows 4-56 (A=Cohort, B=PGY, C=Name, D..BC = weeks 1-52)
+                    into roster rows, each with its 52 normalized rotation codes
+  read_table()      Name/PGY/Cohort table of the SCHEDULE or first sheet (roster only)
+  check_roster()    cohort caps and intern parity, in memory, before anything is written
+  write_schedule()  replace the year's residents and grid: one batched resident INSERT and one
+                    executemany for the cells, recorded as "import" versions
+
+import_workbooks() imports several workbooks (2025..., 2026..., 2027...) as separate years in
+one transaction: all are parsed and checked before the first is written. They are parsed one
+after another: ElementTree holds the GIL, and a worker process costs more to start than the
+40-170 ms a workbook takes to parse.
+"""
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import Counter
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Cohort, Resident, ScheduleAssignment, Year
+import versions
+
+SCHEDULE_SHEET = "SCHEDULE"
+FIRST_ROW, LAST_ROW = 4, 56
+WEEKS = 52
+PGYS = ("PGY1", "PGY2", "PGY3", "TY")
+DEFAULT_COHORTS = [f"Cohort {i}" for i in range(1, 6)]
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+READ_ERRORS = (zipfile.BadZipFile, KeyError, IndexError, ValueError, ET.ParseError)  # not a readable xlsx
+
+# Map Excel rotation values to canonical codes (for schedule import)
+ROT_NORMALIZE = {
+    "a": "A", "b": "B", "c": "C", "d": "D", "g": "G",
+    "icu": "ICU", "icu e": "ICU E", "icu-e": "ICU E", "icu n": "ICU N", "icun": "ICU N",
+    "nf": "NF", "swing": "SWING",
+    "clinic": "CLINIC", "clinic *": "CLINIC *", "clinic*": "CLINIC *",
+    "ed": "ED", "cardio": "CARDIO", "cardio-ram": "CARDIO-RAM", "cardio-hca": "CARDIO-HCA",
+    "id": "ID", "neuro": "NEURO", "vacation": "VACATION", "vac": "VACATION",
+    "geriatrics": "GERIATRICS", "geri": "GERIATRICS",
+    "pulmonology": "PULMONOLOGY", "pulm": "PULMONOLOGY",
+    "nephrology": "NEPHROLOGY", "nephro": "NEPHROLOGY",
+    "palliative": "PALLIATIVE", "pain": "PAIN",
+    "rheumatology": "RHEUMATOLOGY", "rheum": "RHEUMATOLOGY",
+    "endocrinology": "ENDOCRINOLOGY", "endo": "ENDOCRINOLOGY",
+    "trauma": "TRAUMA", "sicu": "SICU", "plastic": "PLASTIC",
+    "elective": "ELECTIVE",
+    "icu h": "ICU H", "icu h*": "ICU H", "icu h *": "ICU H", "icuh": "ICU H", "icuh*": "ICU H",
+    "cardio*": "CARDIO-RAM", "cardio *": "CARDIO-RAM",
+    "id *": "ID", "id*": "ID",
+}
+
+
+def _is_intern(pgy: str) -> bool:
+    return pgy in ("PGY1", "TY")
+
+
+def normalize_row(values: Iterable) -> List[Optional[str]]:
+    """Canonical rotation code of each cell (None for empty or unknown values)."""
+    get = ROT_NORMALIZE.get
+    return [get(str(v).strip().lower()) if v is not None else None for v in values]
+
+
+# --- Reading ---
+
+def _column(ref: str) -> int:
+    """1-based column of a cell reference ("BC12" -> 55)."""
+    n = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _sheet_paths(zf: zipfile.ZipFile) -> Dict[str, str]:
+    rels = {r.get("Id"): r.get("Target", "") for r in ET.fromstring(zf.read("xl/_rels/workbook.xml.rels")).iter(_PKG_REL)}
+    out = {}
+    for s in ET.fromstring(zf.read("xl/workbook.xml")).iter(f"{_NS}sheet"):
+        target = rels.get(s.get(_REL_ID), "")
+        out[s.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return out
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    out = []
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == f"{_NS}si":
+                t = el.find(f"{_NS}t")
+                runs = [t] if t is not None else el.findall(f"{_NS}r/{_NS}t")  # rich text: runs, no phonetics
+                out.append("".join(x.text or "" for x in runs))
+                el.clear()
+    return out
+
+
+def _value(c: ET.Element, strings: List[str]):
+    kind = c.get("t", "n")
+    if kind == "inlineStr":
+        inline = c.find(f"{_NS}is")
+        return "".join(x.text or "" for x in inline.iter(f"{_NS}t")) if inline is not None else None
+    v = c.find(f"{_NS}v")
+    if v is None or v.text is None:
+        return None
+    if kind == "s":
+        return strings[int(v.text)]
+    if kind in ("str", "e"):
+        return v.text
+    if kind == "b":
+        return v.text == "1"
+    return float(v.text) if any(ch in v.text for ch in ".eE") else int(v.text)
+
+
+def sheet_names(content: bytes) -> List[str]:
+    with zipfile.ZipFile(BytesIO(content)) as zf:
+        return list(_sheet_paths(zf))
+
+
+def read_rows(content: bytes, sheet: str, min_row: int = 1, max_row: Optional[int] = None,
+              max_col: Optional[int] = None) -> Optional[List[list]]:
+    """
+    Cached values of rows min_row..max_row (to the last row when None) of sheet, one list per
+    row padded to max_col columns (to the widest row when None). None when there is no such sheet.
+    """
+    with zipfile.ZipFile(BytesIO(content)) as zf:
+        path = _sheet_paths(zf).get(sheet)
+        if path is None:
+            return None
+        strings = _shared_strings(zf)
+        rows: Dict[int, dict] = {}
+        r = 0
+        with zf.open(path) as f:
+            for _, el in ET.iterparse(f):
+                if el.tag != f"{_NS}row":
+                    continue
+                r = int(el.get("r") or r + 1)
+                if max_row is not None and r > max_row:
+                    break
+                if r >= min_row:
+                    cells, col = {}, 0
+                    for c in el.iter(f"{_NS}c"):
+                        ref = c.get("r")
+                        col = _column(ref) if ref else col + 1
+                        if max_col is None or col <= max_col:
+                            value = _value(c, strings)
+                            if value is not None:
+                                cells[col] = value
+                    rows[r] = cells
+                el.clear()
+    last = max_row if max_row is not None else max(rows, default=min_row - 1)
+    width = max_col if max_col is not None else max((max(c) for c in rows.values() if c), default=0)
+    return [[rows.get(r, {}).get(col) for col in range(1, width + 1)] for r in range(min_row, last + 1)]
+
+
+def parse_schedule(content: bytes) -> Optional[List[dict]]:
+    """Roster rows of the SCHEDULE sheet: [{"name", "pgy", "cohort", "codes"}]; None without the sheet."""
+    rows = read_rows(content, SCHEDULE_SHEET, FIRST_ROW, LAST_ROW, 3 + WEEKS)
+    if rows is None:
+        return None
+    out = []
+    cohort = pgy = None
+    for values in rows:
+        a, b, c = values[:3]
+        if a and str(a).strip().startswith("Cohort"):
+            cohort = str(a).strip()
+        if b:
+            ps = str(b).strip().upper().replace("-", "")
+            if ps in PGYS:
+                pgy = ps
+        if not c or not str(c).strip() or not pgy:
+            continue
+        out.append({"name": str(c).strip(), "pgy": pgy, "cohort": cohort, "codes": normalize_row(values[3:])})
+    return out
+
+
+def read_table(content: bytes) -> Tuple[List[str], List[dict]]:
+    """
+    (header, rows) of a Name/PGY/Cohort table on the SCHEDULE sheet, else the first sheet: the
+    first non-empty row is the header. Raises HTTPException 400 when Name or PGY is missing.
+    """
+    names = sheet_names(content)
+    sheet = SCHEDULE_SHEET if SCHEDULE_SHEET in names else names[0]
+    rows = [r for r in read_rows(content, sheet) if any(v is not None for v in r)]
+    header = [str(v).strip() if v is not None else "" for v in rows[0]] if rows else []
+
+    def col_match(pat: str):
+        return next((i for i, c in enumerate(header) if pat in c.lower()), None)
+    name_col = col_match("name")
+    if name_col is None:
+        name_col = col_match("resident")
+    if name_col is None and header:
+        name_col = 0
+    pgy_col = col_match("pgy")
+    cohort_col = col_match("cohort")
+    if pgy_col is None or name_col is None:
+        raise HTTPException(400, f"Excel must have Name and PGY columns. Found: {header[:10]}.")
+    out = []
+    for values in rows[1:]:
+        name = str(values[name_col]).strip() if values[name_col] is not None else ""
+        if not name:
+            continue
+        pgy = str(values[pgy_col]).strip().upper().replace("-", "")
+        cohort = values[cohort_col] if cohort_col is not None else None
+        out.append({"name": name, "pgy": pgy if pgy in PGYS else "PGY1",
+                    "cohort": str(cohort).strip() if cohort is not None else None})
+    return header, out
+
+
+# --- Validation and writing ---
+
+def ensure_cohorts(db: Session, year_id: int) -> Dict[str, int]:
+    """Cohort ids of the year by name; a year without cohorts gets the default five (flushed)."""
+    cohorts = {c.name: c.id for c in db.query(Cohort).filter(Cohort.year_id == year_id).all()}
+    if not cohorts:
+        new = [Cohort(year_id=year_id, name=name, clinic_weeks=[], target_intern_count=2) for name in DEFAULT_COHORTS]
+        db.add_all(new)
+        db.flush()
+        cohorts = {c.name: c.id for c in new}
+    return cohorts
+
+
+def check_roster(rows: List[dict], cohort_ids: Dict[str, int], max_size: int,
+                 existing: Iterable[Tuple[Optional[int], str]] = ()) -> None:
+    """
+    Cohort caps and intern parity of the roster rows plus the year's existing (cohort_id, pgy)
+    residents, counted in one pass. Raises HTTPException 400 on the first violation.
+    """
+    names = {cid: name for name, cid in cohort_ids.items()}
+    size, interns = Counter(), Counter()
+    for cid, pgy in existing:
+        if cid:
+            size[cid] += 1
+            interns[cid] += _is_intern(pgy)
+    for r in rows:
+        cid = cohort_ids.get(r["cohort"])
+        if not cid:
+            continue
+        size[cid] += 1
+        if size[cid] > max_size:
+            raise HTTPException(400, f"Cohort {names[cid]} would exceed {max_size} residents. Max per cohort is {max_size}.")
+        interns[cid] += _is_intern(r["pgy"])
+    for cid, n in interns.items():
+        if n % 2 != 0:
+            raise HTTPException(400, f"Cohort {names.get(cid, cid)} has {n} interns. Interns must be in multiples of 2 (each needs a co-intern).")
+
+
+def add_residents(db: Session, year_id: int, rows: List[dict], cohort_ids: Dict[str, int]) -> List[Resident]:
+    """Insert the roster rows in one flush (a single batched INSERT ... RETURNING for the ids)."""
+    residents = [Resident(name=r["name"], pgy=r["pgy"], cohort_id=cohort_ids.get(r["cohort"]), year_id=year_id)
+                 for r in rows]
+    db.add_all(residents)
+    db.flush()
+    return residents
+
+
+def write_schedule(db: Session, year_id: int, rows: List[dict], cohort_ids: Dict[str, int]) -> dict:
+    """Replace the year's residents and grid with the parsed SCHEDULE rows (flushed, not committed)."""
+    cleared = versions.grid_delta(versions.load_grid(db, year_id), {})
+    db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == year_id).delete(synchronize_session=False)
+    db.query(Resident).filter(Resident.year_id == year_id).delete(synchronize_session=False)
+    versions.record(db, year_id, cleared, "import", "Cleared for Excel import")
+
+    residents = add_residents(db, year_id, rows, cohort_ids)
+    cells = [{"resident_id": res.id, "year_id": year_id, "week_number": w, "rotation_code": code}
+             for res, row in zip(residents, rows) for w, code in enumerate(row["codes"], 1) if code]
+    if cells:
+        db.execute(insert(ScheduleAssignment), cells)
+    imported = [[c["resident_id"], c["week_number"], None, c["rotation_code"]] for c in cells]
+    versions.record(db, year_id, imported, "import", "Imported SCHEDULE sheet")
+    versions.bump(db, year_id)  # the roster changed even when no cells did
+    return {"created": len(residents), "assignments": len(cells)}
+
+
+# --- Several workbooks ---
+
+def year_name_for(filename: str) -> Optional[str]:
+    """Academic year a workbook is for, from its file name: "2026 Master ..." -> "2026-2027"."""
+    m = re.search(r"(20\d\d)(?:\s*-\s*(20\d\d))?", filename)
+    if not m:
+        return None
+    start = int(m.group(1))
+    return f"{start}-{m.group(2) or start + 1}"
+
+
+def import_workbooks(db: Session, files: List[Tuple[str, bytes]]) -> List[dict]:
+    """
+    Import each (filename, content) workbook's SCHEDULE sheet into the year named by its file
+    name, creating missing years. All workbooks are parsed and validated before any year is
+    replaced; the caller commits. Raises HTTPException 400 on unnamed, duplicate or invalid files.
+    """
+    from engine import MAX_COHORT_SIZE
+    year_names = []
+    for filename, _ in files:
+        name = year_name_for(filename)
+        if name is None:
+            raise HTTPException(400, f"Cannot tell the year of {filename}: name it like '2026 Master Schedule.xlsx'")
+        if name in year_names:
+            raise HTTPException(400, f"More than one workbook for {name}")
+        year_names.append(name)
+    try:
+        parsed = [parse_schedule(content) for _, content in files]
+    except READ_ERRORS as e:
+        raise HTTPException(400, f"Invalid Excel: {e}")
+    for (filename, _), rows in zip(files, parsed):
+        if not rows:
+            raise HTTPException(400, f"{filename} has no roster on a {SCHEDULE_SHEET} sheet")
+
+    years = {y.name: y for y in db.query(Year).filter(Year.name.in_(year_names)).all()}
+    plans = []
+    for name, rows in zip(year_names, parsed):
+        year = years.get(name)
+        if year is None:
+            year = Year(name=name, start_date=f"{name.split('-')[0]}-07-01")
+            db.add(year)
+            db.flush()
+        cohort_ids = ensure_cohorts(db, year.id)
+        check_roster(rows, cohort_ids, MAX_COHORT_SIZE)
+        plans.append((year, rows, cohort_ids))
+    out = []
+    for year, rows, cohort_ids in plans:
+        result = write_schedule(db, year.id, rows, cohort_ids)
+        out.append({"year_id": year.id, "year": year.name, **result})
+    return out
@@ -0,0 +1,100 @@
+"""
+CPU governor: how many CP-SAT workers each solve gets.
+
+A generate job takes a lease for its solve. Its worker count is its priority's share of the
+usable CPUs: os.cpu_count(), minus RESERVE_CPUS kept for the API and the OS, minus the load
+other processes put on the machine (1-minute load average less the workers already leased),
+split over every active lease by PRIORITY_WEIGHTS. The leases together never hold more than
+the capacity, max(usable, MIN_WORKERS): a new lease gets at most the workers still free, and
+waits (the job stays queued) while fewer than MIN_WORKERS are free. A lease keeps its count
+until the solve ends, since CP-SAT cannot change it mid-solve.
+
+engine.tuned_solver() asks workers() for every solve: the calling thread's lease if it holds
+one, else the share of a new normal-priority solve (CLI, benchmarks). A tuned profile's
+worker count is used up to that limit.
+
+The reserve is SCHEDULER_RESERVE_CPUS in the environment (run.py --reserve-cpus sets it).
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+RESERVE_CPUS = int(os.environ.get("SCHEDULER_RESERVE_CPUS", "1"))
+# A single worker runs no portfolio: base-50 found no schedule in 45s with one, 9s with two
+MIN_WORKERS = 2
+# interactive: cell repair the scheduler is waiting on; overnight: full optimization that can wait
+PRIORITY_WEIGHTS = {"interactive": 3, "normal": 2, "overnight": 1}
+
+QUEUE_RECHECK = 5.0  # seconds between capacity checks of a waiting lease (the load average moves)
+
+_lock = threading.Lock()
+_released = threading.Condition(_lock)
+_leases = {}  # lease id -> (priority, workers)
+_waiting = 0
+_local = threading.local()
+
+
+def _other_load(leased: int) -> float:
+    """Runnable processes beyond our own solver workers (0 where there is no load average)."""
+    try:
+        load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return 0.0
+    return max(0.0, load - leased)
+
+
+def share(priority: str = "normal") -> int:
+    """Workers a new solve of this priority would get now (0 = it would wait for a lease to end)."""
+    with _lock:
+        return _share(priority)
+
+
+def _share(priority: str) -> int:
+    leased = sum(w for _, w in _leases.values())
+    usable = (os.cpu_count() or 1) - RESERVE_CPUS - round(_other_load(leased))
+    capacity = max(usable, MIN_WORKERS)
+    free = capacity - leased
+    if free < MIN_WORKERS:
+        return 0
+    weight = PRIORITY_WEIGHTS[priority]
+    total = weight + sum(PRIORITY_WEIGHTS[p] for p, _ in _leases.values())
+    return min(free, max(MIN_WORKERS, int(capacity * weight / total)))
+
+
+@contextmanager
+def lease(priority: str = "normal"):
+    """Hold a share of the CPUs for one job's solves, waiting for one if none is free; yields the worker count."""
+    global _waiting
+    with _lock:
+        _waiting += 1
+        try:
+            workers = _share(priority)
+            while not workers:
+                _released.wait(QUEUE_RECHECK)
+                workers = _share(priority)
+        finally:
+            _waiting -= 1
+        key = object()
+        _leases[key] = (priority, workers)
+    previous = getattr(_local, "workers", None)
+    _local.workers = workers
+    try:
+        yield workers
+    finally:
+        _local.workers = previous
+        with _lock:
+            del _leases[key]
+            _released.notify_all()
+
+
+def workers() -> int:
+    """The calling thread's leased worker count, or a new normal-priority share (CLI, benchmarks)."""
+    held = getattr(_local, "workers", None)
+    return held if held is not None else max(MIN_WORKERS, share())
+
+
+def status() -> dict:
+    with _lock:
+        return {"cpus": os.cpu_count(), "reserve": RESERVE_CPUS,
+                "leases": [{"priority": p, "workers": w} for p, w in _leases.values()],
+                "waiting": _waiting, "next_normal_share": _share("normal")}
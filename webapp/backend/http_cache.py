@@ -0,0 +1,77 @@
+"""
+Conditional GETs and rendered-export caching keyed by a year's schedule_version.
+
+Every write to a year's schedule or roster bumps years.schedule_version (versions.bump), so
+(year, version) identifies the data behind a grid read or export. Responses carry an ETag
+built from it; a request whose If-None-Match matches gets 304 without touching the data.
+Rendered exports are kept in a size-bounded LRU keyed by (year, version, format).
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+EXPORT_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class LRUBytesCache:
+    """Thread-safe LRU of bytes values, evicting least recently used entries beyond max_bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+export_cache = LRUBytesCache(EXPORT_CACHE_BYTES)
+
+
+def etag(kind: str, year_id: int, version: int) -> str:
+    return f'"{kind}-{year_id}-{version}"'
+
+
+def not_modified(request: Request, tag: str) -> Optional[Response]:
+    """304 response when the client's If-None-Match already names tag, else None."""
+    header = request.headers.get("if-none-match", "")
+    candidates = {t.strip().removeprefix("W/") for t in header.split(",")}
+    if tag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=cache_headers(tag))
+    return None
+
+
+def cache_headers(tag: str) -> dict:
+    # no-cache: the browser keeps the body but revalidates with If-None-Match on every use
+    return {"ETag": tag, "Cache-Control": "no-cache"}
@@ -1,75 +1,45 @@
 #!/usr/bin/env python3
-"""Import residents from existing master schedule Excel into the webapp DB."""
+"""
+Import residents and schedules from master schedule Excel workbooks into the webapp DB.
+
+  python import_roster_from_excel.py "../../2025 Updated Schedule - Copy 2026.xlsx" "../../2026-2027 Master Schedule.xlsx"
+
+Each workbook replaces the roster and schedule of the year in its file name (2025... ->
+2025-2026), which is created if missing; all workbooks go in one transaction.
+"""
 import sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-import openpyxl
+from fastapi import HTTPException
+
+from main import prepare_database
 from database import SessionLocal
-from models import Resident, Year, Cohort
+import excel_import
+
 
 def main():
-    excel_path = sys.argv[1] if len(sys.argv) > 1 else "../../2025 Updated Schedule - Copy 2026.xlsx"
-    excel_path = Path(__file__).resolve().parent / excel_path
-    if not excel_path.exists():
-        print(f"File not found: {excel_path}")
+    paths = sys.argv[1:] or ["../../2025 Updated Schedule - Copy 2026.xlsx"]
+    paths = [Path(__file__).resolve().parent / p for p in paths]
+    missing = [p for p in paths if not p.exists()]
+    if missing:
+        print(f"File not found: {missing[0]}")
         sys.exit(1)
 
+    prepare_database()  # the schema and rotation catalog, as at app startup
     db = SessionLocal()
-    year = db.query(Year).filter(Year.name == "2025-2026").first()
-    if not year:
-        year = Year(name="2025-2026", start_date="2025-07-01")
-        db.add(year)
-        db.commit()
-        db.refresh(year)
-
-    cohorts = {c.name: c for c in db.query(Cohort).filter(Cohort.year_id == year.id).all()}
-    if not cohorts:
-        for i, name in enumerate(["Cohort 1", "Cohort 2", "Cohort 3", "Cohort 4", "Cohort 5"], 1):
-            c = Cohort(year_id=year.id, name=name, clinic_weeks=[], target_intern_count=2)
-            db.add(c)
+    try:
+        years = excel_import.import_workbooks(db, [(p.name, p.read_bytes()) for p in paths])
         db.commit()
-        cohorts = {c.name: c for c in db.query(Cohort).filter(Cohort.year_id == year.id).all()}
-
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
-    ws = wb["SCHEDULE"]
-    current_cohort = None
-    current_pgy = None
-    created = 0
-
-    for row in range(4, 57):
-        a = ws.cell(row, 1).value
-        b = ws.cell(row, 2).value
-        c = ws.cell(row, 3).value
-        if a and str(a).strip().startswith("Cohort"):
-            current_cohort = str(a).strip()
-        if b:
-            pgy_str = str(b).strip().upper()
-            if pgy_str in ("PGY-1", "PGY-2", "PGY-3"):
-                current_pgy = pgy_str.replace("-", "")
-            elif pgy_str == "TY":
-                current_pgy = "TY"
-        if not c or not str(c).strip():
-            continue
-        if not current_pgy:
-            continue
-
-        name = str(c).strip()
-        cohort_id = cohorts.get(current_cohort).id if current_cohort and current_cohort in cohorts else None
-        if current_pgy == "PGY1":
-            constraints = {"no_cardio_before_week": 7}
-        else:
-            constraints = {}
-
-        existing = db.query(Resident).filter(Resident.name == name, Resident.year_id == year.id).first()
-        if not existing:
-            r = Resident(name=name, pgy=current_pgy, cohort_id=cohort_id, year_id=year.id, constraints_json=constraints)
-            db.add(r)
-            created += 1
+    except HTTPException as e:
+        print(e.detail)
+        sys.exit(1)
+    finally:
+        db.close()
+    for y in years:
+        print(f"{y['year']}: imported {y['created']} residents, {y['assignments']} assignments")
 
-    db.commit()
-    print(f"Imported {created} residents. Total: {db.query(Resident).filter(Resident.year_id == year.id).count()}")
-    db.close()
 
 if __name__ == "__main__":
     main()
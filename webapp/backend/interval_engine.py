@@ -0,0 +1,114 @@
+"""
+Interval formulation of the engine's cell variables: build_model(formulation="interval").
+
+Instead of one rotation variable per (resident, week), a resident's year is a chain of
+rotation blocks: one optional block (a presence literal for a fixed start and length) per
+(rotation, start week, length) whose weeks all allow the rotation (domains.py). Lengths run
+up to the rotation's consecutive cap (Team G, ICU, nights and ICU H 2, floor teams 2 for
+seniors and 4 for interns, vacation exactly 2, anything else 4) and two blocks of the same
+rotation may not touch, so the same-rotation caps hold by construction. A resident's blocks
+cover every week exactly once. With fixed starts and sizes, non-overlap is exactly that
+per-week exactly-one over the presence literals; posting the blocks as interval variables
+under an AddNoOverlap as well only slowed the search (base-50: no schedule within 60s,
+against 22s without it).
+
+The cell literal "resident r on rotation x in week w" is the presence sum of the blocks
+covering it; build_model() posts every other rule on those literals unchanged, and the
+number of blocks replaces the per-week change literals in the objective (with touching
+same-rotation blocks forbidden, blocks - 1 is exactly the number of changes).
+
+solve() is engine.solve() with this formulation, for the benchmarks and the generate endpoint.
+"""
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Sequence, Tuple
+
+from ortools.sat.python import cp_model
+
+import engine
+
+PAIR_CAPPED = ("G", "ICU", "ICU N", "NF", "SWING", "ICU H")
+DEFAULT_MAX_RUN = 4
+
+
+def max_run(res: dict, code: str, floor_codes: Sequence[str]) -> int:
+    """Longest block of code the engine's hard caps allow this resident."""
+    if code in PAIR_CAPPED:
+        return 2
+    if code in floor_codes:
+        return 2 if res.get("is_senior") else 4
+    return DEFAULT_MAX_RUN
+
+
+@dataclass
+class IntervalCells:
+    """Per-cell variables of the interval formulation, in the form build_model() uses them."""
+    model: cp_model.CpModel
+    assign: Dict[Tuple[int, int], cp_model.IntVar] = field(default_factory=dict)
+    domains: Dict[Tuple[int, int], frozenset] = field(default_factory=dict)
+    # (r, w, rotation index) -> literal; only for rotations some block covers
+    lits: Dict[Tuple[int, int, int], cp_model.IntVar] = field(default_factory=dict)
+    # Presence literal of every block (the objective counts them instead of changes)
+    blocks: List[cp_model.IntVar] = field(default_factory=list)
+
+    def literal(self, r: int, w: int, idx: int):
+        return self.lits[(r, w, idx)]
+
+    def literal_in(self, r: int, w: int, idx_list: Sequence[int]):
+        """One literal for "any of idx_list" (the cell's literals are exactly one, so their sum is 0/1)."""
+        b = self.model.NewBoolVar("")
+        self.model.Add(b == sum(self.lits[(r, w, i)] for i in idx_list))
+        return b
+
+
+def interval_cells(model: cp_model.CpModel, residents: List[dict], weeks: List[int], domains,
+                   rot_codes: List[str], floor_codes: Sequence[str]) -> IntervalCells:
+    cells = IntervalCells(model=model)
+    last = weeks[-1]
+    for r, res in enumerate(residents):
+        allowed = {w: domains.allowed(r, w) for w in weeks}
+        cover: Dict[int, Dict[int, list]] = {w: {} for w in weeks}
+        starts: Dict[Tuple[int, int], list] = {}
+        ends: Dict[Tuple[int, int], list] = {}
+        for x, code in enumerate(rot_codes):
+            lengths = (2,) if code == "VACATION" else range(1, max_run(res, code, floor_codes) + 1)
+            for s in weeks:
+                for length in lengths:
+                    span = range(s, s + length)
+                    if s + length - 1 > last or any(x not in allowed[w] for w in span):
+                        continue
+                    p = model.NewBoolVar(f"blk_{r}_{x}_{s}_{length}")
+                    for w in span:
+                        cover[w].setdefault(x, []).append(p)
+                    starts.setdefault((x, s), []).append(p)
+                    ends.setdefault((x, s + length - 1), []).append(p)
+                    cells.blocks.append(p)
+        # Two blocks of the same rotation never touch
+        for (x, e), ps in ends.items():
+            following = starts.get((x, e + 1))
+            if following:
+                model.AddAtMostOne(ps + following)
+        for w in weeks:
+            lits = []
+            for x, ps in sorted(cover[w].items()):
+                if len(ps) == 1:
+                    lit = ps[0]
+                else:
+                    lit = model.NewBoolVar(f"on_{r}_{w}_{x}")
+                    model.Add(lit == sum(ps))
+                cells.lits[(r, w, x)] = lit
+                lits.append((x, lit))
+            model.AddExactlyOne([lit for _, lit in lits])
+            dom = frozenset(x for x, _ in lits)
+            cells.domains[(r, w)] = dom
+            if dom:
+                var = model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted(dom)), f"a_{r}_{w}")
+                model.Add(var == sum(x * lit for x, lit in lits))
+            else:
+                var = model.NewIntVar(0, len(rot_codes) - 1, f"a_{r}_{w}")  # no block fits: infeasible
+            cells.assign[(r, w)] = var
+    return cells
+
+
+solve = partial(engine.solve, formulation="interval")
+solve.__doc__ = "engine.solve() on the interval formulation; same arguments and results."
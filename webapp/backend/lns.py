@@ -0,0 +1,240 @@
+"""Large Neighborhood Search driver on top of the engine's CP-SAT model.
+
+CP-SAT finds a first schedule quickly but then spends most of the time limit with
+little improvement. This driver takes the first solution as the incumbent and
+repeatedly frees one neighborhood (a cohort, a 6-week window, the seniors of one
+quarter, or the residents with the largest deficits), fixes every other cell to
+its incumbent value, and re-solves the small sub-problem with the incumbent as a
+hint. Neighborhood types that produced improvements recently are picked more often.
+The loop ends at the time limit or on a stopping rule (scheduler/stopping.py): the gap
+rules against the first solve's bound, no significant improvement for stagnation_seconds,
+or max_clean_solutions improving incumbents without penalty.
+"""
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from engine import BuiltModel, ObjectiveCurve, SearchLog, build_model, response_stats, stop_reason, tuned_solver, solve
+from scheduler.stopping import DEFAULT_STOP_RULES, StopRules, significant, within_gap
+
+NEIGHBORHOOD_TYPES = ["cohort", "window", "senior_quarter", "deficit"]
+WINDOW_WEEKS = 6
+QUARTER_WEEKS = 13
+
+
+class NeighborhoodSelector:
+    """Roulette selection over neighborhood types, weighted by recent improvement per second."""
+
+    def __init__(self, types: List[str], rng: random.Random, decay: float = 0.3, floor: float = 0.05):
+        self.rng = rng
+        self.decay = decay
+        self.floor = floor
+        self.scores = {t: 1.0 for t in types}
+        self.tries = {t: 0 for t in types}
+        self.wins = {t: 0 for t in types}
+
+    def pick(self) -> str:
+        top = max(self.scores.values()) or 1.0
+        weights = [max(self.floor, s / top) for s in self.scores.values()]
+        return self.rng.choices(list(self.scores), weights=weights)[0]
+
+    def update(self, kind: str, improvement: float, seconds: float) -> None:
+        self.tries[kind] += 1
+        if improvement > 0:
+            self.wins[kind] += 1
+        # Normalise so a win scores ~1 regardless of the objective's (very large) scale
+        reward = (1.0 if improvement > 0 else 0.0) / max(seconds, 0.1)
+        self.scores[kind] = (1 - self.decay) * self.scores[kind] + self.decay * reward
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            t: {"tries": self.tries[t], "improved": self.wins[t], "score": round(self.scores[t], 4)}
+            for t in self.scores
+        }
+
+
+def _neighborhood(kind: str, built: BuiltModel, resident_penalty: Dict[int, float], rng: random.Random):
+    """Return (label, set of (r, w) cells to free) for the given neighborhood type."""
+    residents = built.residents
+    weeks = built.weeks
+    all_r = range(len(residents))
+    if kind == "cohort":
+        groups = {}
+        for r, res in enumerate(residents):
+            key = res.get("cohort_id") if not res.get("is_ty") else "TY"
+            if key is not None:
+                groups.setdefault(key, []).append(r)
+        if groups:
+            key = rng.choice(sorted(groups, key=str))
+            return f"cohort {key}", {(r, w) for r in groups[key] for w in weeks}
+        kind = "window"
+    if kind == "senior_quarter":
+        seniors = [r for r in all_r if residents[r].get("is_senior")]
+        if seniors:
+            q = rng.randrange(4)
+            qweeks = [w for w in weeks if q * QUARTER_WEEKS < w <= (q + 1) * QUARTER_WEEKS]
+            return f"seniors Q{q + 1}", {(r, w) for r in seniors for w in qweeks}
+        kind = "window"
+    if kind == "deficit":
+        worst = sorted(all_r, key=lambda r: resident_penalty.get(r, 0), reverse=True)
+        k = max(4, len(residents) // 8)
+        picked = [r for r in worst[:k] if resident_penalty.get(r, 0) > 0]
+        if picked:
+            return "largest deficits", {(r, w) for r in picked for w in weeks}
+        kind = "window"
+    start = rng.randint(weeks[0], weeks[-1] - WINDOW_WEEKS + 1)
+    return f"weeks {start}-{start + WINDOW_WEEKS - 1}", {
+        (r, w) for r in all_r for w in range(start, start + WINDOW_WEEKS)
+    }
+
+
+def _resident_penalties(built: BuiltModel, value) -> Dict[int, float]:
+    return {r: sum(value(t) for t in terms) for r, terms in built.penalty_by_resident.items()}
+
+
+def solve_lns(
+    residents: List[dict],
+    requirements_by_pgy: Dict[str, List[dict]],
+    completions_by_resident: Dict[int, Dict[str, int]],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    time_limit: int = 300,
+    random_seed: Optional[int] = None,
+    first_solution_seconds: Optional[float] = None,
+    neighborhood_seconds: float = 10.0,
+    num_workers: Optional[int] = None,
+    stats: Optional[dict] = None,
+    stop_rules: Optional[StopRules] = None,
+    **build_kwargs,
+) -> Tuple[Optional[Dict[int, Dict[int, str]]], str, List[str]]:
+    """
+    Same inputs and return value as engine.solve(); improves the first solution with LNS.
+    stats (optional) is filled like engine.solve()'s, plus per-neighborhood success counts;
+    search counters are summed over the first solve and every neighborhood solve.
+    """
+    t0 = time.time()
+    lim = time_limit if time_limit > 0 else 300
+    rng = random.Random(random_seed if random_seed is not None else 0)
+    built = build_model(residents, requirements_by_pgy, completions_by_resident, vacation_requests,
+                        cohort_defs=cohort_defs, **build_kwargs)
+    build_seconds = time.time() - t0
+    formulation = build_kwargs.get("formulation", "grid")
+    workers = {"num_workers": num_workers} if num_workers else None
+
+    # Phase 1: plain CP-SAT until the first solution, with the whole budget unless overridden
+    first_limit = lim - build_seconds
+    if first_solution_seconds:
+        first_limit = min(first_solution_seconds, first_limit)
+    solver, solver_params = tuned_solver(len(residents), formulation, workers)
+    solver.parameters.max_time_in_seconds = float(max(first_limit, 1.0))
+    solver.parameters.stop_after_first_solution = True
+    if random_seed is not None:
+        solver.parameters.random_seed = random_seed
+    search_log = SearchLog(solver) if stats is not None else None
+    first = ObjectiveCurve(offset=build_seconds)
+    status = solver.Solve(built.model, first)
+    effort = response_stats(solver)
+    timing = {
+        "build_seconds": round(build_seconds, 3),
+        "presolve_seconds": search_log.presolve_seconds if search_log else None,
+        "first_solution_seconds": first.points[0][0] if first.points else None,
+    }
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        if stats is not None:
+            stats.update({"curve": first.points, "objective": None, "best_bound": None, "neighborhoods": {},
+                          "status": solver.StatusName(status), "solve_seconds": round(solver.WallTime(), 3),
+                          "stop_reason": stop_reason(solver, status, None, False),
+                          **timing, **effort})
+        return None, solver.StatusName(status), [solver.StatusName(status)]
+
+    incumbent = built.read(solver.Value)
+    best_obj = solver.ObjectiveValue()
+    best_bound = solver.BestObjectiveBound()  # neighborhood solves only bound their own sub-problem
+    penalties = _resident_penalties(built, solver.Value)
+    curve = [(round(time.time() - t0, 3), best_obj)]
+    log = []
+    selector = NeighborhoodSelector(NEIGHBORHOOD_TYPES, rng)
+    final_status = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
+    rules = DEFAULT_STOP_RULES if stop_rules is None else stop_rules
+    reason = "optimal" if final_status == "OPTIMAL" else within_gap(rules, best_obj, best_bound)
+    clean = int(built.penalty is not None and solver.Value(built.penalty) == 0)
+    last_improved, last_best = time.time(), best_obj
+
+    # Phase 2: fix everything outside one neighborhood and re-solve the rest
+    while reason is None:
+        remaining = lim - (time.time() - t0)
+        if remaining < 1:
+            reason = "time_limit"
+            break
+        if rules.stagnation_seconds and time.time() - last_improved >= rules.stagnation_seconds:
+            reason = "stagnation_seconds"
+            break
+        if rules.max_clean_solutions and clean >= rules.max_clean_solutions:
+            reason = "max_clean_solutions"
+            break
+        kind = selector.pick()
+        label, free = _neighborhood(kind, built, penalties, rng)
+        sub = built.model.Clone()
+        for key, var in built.distinct():
+            if key in free:
+                sub.AddHint(var, incumbent[key])
+            else:
+                sub.Add(sub.GetIntVarFromProtoIndex(var.Index()) == incumbent[key])
+        sub_solver, _ = tuned_solver(len(residents), formulation, workers)
+        sub_solver.parameters.max_time_in_seconds = float(min(neighborhood_seconds, remaining))
+        sub_solver.parameters.random_seed = rng.randrange(1 << 30)
+        t_iter = time.time()
+        sub_status = sub_solver.Solve(sub)
+        spent = time.time() - t_iter
+        for key, n in response_stats(sub_solver).items():
+            effort[key] += n
+        improvement = 0.0
+        if sub_status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and sub_solver.ObjectiveValue() < best_obj:
+            if significant(last_best, sub_solver.ObjectiveValue()):
+                last_improved, last_best = time.time(), sub_solver.ObjectiveValue()
+            improvement = best_obj - sub_solver.ObjectiveValue()
+            best_obj = sub_solver.ObjectiveValue()
+            incumbent = built.read(sub_solver.Value)
+            penalties = _resident_penalties(built, sub_solver.Value)
+            curve.append((round(time.time() - t0, 3), best_obj))
+            clean += int(built.penalty is not None and sub_solver.Value(built.penalty) == 0)
+            reason = within_gap(rules, best_obj, best_bound)
+        selector.update(kind, improvement, spent)
+        log.append({"neighborhood": kind, "label": label, "seconds": round(spent, 3), "improvement": improvement})
+        if len(free) == len(built.assign) and sub_status == cp_model.OPTIMAL:
+            final_status, reason = "OPTIMAL", "optimal"
+
+    if stats is not None:
+        stats.update({
+            "curve": curve,
+            "objective": best_obj,
+            "best_bound": best_bound,
+            "status": final_status,
+            "stop_reason": reason,
+            "solve_seconds": round(time.time() - t0 - build_seconds, 3),
+            **timing,
+            "solver_params": solver_params,
+            **{key: round(n, 3) for key, n in effort.items()},
+            "neighborhoods": selector.summary(),
+            "iterations": log,
+        })
+    return built.extract(incumbent), final_status, []
+
+
+def compare_with_plain(time_limit: int = 300, random_seed: Optional[int] = 0, **solve_kwargs) -> dict:
+    """
+    Run plain CP-SAT and the LNS driver with the same budget and seed, stopping rules off so
+    both use the whole budget.
+    Returns {"plain": {"curve", "objective", "status"}, "lns": {...}} — curves are (seconds, objective).
+    """
+    out = {}
+    for name, fn in (("plain", solve), ("lns", solve_lns)):
+        stats = {}
+        _, status, _ = fn(time_limit=time_limit, random_seed=random_seed, stats=stats, stop_rules=StopRules(),
+                          **solve_kwargs)
+        out[name] = {"status": status, "objective": stats.get("objective"), "curve": stats.get("curve", [])}
+        if name == "lns":
+            out[name]["neighborhoods"] = stats.get("neighborhoods", {})
+    return out
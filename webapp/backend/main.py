@@ -1,50 +1,150 @@
 """FastAPI application for IM Residency Schedule Generator."""
+import startup
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from sqlalchemy import inspect, text
 
 from database import engine, Base, get_db
+# The routers import the scheduler package at the repo root: run.py puts the root on sys.path,
+# `uvicorn main:app` needs it on PYTHONPATH (see webapp/README.md)
 from routers import residents, requirements, completions, vacations, schedule, export, years, cohorts, rotations, rollover
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Columns added after tables were first created (create_all does not alter existing tables)
+ADDED_COLUMNS = [
+    ("residents", "is_placeholder", "BOOLEAN DEFAULT 0"),
+    ("residents", "prior_resident_id", "INTEGER REFERENCES residents(id)"),
+    ("requirements", "track", "VARCHAR(50)"),
+    ("residents", "track", "VARCHAR(50)"),
+    ("vacation_requests", "option", "INTEGER NOT NULL DEFAULT 1"),
+    ("years", "schedule_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("solve_runs", "solver_version", "VARCHAR(20)"),
+    ("solve_runs", "solver_params_json", "JSON"),
+    ("solve_runs", "model_hash", "VARCHAR(64)"),
+    ("solve_runs", "reproducible", "BOOLEAN DEFAULT 0"),
+    ("solve_runs", "version_id", "INTEGER REFERENCES schedule_versions(id) ON DELETE SET NULL"),
+    ("solve_runs", "stop_reason", "VARCHAR(30)"),
+]
 
-# Add is_placeholder column if missing (migration)
-from sqlalchemy import text
-try:
-    with engine.connect() as conn:
-        conn.execute(text("ALTER TABLE residents ADD COLUMN is_placeholder BOOLEAN DEFAULT 0"))
-        conn.commit()
-except Exception:
-    pass
-try:
-    with engine.connect() as conn:
-        conn.execute(text("ALTER TABLE residents ADD COLUMN prior_resident_id INTEGER REFERENCES residents(id)"))
-        conn.commit()
-except Exception:
-    pass
-try:
+# One-off data fixes, each applied once per database (PRAGMA user_version counts those applied)
+DATA_FIXES = [
+    # Seeded SWING rows said 1 senior / 0 interns; SWING has always been 1 senior + 1 intern
+    # (2 on holidays), which the engine enforced before it read coverage from this table
+    "UPDATE coverage_rules SET interns_per_unit = 1"
+    " WHERE pool = 'SWING' AND seniors_per_unit = 1 AND interns_per_unit = 0",
+]
+
+
+def _add_columns():
+    inspector = inspect(engine)
+    existing = {}
     with engine.connect() as conn:
-        conn.execute(text("ALTER TABLE requirements ADD COLUMN track VARCHAR(50)"))
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing:
+                existing[table] = {c["name"] for c in inspector.get_columns(table)}
+            if column not in existing[table]:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
         conn.commit()
-except Exception:
-    pass
-try:
+
+
+def _apply_data_fixes():
     with engine.connect() as conn:
-        conn.execute(text("ALTER TABLE residents ADD COLUMN track VARCHAR(50)"))
+        applied = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        for sql in DATA_FIXES[applied:]:
+            conn.exec_driver_sql(sql)
+        if applied < len(DATA_FIXES):
+            conn.exec_driver_sql(f"PRAGMA user_version = {len(DATA_FIXES)}")
         conn.commit()
-except Exception:
-    pass
-try:
+
+
+def _rebuild_foreign_keys():
+    """
+    Give tables created before their foreign keys declared ON DELETE actions (models.py) the
+    declared constraints and indexes. SQLite cannot alter a constraint, so each such table is
+    copied into a new table built from the model, then swapped in (foreign keys off meanwhile).
+    """
+    from sqlalchemy.schema import CreateTable
     with engine.connect() as conn:
-        conn.execute(text("ALTER TABLE vacation_requests ADD COLUMN option INTEGER NOT NULL DEFAULT 1"))
+        stale = []
+        for table in Base.metadata.sorted_tables:
+            declared = {fk.parent.name: fk.ondelete.upper() for fk in table.foreign_keys if fk.ondelete}
+            if not declared:
+                continue
+            actual = {row[3]: row[6] for row in conn.exec_driver_sql(f"PRAGMA foreign_key_list({table.name})")}
+            if any(actual.get(col) != action for col, action in declared.items()):
+                stale.append(table)
+        if not stale:
+            return
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")  # no effect inside a transaction: set first
+        for table in stale:
+            existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+            cols = ", ".join(c.name for c in table.columns if c.name in existing)
+            ddl = str(CreateTable(table).compile(engine)).replace(
+                f"CREATE TABLE {table.name} ", f"CREATE TABLE _new_{table.name} ", 1)
+            conn.exec_driver_sql(ddl)
+            conn.exec_driver_sql(f"INSERT INTO _new_{table.name} ({cols}) SELECT {cols} FROM {table.name}")
+            conn.exec_driver_sql(f"DROP TABLE {table.name}")
+            conn.exec_driver_sql(f"ALTER TABLE _new_{table.name} RENAME TO {table.name}")
+            for index in table.indexes:
+                index.create(conn)
         conn.commit()
-except Exception:
-    pass
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def prepare_database():
+    """
+    Bring the database up to date (tables, added columns, data fixes, foreign keys), then
+    compile the rotation catalog and import legacy backups. Runs at app startup, not at import,
+    so importing main stays cheap; scripts that write without the app call it themselves.
+    """
+    Base.metadata.create_all(bind=engine)
+    _add_columns()
+    _apply_data_fixes()
+    _rebuild_foreign_keys()
+    from database import SessionLocal
+    from rotation_catalog import load_catalog
+    from versions import import_backups
+    with SessionLocal() as db:
+        load_catalog(db)
+        # Legacy full-grid backups become snapshot versions (first start after upgrade only)
+        import_backups(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    prepare_database()
+    startup.mark("database")
+    yield
+
+
+# Responses GZip leaves alone, by path suffix
+UNCOMPRESSED_PATHS = (
+    "/changes/stream",  # older Starlette releases compress text/event-stream and hold pushed events back
+    "/export/excel",  # xlsx is already a deflated zip; gzipping the cached bytes gains almost nothing
+)
+
+
+class StreamSafeGZip(GZipMiddleware):
+    """
+    GZip except for the change-feed event stream and the xlsx export (UNCOMPRESSED_PATHS).
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith(UNCOMPRESSED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 
 app = FastAPI(
     title="IM Residency Schedule Generator",
     description="Resident-dependent scheduling with OR-Tools CP-SAT",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -55,6 +155,8 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+# Grid, remaining and change-feed JSON payloads compress 5-20x
+app.add_middleware(StreamSafeGZip, minimum_size=1024)
 
 app.include_router(years.router, prefix="/api/years", tags=["years"])
 app.include_router(cohorts.router, prefix="/api/cohorts", tags=["cohorts"])
@@ -68,11 +170,17 @@ app.include_router(export.router, prefix="/api/export", tags=["export"])
 app.include_router(rollover.router, prefix="/api/rollover", tags=["rollover"])
 
 
+@app.get("/api/health")
+def health():
+    """Readiness probe (run.py opens the browser on the first success) and startup phase timings."""
+    startup.mark("ready")
+    return {"ok": True, "startup": startup.report()}
+
+
+
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from pathlib import Path
 import os
-import sys
 
 # Serve static files if "static" directory exists (prod/app mode)
 # In PyInstaller, we might put static files in sys._MEIPASS/static or local static folder
@@ -87,6 +195,7 @@ if STATIC_DIR.exists():
     
     @app.get("/{full_path:path}")
     async def serve_spa(full_path: str):
+        startup.mark("first_page")
         # API requests are already handled by routers above due to order
         # Check if file exists
         file_path = STATIC_DIR / full_path
@@ -97,4 +206,7 @@ if STATIC_DIR.exists():
 else:
     @app.get("/")
     def root():
+        startup.mark("first_page")
         return {"message": "IM Residency Schedule Generator API (Dev Mode)", "docs": "/docs"}
+
+startup.mark("imported")
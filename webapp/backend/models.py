@@ -14,6 +14,7 @@ class Year(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), unique=True, index=True)  # e.g. "2025-2026"
     start_date = Column(String(20))  # e.g. "2025-07-01"
+    schedule_version = Column(Integer, nullable=False, default=0)  # bumped by every schedule/roster write
 
 
 class Resident(Base):
@@ -21,19 +22,20 @@ class Resident(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, index=True)
     pgy = Column(String(10), nullable=False)  # PGY1, PGY2, PGY3, TY
-    cohort_id = Column(Integer, ForeignKey("cohorts.id"), nullable=True)
-    prior_resident_id = Column(Integer, ForeignKey("residents.id"), nullable=True)  # prior year when rolled over
+    cohort_id = Column(Integer, ForeignKey("cohorts.id", ondelete="SET NULL"), nullable=True)
+    prior_resident_id = Column(Integer, ForeignKey("residents.id", ondelete="SET NULL"), nullable=True)  # prior year when rolled over
     track = Column(String(50), nullable=True)  # anesthesia, etc.
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False, index=True)
     constraints_json = Column(JSON, default=dict)  # {"no_cardio_before_week": 7}
     is_placeholder = Column(Boolean, default=False)  # Intern 01, TY 01, etc.
     created_at = Column(DateTime, default=datetime.utcnow)
 
     cohort = relationship("Cohort", back_populates="residents")
     year = relationship("Year")
-    completions = relationship("Completion", back_populates="resident")
-    vacation_requests = relationship("VacationRequest", back_populates="resident")
-    schedule_assignments = relationship("ScheduleAssignment", back_populates="resident")
+    # Rows owned by a resident go with it: ON DELETE CASCADE in the database, not per-row ORM deletes
+    completions = relationship("Completion", back_populates="resident", passive_deletes=True)
+    vacation_requests = relationship("VacationRequest", back_populates="resident", passive_deletes=True)
+    schedule_assignments = relationship("ScheduleAssignment", back_populates="resident", passive_deletes=True)
 
     @property
     def is_senior(self) -> bool:
@@ -51,7 +53,7 @@ class Resident(Base):
 class Cohort(Base):
     __tablename__ = "cohorts"
     id = Column(Integer, primary_key=True, index=True)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(50), nullable=False)  # Cohort 1, Cohort 2, ...
     clinic_weeks = Column(JSON, default=list)  # [1,6,11,16,...]
     target_intern_count = Column(Integer, default=2)
@@ -77,7 +79,7 @@ class Requirement(Base):
 class Completion(Base):
     __tablename__ = "completions"
     id = Column(Integer, primary_key=True, index=True)
-    resident_id = Column(Integer, ForeignKey("residents.id"), nullable=False)
+    resident_id = Column(Integer, ForeignKey("residents.id", ondelete="CASCADE"), nullable=False, index=True)
     category = Column(String(50), nullable=False)
     completed_weeks = Column(Integer, nullable=False, default=0)
     source = Column(String(20), default="manual")
@@ -89,8 +91,8 @@ class Completion(Base):
 class VacationRequest(Base):
     __tablename__ = "vacation_requests"
     id = Column(Integer, primary_key=True, index=True)
-    resident_id = Column(Integer, ForeignKey("residents.id"), nullable=False)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    resident_id = Column(Integer, ForeignKey("residents.id", ondelete="CASCADE"), nullable=False, index=True)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False)
     block = Column(Integer, nullable=False)  # 1 = Block A, 2 = Block B
     option = Column(Integer, nullable=False, default=1)  # 1 or 2 = which date choice for that block
     start_week = Column(Integer, nullable=False)
@@ -104,7 +106,7 @@ class VacationRequest(Base):
 class Week(Base):
     __tablename__ = "weeks"
     id = Column(Integer, primary_key=True, index=True)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False)
     week_number = Column(Integer, nullable=False)
     start_date = Column(String(20))
     end_date = Column(String(20))
@@ -126,7 +128,7 @@ class Rotation(Base):
 class CoverageRule(Base):
     __tablename__ = "coverage_rules"
     id = Column(Integer, primary_key=True, index=True)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False)
     week_scope = Column(String(20), default="all")  # all or specific
     pool = Column(String(50), nullable=False)
     required_units_per_week = Column(Integer, nullable=False)
@@ -138,19 +140,78 @@ class CoverageRule(Base):
 class ScheduleAssignment(Base):
     __tablename__ = "schedule_assignments"
     id = Column(Integer, primary_key=True, index=True)
-    resident_id = Column(Integer, ForeignKey("residents.id"), nullable=False)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    resident_id = Column(Integer, ForeignKey("residents.id", ondelete="CASCADE"), nullable=False, index=True)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False, index=True)
     week_number = Column(Integer, nullable=False)
     rotation_code = Column(String(50), nullable=False)
 
     resident = relationship("Resident", back_populates="schedule_assignments")
 
 
-class ScheduleBackup(Base):
-    """Backup of schedule assignments before clear. JSON: {resident_id: {week: rotation_code}}."""
-    __tablename__ = "schedule_backups"
+class ScheduleVersion(Base):
+    """
+    One change to a year's schedule (see versions.py). delta_json: [[resident_id, week, old, new], ...]
+    with None for an empty cell. Every few versions also stores the full grid in snapshot_json
+    ({resident_id: {week: rotation_code}}) so restoring replays a bounded number of deltas.
+    """
+    __tablename__ = "schedule_versions"
     id = Column(Integer, primary_key=True, index=True)
-    year_id = Column(Integer, ForeignKey("years.id"), nullable=False)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False, index=True)
+    parent_id = Column(Integer, ForeignKey("schedule_versions.id", ondelete="CASCADE"))
+    source = Column(String(20), nullable=False)  # generate, edit, paste, import, clear, restore, promote, completion, baseline
     description = Column(String(200), nullable=False)
+    change_count = Column(Integer, default=0)
+    delta_json = Column(Text, nullable=False, default="[]")
+    snapshot_json = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SolveRun(Base):
+    """Telemetry of one schedule generation job (kept after the in-memory job is gone)."""
+    __tablename__ = "solve_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    engine = Column(String(20))  # cp-sat, lns, anytime
+    input_hash = Column(String(64), index=True)  # sha256 of the solver inputs
+    roster_json = Column(JSON, default=dict)  # {"residents": 48, "PGY1": 18, "seniors": 26, ...}
+    params_json = Column(JSON, default=dict)  # {"time_limit": 300, "random_seed": null, ...}
+    status = Column(String(30))  # OPTIMAL, FEASIBLE, INFEASIBLE, UNKNOWN, PRECHECK_FAILED, ERROR
+    success = Column(Boolean, default=False)
+    load_seconds = Column(Float)
+    build_seconds = Column(Float)
+    presolve_seconds = Column(Float)
+    first_solution_seconds = Column(Float)
+    solve_seconds = Column(Float)
+    diagnose_seconds = Column(Float)
+    write_seconds = Column(Float)
+    objective = Column(Float)
+    best_bound = Column(Float)
+    num_branches = Column(Integer)
+    num_conflicts = Column(Integer)
+    deterministic_time = Column(Float)
+    curve_json = Column(JSON, default=list)  # sampled [[seconds, objective], ...]
+    message = Column(Text)
+    stop_reason = Column(String(30))  # rule or outcome that ended the search (scheduler/stopping.py)
+    # Reproduction: everything CP-SAT was given (deterministic runs re-solve to the same schedule)
+    solver_version = Column(String(20))  # OR-Tools version
+    solver_params_json = Column(JSON, default=dict)  # CP-SAT parameters as set
+    model_hash = Column(String(64))  # sha256 of the model proto (deterministic runs)
+    reproducible = Column(Boolean, default=False)
+    version_id = Column(Integer, ForeignKey("schedule_versions.id", ondelete="SET NULL"))  # schedule it wrote
+
+
+class ScheduleDraft(Base):
+    """An improving solution of an anytime generate job. JSON: {resident_id: {week: rotation_code}}."""
+    __tablename__ = "schedule_drafts"
+    id = Column(Integer, primary_key=True, index=True)
+    year_id = Column(Integer, ForeignKey("years.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    seq = Column(Integer, nullable=False)  # 1 = first feasible schedule
+    phase = Column(String(20))  # feasibility, optimize
+    objective = Column(Float)  # None for the feasibility-phase schedule
+    elapsed_seconds = Column(Float)
     assignments_json = Column(Text, nullable=False)
+    promoted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,356 @@
+"""
+Capacity pre-check: fast combinatorial bounds run before CP-SAT.
+
+Every blocking check is a necessary condition of a hard constraint in engine.py, so a
+blocking issue proves the model infeasible without spending solver time. Warnings flag
+soft requirements that cannot all be met (the solver will run but leave deficits).
+
+Weekly checks use Hall's condition: residents are matched to the week's roles
+(senior slots, intern slots, clinic minimum) and for every subset of roles the demand
+must not exceed the number of residents eligible for at least one of them.
+"""
+import time
+from itertools import combinations
+from typing import Dict, List, Optional
+
+from engine import CLINIC_MAX_PER_WEEK, CLINIC_MIN_PER_WEEK, MAX_COHORT_SIZE, ROT_CODES
+from scheduler.coverage import DEFAULT_RULES, compile_rules, extra_floor_codes
+
+WEEKS = range(1, 53)
+HOLIDAY_WEEKS = (26, 27)
+VACATION_WEEKS = 4
+NIGHT_CAP_YEAR = 8
+NIGHT_CAP_TOTAL = 16
+HOLIDAY_CLINIC_MAX = 3
+ANESTHESIA_WEEKS = range(49, 53)
+
+ROLE_LABELS = {"senior": "senior slots", "intern": "intern slots", "clinic": "clinic minimum"}
+
+
+def _coverage_tables(coverage_rules: Optional[List]) -> tuple:
+    """
+    Compile coverage rules the way the engine does. Returns
+    (weekly, holiday, night): weekly {week: {pool label: (seniors, interns)}} for regular weeks,
+    holiday {week: {pool label: (total residents, minimum seniors)}}, night {week: (seniors, interns, total)}.
+    Optional pools (Team G) can be switched off, so they add no demand.
+    """
+    rules = coverage_rules or DEFAULT_RULES
+    codes = ROT_CODES + extra_floor_codes(rules, ROT_CODES)
+    plans = compile_rules(rules, {c: i for i, c in enumerate(codes)})
+    weekly, holiday, night = {}, {}, {}
+    for p in plans:
+        if p.optional:
+            continue
+        for w in p.weeks:
+            weekly.setdefault(w, {})[p.label] = (p.seniors, p.interns)
+            if p.kind == "night":
+                sr, jr, tot = night.get(w, (0, 0, 0))
+                night[w] = (sr + p.seniors, jr + p.interns, tot)
+        for w in p.holiday_weeks:
+            holiday.setdefault(w, {})[p.label] = (p.holiday_total, p.holiday_min_seniors)
+            if p.kind == "night":
+                sr, jr, tot = night.get(w, (0, 0, 0))
+                night[w] = (sr, jr, tot + p.holiday_total)
+    return weekly, holiday, night
+
+
+def _breakdown(need: Dict[str, tuple], col: int) -> str:
+    return ", ".join(f"{rot} {n[col]}" for rot, n in need.items() if n[col])
+
+
+def _issue(rule: str, message: str, blocking: bool = True, week: Optional[int] = None,
+           roles: Optional[List[str]] = None, resident_id: Optional[int] = None,
+           demand: Optional[int] = None, supply: Optional[int] = None) -> dict:
+    return {
+        "rule": rule,
+        "blocking": blocking,
+        "week": week,
+        "roles": roles or [],
+        "resident_id": resident_id,
+        "demand": demand,
+        "supply": supply,
+        "message": message,
+    }
+
+
+def capacity_precheck(
+    residents: List[dict],
+    requirements_by_pgy: Dict[str, List[dict]],
+    completions_by_resident: Dict[int, Dict[str, int]],
+    vacation_requests: List[dict],
+    cohort_defs: List[dict] = None,
+    coverage_rules: Optional[List] = None,
+) -> dict:
+    """
+    Check roster capacity against weekly demand and per-resident totals.
+    Takes the same inputs as engine.solve(); demand comes from the compiled coverage rules. Returns
+    {"ok": bool, "elapsed_ms": float, "issues": [...]} where ok is False when any issue is blocking.
+    """
+    t0 = time.perf_counter()
+    issues = []
+    cohort_defs = cohort_defs or []
+    by_id = {r["id"]: r for r in residents}
+    weekly_cov, holiday_cov, night_cov = _coverage_tables(coverage_rules)
+
+    # Hard vacation locks (the engine ignores locks on holiday weeks)
+    locked = {}
+    vac_by_id = {}
+    for vreq in vacation_requests:
+        rid = vreq.get("resident_id")
+        if rid not in by_id:
+            continue
+        vac_by_id[rid] = vreq
+        for start, length in vreq.get("hard_locks", []):
+            for w in range(start, start + length):
+                if w in WEEKS and w not in HOLIDAY_WEEKS:
+                    locked.setdefault(rid, set()).add(w)
+
+    # Cohort clinic weeks force every non-TY member into clinic
+    forced_clinic = {}
+    cohort_names = {}
+    for cd in cohort_defs:
+        cohort_names[cd["cohort_id"]] = cd.get("name") or f"Cohort {cd['cohort_id']}"
+        members = [r for r in residents if r.get("cohort_id") == cd["cohort_id"] and not r.get("is_ty")]
+        for w in cd.get("clinic_weeks") or []:
+            if w in WEEKS and w not in HOLIDAY_WEEKS:
+                for r in members:
+                    forced_clinic.setdefault(r["id"], set()).add(w)
+
+    # Oversized cohorts are only infeasible through their clinic weeks (clinic_max below), so warn
+    cohort_sizes = {}
+    for r in residents:
+        if r.get("cohort_id") and not r.get("is_ty"):
+            cohort_sizes[r["cohort_id"]] = cohort_sizes.get(r["cohort_id"], 0) + 1
+    for cid, n in cohort_sizes.items():
+        if n > MAX_COHORT_SIZE:
+            issues.append(_issue(
+                "cohort_size",
+                f"{cohort_names.get(cid, f'Cohort {cid}')} has {n} non-TY residents; max is {MAX_COHORT_SIZE}.",
+                blocking=False, demand=n, supply=MAX_COHORT_SIZE,
+            ))
+
+    # --- Per-resident checks ---
+    for r in residents:
+        rid, name = r["id"], r["name"]
+        lock = locked.get(rid, set())
+        clinic = forced_clinic.get(rid, set())
+        if len(lock) > VACATION_WEEKS:
+            issues.append(_issue(
+                "vacation_locks",
+                f"{name}: {len(lock)} hard-locked vacation weeks; exactly {VACATION_WEEKS} are scheduled.",
+                resident_id=rid, demand=len(lock), supply=VACATION_WEEKS,
+            ))
+        run = 0
+        for w in WEEKS:
+            run = run + 1 if w in lock else 0
+            if run == 3:
+                issues.append(_issue(
+                    "vacation_locks",
+                    f"{name}: hard-locked vacation weeks {w - 2}-{w} exceed the 2-week block length.",
+                    week=w - 2, resident_id=rid,
+                ))
+        for w in sorted(lock & clinic):
+            issues.append(_issue(
+                "vacation_vs_clinic",
+                f"{name}: week {w} is hard-locked vacation but is a cohort clinic week.",
+                week=w, roles=["clinic"], resident_id=rid,
+            ))
+        # Clinic is capped at 4 weeks in any 5; cohort weeks are forced regardless
+        for s in range(1, 49):
+            if all(w in clinic for w in range(s, s + 5)):
+                issues.append(_issue(
+                    "clinic_stagger",
+                    f"{name}: cohort clinic weeks {s}-{s + 4} are 5 in a row; max is 4 in any 5 weeks.",
+                    week=s, roles=["clinic"], resident_id=rid,
+                ))
+                break
+
+        forced = VACATION_WEEKS + 1 + len(clinic - lock)  # +1: one holiday week is always ICU H
+        if r.get("is_ty") and (r.get("track") or "").lower() == "anesthesia":
+            forced += len(set(ANESTHESIA_WEEKS) - lock - clinic)
+        if forced > len(WEEKS):
+            issues.append(_issue(
+                "resident_weeks",
+                f"{name}: {forced} weeks are already fixed (vacation, holiday, clinic); only {len(WEEKS)} exist.",
+                resident_id=rid, demand=forced, supply=len(WEEKS),
+            ))
+
+        for key, block in (("block_a_options", "Block A"), ("block_b_options", "Block B")):
+            opts = [s for s in vac_by_id.get(rid, {}).get(key) or [] if s not in (25, 26, 27) and 1 <= s <= 51]
+            if opts and all({s, s + 1} & clinic for s in opts):
+                # Not blocking: generation retries with vacation blocks relaxed
+                issues.append(_issue(
+                    "vacation_vs_clinic",
+                    f"{name}: every {block} vacation option overlaps a cohort clinic week.",
+                    blocking=False, roles=["clinic"], resident_id=rid,
+                ))
+
+        # Soft: requirement totals against the weeks left after fixed weeks.
+        # NF / ICU_NIGHT weeks also count as FLOORS / ICU, and core electives count as ELECTIVE.
+        if not r.get("is_ty"):
+            reqs = requirements_by_pgy.get(f"{r['pgy']}:{r.get('track') or ''}", []) or requirements_by_pgy.get(f"{r['pgy']}:", [])
+            comp = completions_by_resident.get(rid, {})
+            remaining = {}
+            for q in reqs:
+                done = 0 if q["category"] in ("FLOORS", "ICU", "CLINIC") else comp.get(q["category"], 0)
+                remaining[q["category"]] = max(0, q["required_weeks"] - done)
+            core = sum(n for cat, n in remaining.items()
+                       if cat not in ("FLOORS", "ICU", "CLINIC", "ELECTIVE", "VACATION", "NF", "ICU_NIGHT"))
+            needed = (remaining.get("FLOORS", 0) + remaining.get("ICU", 0) + remaining.get("CLINIC", 0)
+                      + max(core, remaining.get("ELECTIVE", 0)))
+            # The holiday week off (ICU H) counts as ELECTIVE, so it is only lost without an elective need
+            available = len(WEEKS) - VACATION_WEEKS - (0 if remaining.get("ELECTIVE") else 1)
+            if needed > available:
+                issues.append(_issue(
+                    "requirements",
+                    f"{name}: requirements need {needed} weeks but only {available} are available; deficits are unavoidable.",
+                    blocking=False, resident_id=rid, demand=needed, supply=available,
+                ))
+
+    # --- Per-week checks (non-holiday): Hall's condition over senior / intern / clinic roles ---
+    roles = ["senior", "intern", "clinic"]
+    for w in WEEKS:
+        if w in HOLIDAY_WEEKS:
+            continue
+        need_by_pool = weekly_cov.get(w, {})
+        demand = {"senior": sum(s for s, _ in need_by_pool.values()),
+                  "intern": sum(i for _, i in need_by_pool.values()),
+                  "clinic": CLINIC_MIN_PER_WEEK}
+        eligible = []
+        n_forced_clinic = 0
+        forced_cohorts = set()
+        excluded = {"vacation": 0, "clinic": 0, "pgy2_week1": 0, "anesthesia": 0}
+        for r in residents:
+            rid = r["id"]
+            if w in locked.get(rid, ()):
+                excluded["vacation"] += 1
+                eligible.append(set())
+            elif w in forced_clinic.get(rid, ()):
+                n_forced_clinic += 1
+                forced_cohorts.add(r.get("cohort_id"))
+                excluded["clinic"] += 1
+                eligible.append({"clinic"})
+            elif r.get("is_ty"):
+                if (r.get("track") or "").lower() == "anesthesia" and w in ANESTHESIA_WEEKS:
+                    excluded["anesthesia"] += 1
+                    eligible.append(set())
+                else:
+                    eligible.append({"intern"})
+            elif r.get("is_senior"):
+                if r.get("pgy") == "PGY2" and w == 1:
+                    excluded["pgy2_week1"] += 1
+                    eligible.append({"clinic"})
+                else:
+                    eligible.append({"senior", "clinic"})
+            else:
+                eligible.append({"intern", "clinic"})
+
+        if n_forced_clinic > CLINIC_MAX_PER_WEEK:
+            names = ", ".join(cohort_names.get(c, f"Cohort {c}") for c in sorted(forced_cohorts, key=str))
+            issues.append(_issue(
+                "clinic_max",
+                f"Week {w}: {names} force {n_forced_clinic} residents into clinic; max is {CLINIC_MAX_PER_WEEK}.",
+                week=w, roles=["clinic"], demand=n_forced_clinic, supply=CLINIC_MAX_PER_WEEK,
+            ))
+
+        reasons = ", ".join(f"{n} {label}" for label, n in (
+            ("on locked vacation", excluded["vacation"]),
+            ("in cohort clinic", excluded["clinic"]),
+            ("PGY2s held out of week 1", excluded["pgy2_week1"]),
+            ("anesthesia TYs", excluded["anesthesia"]),
+        ) if n)
+        # Report the smallest violated role sets only; supersets of a violated set add nothing
+        violated = []
+        for size in range(1, len(roles) + 1):
+            for subset in combinations(roles, size):
+                if any(set(v) <= set(subset) for v in violated):
+                    continue
+                need = sum(demand[x] for x in subset)
+                have = sum(1 for e in eligible if e & set(subset))
+                if need > have:
+                    violated.append(subset)
+                    if subset == ("senior",):
+                        msg = f"Week {w}: {have} seniors available for {need} senior slots ({_breakdown(need_by_pool, 0)})"
+                    elif subset == ("intern",):
+                        msg = f"Week {w}: {have} interns available for {need} intern slots ({_breakdown(need_by_pool, 1)})"
+                    elif subset == ("clinic",):
+                        msg = f"Week {w}: {have} non-TY residents available for clinic minimum of {need}"
+                    else:
+                        label = " + ".join(ROLE_LABELS[x] for x in subset)
+                        msg = f"Week {w}: {label} need {need} residents, only {have} can fill them"
+                    if reasons:
+                        msg += f" — {reasons}"
+                    issues.append(_issue("week_capacity", msg + ".", week=w, roles=list(subset),
+                                         demand=need, supply=have))
+
+    # --- Holiday weeks: every non-PGY3 works exactly one, PGY3 at most one ---
+    # Totals over both holiday weeks
+    hol_total = sum(t for w in HOLIDAY_WEEKS for t, _ in holiday_cov.get(w, {}).values())
+    hol_seniors = sum(s for w in HOLIDAY_WEEKS for _, s in holiday_cov.get(w, {}).values())
+    n_pgy3 = sum(1 for r in residents if r.get("pgy") == "PGY3")
+    n_must = len(residents) - n_pgy3
+    n_seniors = sum(1 for r in residents if r.get("is_senior"))
+    if len(residents) < hol_total:
+        issues.append(_issue(
+            "holiday_coverage",
+            f"Holiday weeks {HOLIDAY_WEEKS[0]}/{HOLIDAY_WEEKS[1]}: {hol_total} coverage slots but only "
+            f"{len(residents)} residents, and each works at most one holiday week.",
+            week=HOLIDAY_WEEKS[0], roles=["senior", "intern"], demand=hol_total, supply=len(residents),
+        ))
+    if n_seniors < hol_seniors:
+        issues.append(_issue(
+            "holiday_coverage",
+            f"Holiday weeks {HOLIDAY_WEEKS[0]}/{HOLIDAY_WEEKS[1]}: need {hol_seniors} senior slots over both weeks "
+            f"(floor teams and ICU) but only {n_seniors} seniors.",
+            week=HOLIDAY_WEEKS[0], roles=["senior"], demand=hol_seniors, supply=n_seniors,
+        ))
+    hol_capacity = hol_total + len(HOLIDAY_WEEKS) * HOLIDAY_CLINIC_MAX
+    if n_must > hol_capacity:
+        issues.append(_issue(
+            "holiday_capacity",
+            f"Holiday weeks {HOLIDAY_WEEKS[0]}/{HOLIDAY_WEEKS[1]}: {n_must} non-PGY3 residents must each work one "
+            f"week but coverage plus clinic cap only holds {hol_capacity}.",
+            week=HOLIDAY_WEEKS[0], demand=n_must, supply=hol_capacity,
+        ))
+
+    # --- Night capacity over the year: per-resident caps vs night slots ---
+    def night_cap(r):
+        comp = completions_by_resident.get(r["id"], {})
+        prior = comp.get("NF", 0) + comp.get("ICU_NIGHT", 0)
+        return max(0, min(NIGHT_CAP_YEAR, NIGHT_CAP_TOTAL - prior))
+
+    sr_cap = sum(night_cap(r) for r in residents if r.get("is_senior"))
+    jr_cap = sum(night_cap(r) for r in residents if r.get("is_intern"))
+    sr_need = sum(sr for sr, _, _ in night_cov.values())
+    jr_need = sum(jr for _, jr, _ in night_cov.values())
+    hol_need = sum(tot for _, _, tot in night_cov.values())
+    if sr_cap < sr_need:
+        issues.append(_issue(
+            "night_capacity",
+            f"Nights: {sr_need} senior night weeks (NF, ICU N, SWING) but senior caps allow only {sr_cap}.",
+            roles=["senior"], demand=sr_need, supply=sr_cap,
+        ))
+    if jr_cap < jr_need:
+        issues.append(_issue(
+            "night_capacity",
+            f"Nights: {jr_need} intern night weeks (NF, ICU N, SWING) but intern caps allow only {jr_cap}.",
+            roles=["intern"], demand=jr_need, supply=jr_cap,
+        ))
+    if sr_cap + jr_cap < sr_need + jr_need + hol_need:
+        issues.append(_issue(
+            "night_capacity",
+            f"Nights: {sr_need + jr_need + hol_need} night weeks including holidays but caps allow only {sr_cap + jr_cap}.",
+            roles=["senior", "intern"], demand=sr_need + jr_need + hol_need, supply=sr_cap + jr_cap,
+        ))
+
+    return {
+        "ok": not any(i["blocking"] for i in issues),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+        "issues": issues,
+    }
+
+
+def precheck_messages(report: dict) -> List[str]:
+    """Flatten a capacity_precheck() report into hint strings, blocking issues first."""
+    issues = sorted(report.get("issues", []), key=lambda i: not i["blocking"])
+    return [i["message"] if i["blocking"] else f"Warning: {i['message']}" for i in issues]
@@ -0,0 +1,157 @@
+"""
+Compiled rotation catalog: one source for which requirement categories a rotation counts toward.
+
+Loaded once from the rotations table (load_catalog at startup). Every rotation code gets an
+integer id and a category bitmask; tally() turns a list of codes into per-category week
+counts with a single bincount over the ids. The engine, /remaining, rollover, rotation
+history and completion clearing all count through it, so their tallies agree.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# (code, type, is_night, counts_toward_category) used when the rotations table is empty or
+# unavailable; table rows override them. TY CLINIC is scheduled by the engine but not seeded.
+BUILTIN_ROTATIONS = [
+    ("A", "floor", False, "FLOORS"), ("B", "floor", False, "FLOORS"),
+    ("C", "floor", False, "FLOORS"), ("D", "floor", False, "FLOORS"),
+    ("G", "floor", False, "FLOORS"),
+    ("ICU", "icu", False, "ICU"), ("ICU E", "icu", False, "ICU"), ("ICU N", "icu", True, "ICU"),
+    ("ICU H", "elective", False, "ELECTIVE"),
+    ("NF", "night", True, "NF"), ("SWING", "night", False, "SWING"),
+    ("CLINIC", "clinic", False, "CLINIC"), ("CLINIC *", "clinic", False, "CLINIC"),
+    ("TY CLINIC", "clinic", False, "TY CLINIC"),
+    ("ED", "elective", False, "ED"),
+    ("CARDIO", "elective", False, "CARDIO"), ("CARDIO-RAM", "elective", False, "CARDIO"),
+    ("CARDIO-HCA", "elective", False, "CARDIO"),
+    ("ID", "elective", False, "ID"), ("NEURO", "elective", False, "NEURO"),
+    ("VACATION", "elective", False, "VACATION"), ("GERIATRICS", "elective", False, "GERIATRICS"),
+    ("PULMONOLOGY", "elective", False, "PULMONOLOGY"), ("NEPHROLOGY", "elective", False, "NEPHROLOGY"),
+    ("PALLIATIVE", "elective", False, "PALLIATIVE"), ("PAIN", "elective", False, "PAIN"),
+    ("RHEUMATOLOGY", "elective", False, "RHEUMATOLOGY"), ("ENDOCRINOLOGY", "elective", False, "ENDOCRINOLOGY"),
+    ("TRAUMA", "elective", False, "TRAUMA"), ("SICU", "elective", False, "SICU"),
+    ("PLASTIC", "elective", False, "PLASTIC"), ("ELECTIVE", "elective", False, "ELECTIVE"),
+    ("ANESTHESIA", "elective", False, "ANESTHESIA"), ("GEN SURG", "elective", False, "GEN SURG"),
+]
+
+# Categories implied by a rotation's own category (the engine's requirement semantics):
+# NF counts as FLOORS; SWING counts as FLOORS, NF, ICU and ICU_NIGHT; core and
+# subspecialty electives count as ELECTIVE; TY CLINIC counts as CLINIC and ELECTIVE.
+ALSO_COUNTS = {
+    "NF": ("FLOORS",),
+    "SWING": ("FLOORS", "NF", "ICU", "ICU_NIGHT"),
+    "CARDIO": ("ELECTIVE",), "ID": ("ELECTIVE",), "NEURO": ("ELECTIVE",),
+    "GERIATRICS": ("ELECTIVE",), "GEN SURG": ("ELECTIVE",),
+    "PULMONOLOGY": ("ELECTIVE",), "NEPHROLOGY": ("ELECTIVE",), "PALLIATIVE": ("ELECTIVE",),
+    "PAIN": ("ELECTIVE",), "RHEUMATOLOGY": ("ELECTIVE",), "ENDOCRINOLOGY": ("ELECTIVE",),
+    "TY CLINIC": ("CLINIC", "ELECTIVE"),
+}
+
+
+class RotationCatalog:
+    """Rotation code -> id, and id -> category bitmask / membership row."""
+
+    def __init__(self, rows: Sequence[tuple]):
+        # id 0 is the empty / unknown cell and counts toward nothing
+        self.codes: List[str] = [""]
+        cats_by_code: Dict[str, List[str]] = {}
+        for code, rtype, is_night, category in rows:
+            code = code.strip()
+            cats = [category] if category else []
+            if rtype == "floor":
+                cats.append("FLOORS")
+            if rtype == "icu":
+                cats.append("ICU_NIGHT" if is_night else "ICU")
+            cats += ALSO_COUNTS.get(category, ())
+            if code not in cats_by_code:
+                self.codes.append(code)
+            cats_by_code[code] = list(dict.fromkeys(cats))
+        self.ids = {c: i for i, c in enumerate(self.codes)}
+        self.categories: List[str] = sorted({c for cats in cats_by_code.values() for c in cats})
+        self.bit = {c: i for i, c in enumerate(self.categories)}
+        self.masks = [0] * len(self.codes)
+        for code, cats in cats_by_code.items():
+            i = self.ids[code]
+            for cat in cats:
+                self.masks[i] |= 1 << self.bit[cat]
+        self._matrix = None
+        self._by_category = {
+            cat: [c for c in self.codes[1:] if self.masks[self.ids[c]] >> self.bit[cat] & 1]
+            for cat in self.categories
+        }
+
+    def id(self, code: Optional[str]) -> int:
+        return self.ids.get((code or "").strip(), 0)
+
+    @property
+    def matrix(self):
+        """id x category membership (numpy int64), built on first use: numpy is not imported at startup."""
+        if self._matrix is None:
+            import numpy as np
+            matrix = np.zeros((len(self.codes), len(self.categories)), dtype=np.int64)
+            for i, mask in enumerate(self.masks):
+                for cat, bit in self.bit.items():
+                    matrix[i, bit] = mask >> bit & 1
+            self._matrix = matrix
+        return self._matrix
+
+    def encode(self, codes: Iterable[Optional[str]]):
+        import numpy as np
+        return np.fromiter((self.id(c) for c in codes), dtype=np.int64)
+
+    def counts(self, code: Optional[str], category: str) -> bool:
+        bit = self.bit.get(category)
+        return bit is not None and bool(self.masks[self.id(code)] >> bit & 1)
+
+    def categories_for(self, code: Optional[str]) -> List[str]:
+        mask = self.masks[self.id(code)]
+        return [c for c in self.categories if mask >> self.bit[c] & 1]
+
+    def rotations_for(self, category: str) -> List[str]:
+        return list(self._by_category.get(category, []))
+
+    def indices(self, category: str, rot_idx: Dict[str, int]) -> List[int]:
+        """Indices (in an engine's code table) of the rotations counting toward category."""
+        return [rot_idx[c] for c in self._by_category.get(category, []) if c in rot_idx]
+
+    def tally(self, codes: Iterable[Optional[str]]) -> Dict[str, int]:
+        """Weeks per category for a list of rotation codes (one per week); zero counts are left out."""
+        import numpy as np
+        ids = self.encode(codes)
+        totals = np.bincount(ids, minlength=len(self.codes)) @ self.matrix
+        return {cat: int(n) for cat, n in zip(self.categories, totals) if n}
+
+    def credit_tally(self, codes: Iterable[Optional[str]]) -> Dict[str, int]:
+        """
+        tally() for carrying weeks forward as completions: each SWING week is credited once,
+        to NF (with FLOORS) or ICU_NIGHT (with ICU), balancing the two night categories.
+        """
+        out = self.tally(codes)
+        swing = out.get("SWING", 0)
+        if not swing:
+            return out
+        nf = out.get("NF", 0) - swing
+        icun = out.get("ICU_NIGHT", 0) - swing
+        to_nf = max(0, min(swing, (icun - nf + swing) // 2))
+        out["NF"] = nf + to_nf
+        out["ICU_NIGHT"] = icun + swing - to_nf
+        out["FLOORS"] = out.get("FLOORS", 0) - (swing - to_nf)
+        out["ICU"] = out.get("ICU", 0) - to_nf
+        return {cat: n for cat, n in out.items() if n}
+
+
+_catalog = RotationCatalog(BUILTIN_ROTATIONS)
+
+
+def get_catalog() -> RotationCatalog:
+    return _catalog
+
+
+def load_catalog(db) -> RotationCatalog:
+    """Compile the catalog from the rotations table (built-in rows fill any gaps)."""
+    global _catalog
+    from models import Rotation
+
+    rows = list(BUILTIN_ROTATIONS)
+    for r in db.query(Rotation).all():
+        rows.append((r.code, r.type, bool(r.is_night), r.counts_toward_category))
+    _catalog = RotationCatalog(rows)
+    return _catalog
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Completion, ScheduleAssignment
+from models import Completion
 from schemas import CompletionCreate, CompletionOut
-from category_rotations import get_rotations_for_category
+from rotation_catalog import get_catalog
+import versions
 
 router = APIRouter()
 
@@ -17,14 +18,17 @@ def list_completions(resident_id: int, db: Session = Depends(get_db)):
 @router.post("/", response_model=CompletionOut)
 def upsert_completion(data: CompletionCreate, db: Session = Depends(get_db)):
     if data.year_id is not None:
-        rotations = get_rotations_for_category(data.category)
+        # The resident's scheduled weeks of this category are now counted as completed: clear them
+        # as a recorded version, so the grid ETag, change feed and version history see it
+        rotations = set(get_catalog().rotations_for(data.category))
         if rotations:
-            deleted = db.query(ScheduleAssignment).filter(
-                ScheduleAssignment.resident_id == data.resident_id,
-                ScheduleAssignment.year_id == data.year_id,
-                ScheduleAssignment.rotation_code.in_(rotations),
-            ).delete(synchronize_session=False)
+            before = versions.load_grid(db, data.year_id)
+            after = {key: code for key, code in before.items()
+                     if key[0] != data.resident_id or code not in rotations}
+            delta = versions.grid_delta(before, after)
+            versions.apply_delta(db, data.year_id, delta)
             db.flush()
+            versions.record(db, data.year_id, delta, "completion", f"Cleared {data.category} as completed")
     payload = {k: v for k, v in data.model_dump().items() if k != "year_id"}
     existing = db.query(Completion).filter(
         Completion.resident_id == data.resident_id,
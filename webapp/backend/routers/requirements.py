@@ -6,7 +6,8 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Requirement, Resident, ScheduleAssignment
 from schemas import RequirementCreate, RequirementOut, RequirementUpdate
-from category_rotations import get_rotations_for_category
+from rotation_catalog import get_catalog
+import versions
 
 router = APIRouter()
 
@@ -102,28 +103,26 @@ def sync_requirements(db: Session = Depends(get_db)):
 
 def _clear_schedule_for_category(db: Session, category: str, pgy: str, track: Optional[str]) -> int:
     """Clear schedule assignments that count toward this category for matching residents. Returns count cleared."""
-    rotations = get_rotations_for_category(category)
+    rotations = get_catalog().rotations_for(category)
     if not rotations:
         return 0
-    year_ids = [row[0] for row in db.query(ScheduleAssignment.year_id).distinct().all()]
-    cleared = 0
-    for year_id in year_ids:
-        residents = db.query(Resident).filter(
-            Resident.year_id == year_id,
-            Resident.pgy == pgy,
-        )
-        if track:
-            residents = residents.filter(Resident.track == track)
-        else:
-            residents = residents.filter(Resident.track.is_(None))
-        resident_ids = [res.id for res in residents.all()]
-        for a in db.query(ScheduleAssignment).filter(
-            ScheduleAssignment.year_id == year_id,
-            ScheduleAssignment.resident_id.in_(resident_ids),
-            ScheduleAssignment.rotation_code.in_(rotations),
-        ).all():
-            db.delete(a)
-            cleared += 1
+    residents = db.query(Resident.id).filter(Resident.pgy == pgy)
+    residents = residents.filter(Resident.track == track) if track else residents.filter(Resident.track.is_(None))
+    matching = db.query(ScheduleAssignment).filter(
+        ScheduleAssignment.resident_id.in_(residents.scalar_subquery()),
+        ScheduleAssignment.rotation_code.in_(rotations),
+    )
+    # One read for every year's version deltas, then one DELETE for all of them
+    by_year = {}
+    for year_id, rid, week, code in matching.with_entities(
+            ScheduleAssignment.year_id, ScheduleAssignment.resident_id,
+            ScheduleAssignment.week_number, ScheduleAssignment.rotation_code).all():
+        by_year.setdefault(year_id, []).append([rid, week, code, None])
+    if not by_year:
+        return 0
+    cleared = matching.delete(synchronize_session=False)
+    for year_id, delta in sorted(by_year.items()):
+        versions.record(db, year_id, delta, "requirement", f"Cleared {category} for {pgy}{' ' + track if track else ''}")
     return cleared
 
 
@@ -5,46 +5,20 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from io import BytesIO
 
-import openpyxl
 
 from database import get_db
+from rotation_catalog import get_catalog
+import versions
 from models import (
     Resident, Year, Cohort, Week, CoverageRule, ScheduleAssignment, Completion,
 )
 
-# NF counts as FLOORS. SWING counts as NF or ICU_NIGHT (assign optimally).
-_FLOOR_ROTS = ["A", "B", "C", "D", "G"]
-_ICU_ROTS = ["ICU", "ICU E", "ICU N"]
-_OTHER_CAT_ROTS = {
-    "CLINIC": ["CLINIC", "CLINIC *"],
-    "CARDIO": ["CARDIO", "CARDIO-RAM", "CARDIO-HCA"],
-    "ED": ["ED"], "ID": ["ID"], "NEURO": ["NEURO"],
-    "VACATION": ["VACATION"],
-    "GERIATRICS": ["GERIATRICS"], "PULMONOLOGY": ["PULMONOLOGY"],
-    "NEPHROLOGY": ["NEPHROLOGY"], "PALLIATIVE": ["PALLIATIVE"],
-    "PAIN": ["PAIN"], "RHEUMATOLOGY": ["RHEUMATOLOGY"], "ENDOCRINOLOGY": ["ENDOCRINOLOGY"],
-}
-
-
 def _aggregate_assignments_to_categories(assignments: List[tuple]) -> Dict[str, int]:
     """Given [(week, rot), ...], return {category: weeks}. NF->FLOORS, SWING->NF or ICU_NIGHT (balanced)."""
-    floor_cnt = sum(1 for _, rot in assignments if rot in _FLOOR_ROTS)
-    nf_cnt = sum(1 for _, rot in assignments if rot == "NF")
-    icun_cnt = sum(1 for _, rot in assignments if rot == "ICU N")
-    swing_cnt = sum(1 for _, rot in assignments if rot == "SWING")
-    x = (icun_cnt - nf_cnt + swing_cnt) // 2 if swing_cnt else 0
-    swing_to_nf = max(0, min(swing_cnt, x))
-    by_cat: Dict[str, int] = {}
-    by_cat["FLOORS"] = floor_cnt + nf_cnt + swing_to_nf
-    by_cat["ICU"] = sum(1 for _, rot in assignments if rot in _ICU_ROTS)
-    by_cat["NF"] = nf_cnt + swing_to_nf
-    by_cat["ICU_NIGHT"] = icun_cnt + (swing_cnt - swing_to_nf)
-    by_cat["SWING"] = swing_cnt
-    for _w, rot in assignments:
-        for cat, rots in _OTHER_CAT_ROTS.items():
-            if rot in rots:
-                by_cat[cat] = by_cat.get(cat, 0) + 1
-                break
+    by_cat = get_catalog().credit_tally(rot for _, rot in assignments)
+    # ELECTIVE and TY CLINIC are yearly and not carried into the next year's completions
+    by_cat.pop("ELECTIVE", None)
+    by_cat.pop("TY CLINIC", None)
     return by_cat
 
 DATE_RANGES = [
@@ -112,8 +86,10 @@ def rollover(req: RolloverRequest, db: Session = Depends(get_db)):
     target = db.query(Year).filter(Year.name == req.target_year_name).first()
     if target:
         # Clear existing residents and assignments for target (allow re-rollover)
+        cleared = versions.grid_delta(versions.load_grid(db, target.id), {})
         db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == target.id).delete()
         db.query(Resident).filter(Resident.year_id == target.id).delete()
+        versions.record(db, target.id, cleared, "rollover", "Cleared for rollover")
     else:
         target = Year(name=req.target_year_name, start_date=target_start)
         db.add(target)
@@ -293,6 +269,7 @@ def rollover(req: RolloverRequest, db: Session = Depends(get_db)):
             cname = c.name if c else str(cid)
             db.rollback()
             raise HTTPException(400, f"Rollover would put {n} residents in Cohort {cname}. Max is {MAX_COHORT_SIZE}. Adjust cohort targets.")
+    versions.bump(db, target.id)
     db.commit()
     n_res = db.query(Resident).filter(Resident.year_id == target.id).count()
     return {
@@ -323,6 +300,7 @@ def rollover_from_excel(
     Import current roster from Excel and create next year.
     Expects SCHEDULE sheet: rows 4-56, cols A=Cohort, B=PGY, C=Name.
     """
+    import openpyxl
     content = file.file.read()
     try:
         wb = openpyxl.load_workbook(BytesIO(content), data_only=True)
@@ -365,8 +343,10 @@ def rollover_from_excel(
 
     target = db.query(Year).filter(Year.name == target_year_name).first()
     if target:
+        cleared = versions.grid_delta(versions.load_grid(db, target.id), {})
         db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == target.id).delete()
         db.query(Resident).filter(Resident.year_id == target.id).delete()
+        versions.record(db, target.id, cleared, "rollover", "Cleared for rollover")
     else:
         target = Year(name=target_year_name, start_date="2026-07-01")
         db.add(target)
@@ -477,6 +457,7 @@ def rollover_from_excel(
             cname = c.name if c else str(cid)
             db.rollback()
             raise HTTPException(400, f"Rollover would put {n} residents in Cohort {cname}. Max is {MAX_COHORT}. Adjust cohort targets.")
+    versions.bump(db, target.id)
     db.commit()
     n_res = db.query(Resident).filter(Resident.year_id == target.id).count()
     return {"target_year_id": target.id, "target_year_name": target.name, "promoted_count": promoted,
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import get_db
 from models import Rotation
+from rotation_catalog import get_catalog
 
 router = APIRouter()
 
@@ -9,3 +10,13 @@ router = APIRouter()
 @router.get("/")
 def list_rotations(db: Session = Depends(get_db)):
     return db.query(Rotation).all()
+
+
+@router.get("/catalog")
+def rotation_catalog():
+    """Requirement categories each rotation code counts toward (as used by every tally)."""
+    catalog = get_catalog()
+    return {
+        "categories": catalog.categories,
+        "rotations": {code: catalog.categories_for(code) for code in catalog.codes[1:]},
+    }
@@ -1,24 +1,38 @@
+import asyncio
 import json
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert, tuple_
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import SessionLocal, get_db
 from models import (
     Resident, Requirement, Completion, VacationRequest,
-    Cohort, ScheduleAssignment, ScheduleBackup, Year,
+    Cohort, ScheduleAssignment, ScheduleDraft, ScheduleVersion, Year, CoverageRule, SolveRun,
 )
-from category_rotations import get_categories_for_rotation
+from rotation_catalog import get_catalog
 from schemas import (
     GenerateScheduleRequest, GenerateScheduleResponse, UpdateAssignmentRequest,
-    ClearScheduleRequest, ScheduleBackupOut,
+    BatchUpdateRequest, ClearScheduleRequest,
 )
-from engine import solve
+from scheduler.coverage import parse_week_scope, pool_codes
+from scheduler.stopping import StopRules, stop_rules
+from telemetry import compare_runs, input_hash, record_run, run_out
+# The solver stack (engine, lns, anytime, precheck, validation) pulls in OR-Tools; it is
+# imported inside the endpoints that use it so the app starts without loading it.
+import versions
+from http_cache import cache_headers, etag, not_modified
+import compact
+import changefeed
+import governor
 import threading
 import uuid
 import time
+from functools import partial
 from datetime import timedelta
 
 router = APIRouter()
@@ -26,9 +40,14 @@ router = APIRouter()
 # Global job store: job_id -> {status, result, created_at}
 JOBS = {}
 
+DIAGNOSE_TIME_LIMIT = 120  # seconds for the single-worker conflict-core solve
+MAX_CORE_SHOWN = 8
+STREAM_TICK = 0.5  # seconds between change-feed counter checks per open stream
 
-def _infeasibility_hints(residents_data: list, cohort_defs: list, status: str = "") -> list[str]:
-    """Return diagnostic hints when schedule is infeasible. Helps the scheduler fix the roster or constraints."""
+
+def _infeasibility_hints(residents_data: list, status: str = "", report: Optional[dict] = None) -> list[str]:
+    """Return diagnostic hints when schedule is infeasible. Helps the scheduler fix the roster or constraints.
+    report is a capacity_precheck() result; its issues name the exact weeks and roles that are short."""
     hints = []
     n_seniors = sum(1 for r in residents_data if r.get("is_senior"))
     n_interns = sum(1 for r in residents_data if r.get("is_intern"))
@@ -41,32 +60,14 @@ def _infeasibility_hints(residents_data: list, cohort_defs: list, status: str =
     if pgy_counts:
         roster_line += f" — PGY1: {pgy_counts.get('PGY1', 0)}, PGY2: {pgy_counts.get('PGY2', 0)}, PGY3: {pgy_counts.get('PGY3', 0)}, TY: {pgy_counts.get('TY', 0)}"
     hints.append(roster_line)
-    if n_seniors < 9:
-        hints.append(
-            f"Staffing shortfall — seniors: Need at least 9 per week for coverage. "
-            f"Add more PGY2/PGY3 residents or promote interns."
-        )
-    if n_interns < 12:
-        hints.append(
-            f"Staffing shortfall — interns: Need at least 12 per week for coverage. "
-            f"Add more PGY1/TY residents."
-        )
-    cohort_sizes = {}
-    for cd in cohort_defs or []:
-        n = sum(1 for r in residents_data if r.get("cohort_id") == cd["cohort_id"])
-        if n > 0:
-            cohort_sizes[cd["cohort_id"]] = n
-    from engine import MAX_COHORT_SIZE
-    for cid, n in cohort_sizes.items():
-        if n > MAX_COHORT_SIZE:
-            hints.append(
-                f"Cohort size exceeded: {n} residents; max is {MAX_COHORT_SIZE}. Reassign to other cohorts."
-            )
+    if report is not None:
+        from precheck import precheck_messages
+        hints.extend(precheck_messages(report))
     if status == "UNKNOWN":
         hints.append(
             "Solver did not find a solution. Relax vacation requests or reduce requirements and try again."
         )
-    else:
+    elif status != "PRECHECK_FAILED":
         hints.append(
             "Likely causes: vacation blocks (Block A/B) too restrictive, "
             "requirements too high for 52 weeks. Try: relax vacation options or clear some requests."
@@ -85,14 +86,62 @@ logging.basicConfig(
 @router.post("/generate", response_model=Dict[str, Any])
 def generate_schedule(req: GenerateScheduleRequest, db: Session = Depends(get_db)):
     """Async generation: returns job_id immediately."""
+    if req.block_weeks not in (1, 2):
+        raise HTTPException(400, "block_weeks must be 1 (weekly) or 2 (two-week blocks)")
+    if req.formulation not in ("grid", "interval"):
+        raise HTTPException(400, "formulation must be 'grid' or 'interval'")
+    if req.formulation == "interval" and req.block_weeks != 1:
+        raise HTTPException(400, "The interval formulation has no two-week block mode")
+    if req.priority not in governor.PRIORITY_WEIGHTS:
+        raise HTTPException(400, f"priority must be one of {', '.join(governor.PRIORITY_WEIGHTS)}")
+    if req.deterministic and (req.use_lns or req.anytime):
+        raise HTTPException(400, "Deterministic mode runs the plain solver; turn off LNS and anytime")
+    if req.deterministic and not (req.deterministic_budget or 0) > 0:
+        raise HTTPException(400, "Deterministic mode needs a deterministic_budget (CP-SAT deterministic time units, "
+                                 "about 6 seconds each on one CPU)")
+    if req.deterministic_budget is not None and not req.deterministic:
+        raise HTTPException(400, "deterministic_budget only applies with deterministic=true; use time_limit_seconds")
+    if any(v is not None and v < 0 for v in (req.relative_gap, req.absolute_gap, req.stagnation_seconds,
+                                              req.max_clean_solutions)):
+        raise HTTPException(400, "Stopping rules must be 0 or more (0 turns a rule off)")
+    if any(w is not None and not 1 <= w <= 52 for w in (req.freeze_before_week, req.week_start, req.week_end)):
+        raise HTTPException(400, "freeze_before_week, week_start and week_end must be 1-52")
+    if req.week_start is not None and req.week_end is not None and req.week_start > req.week_end:
+        raise HTTPException(400, "week_start must not be after week_end")
+    if _partial(req) and req.formulation == "interval":
+        raise HTTPException(400, "The interval formulation has no partial regeneration")
+    # Inputs and frozen cells raise 400 on a bad year or selection: load them before the job exists
+    t_load = time.time()
+    inputs = _load_solver_inputs(db, req.year_id)
+    load_seconds = round(time.time() - t_load, 3)
+    frozen = _frozen_cells(req, db, inputs)
+
     job_id = str(uuid.uuid4())
     logging.info(f"Received generate request. Job ID: {job_id}, Year ID: {req.year_id}")
     
     JOBS[job_id] = {
         "status": "queued",
         "created_at": datetime.now(),
-        "result": None
+        "result": None,
+        "timings": {"load_seconds": load_seconds},
     }
+
+    # Capacity pre-check: reject hopeless requests before spending solver time
+    from precheck import capacity_precheck
+    report = capacity_precheck(**inputs)
+    logging.info(f"Job {job_id}: precheck {'ok' if report['ok'] else 'failed'} in {report['elapsed_ms']} ms")
+    if not report["ok"]:
+        JOBS[job_id]["status"] = "failed"
+        JOBS[job_id]["result"] = {
+            "success": False,
+            "status": "PRECHECK_FAILED",
+            "message": "Roster cannot cover the schedule; fix the issues below before generating.",
+            "conflicts": _infeasibility_hints(inputs["residents"], "PRECHECK_FAILED", report),
+            "precheck": report,
+        }
+        record_run(db, job_id, req.year_id, inputs, _run_params(req), "PRECHECK_FAILED",
+                   timings=JOBS[job_id]["timings"], message=JOBS[job_id]["result"]["message"], frozen=frozen)
+        return {"job_id": job_id, "status": "failed"}
     
     # Run in background thread
     def _run_solve():
@@ -103,14 +152,17 @@ def generate_schedule(req: GenerateScheduleRequest, db: Session = Depends(get_db
             from database import SessionLocal
             t_db = SessionLocal() 
             print(f"DEBUG: Session created for job {job_id}")
-            JOBS[job_id]["status"] = "running"
-            logging.info(f"Job {job_id}: Running solve logic")
             
             # Verify _solve_logic exists
             if '_solve_logic' not in globals():
                 raise NameError("_solve_logic function not found")
                 
-            _solve_logic(req, t_db, job_id)
+            # Stays "queued" while the CPU governor has no workers free
+            with governor.lease(req.priority) as workers:
+                JOBS[job_id]["status"] = "running"
+                JOBS[job_id]["workers"] = workers
+                logging.info(f"Job {job_id}: Running solve logic")
+                _solve_logic(req, t_db, job_id, inputs, frozen)
             print(f"DEBUG: Solve logic finished for job {job_id}")
             logging.info(f"Job {job_id}: Solve logic completed successfully")
         except Exception as e:
@@ -121,6 +173,10 @@ def generate_schedule(req: GenerateScheduleRequest, db: Session = Depends(get_db
             logging.error(f"Job {job_id}: Failed with error: {e}\n{tb}")
             JOBS[job_id]["status"] = "failed"
             JOBS[job_id]["result"] = {"message": str(e), "conflicts": []}
+            if t_db:
+                t_db.rollback()
+                record_run(t_db, job_id, req.year_id, inputs, _run_params(req), "ERROR",
+                           timings=JOBS[job_id].get("timings"), message=str(e), frozen=frozen)
         finally:
             if t_db:
                 t_db.close()
@@ -132,6 +188,45 @@ def generate_schedule(req: GenerateScheduleRequest, db: Session = Depends(get_db
     return {"job_id": job_id, "status": "queued"}
 
 
+@router.get("/precheck", response_model=Dict[str, Any])
+def precheck_schedule(year_id: int, db: Session = Depends(get_db)):
+    """Capacity pre-check for a year without solving: blocking weeks/roles and requirement warnings."""
+    from precheck import capacity_precheck
+    return capacity_precheck(**_load_solver_inputs(db, year_id))
+
+
+@router.get("/why", response_model=Dict[str, Any])
+def why_not(year_id: int, resident_id: int, week: int, rotation: str, db: Session = Depends(get_db)):
+    """
+    Why can't a resident do a rotation in a week? Answers from the single-cell rules
+    (TY/track restrictions, locks, cohort clinic, holidays, ...) without solving.
+    An empty reasons list means no single-cell rule blocks it; coverage or caps may still.
+    """
+    if not 1 <= week <= 52:
+        raise HTTPException(400, "week must be 1-52")
+    inputs = _load_solver_inputs(db, year_id)
+    r = next((i for i, res in enumerate(inputs["residents"]) if res["id"] == resident_id), None)
+    if r is None:
+        raise HTTPException(404, "Resident not found in this year")
+    from engine import compile_domains
+    domains = compile_domains(**inputs)
+    reasons = domains.why(r, week, rotation)
+    return {
+        "resident_id": resident_id,
+        "week": week,
+        "rotation": rotation,
+        "allowed": not reasons,
+        "reasons": reasons,
+        "allowed_rotations": [domains.rot_codes[i] for i in sorted(domains.allowed(r, week))],
+    }
+
+
+@router.get("/generate/workers")
+def solver_workers():
+    """CPU governor state: CPUs, reserve, active leases, queued jobs and the share a new job would get."""
+    return governor.status()
+
+
 @router.get("/generate/status/{job_id}")
 def get_generate_status(job_id: str):
     job = JOBS.get(job_id)
@@ -140,24 +235,18 @@ def get_generate_status(job_id: str):
     return {
         "job_id": job_id,
         "status": job["status"],
-        "result": job.get("result")
+        "result": job.get("result"),
+        "drafts": len(job.get("drafts", [])),
+        "workers": job.get("workers"),
+        "latest_draft_id": job["drafts"][-1] if job.get("drafts") else None,
     }
 
 
-def _solve_logic(req: GenerateScheduleRequest, db: Session, job_id: str):
-    from engine import MAX_COHORT_SIZE
-    residents = db.query(Resident).filter(Resident.year_id == req.year_id).all()
+def _load_solver_inputs(db: Session, year_id: int) -> Dict[str, Any]:
+    """Load residents, requirements, completions, cohorts and coverage rules for a year into engine.solve() kwargs."""
+    residents = db.query(Resident).filter(Resident.year_id == year_id).all()
     if not residents:
         raise HTTPException(400, "No residents for this year")
-    cohort_counts = {}
-    for r in residents:
-        if r.cohort_id:
-            cohort_counts[r.cohort_id] = cohort_counts.get(r.cohort_id, 0) + 1
-    for cid, n in cohort_counts.items():
-        if n > MAX_COHORT_SIZE:
-            c = db.query(Cohort).filter(Cohort.id == cid).first()
-            cname = c.name if c else str(cid)
-            raise HTTPException(400, f"Cohort {cname} has {n} residents; max is {MAX_COHORT_SIZE}. Reassign before generating.")
 
     # Reconstruct data structures for solver
     residents_data = []
@@ -188,7 +277,7 @@ def _solve_logic(req: GenerateScheduleRequest, db: Session, job_id: str):
         completions_by_resident.setdefault(c.resident_id, {})[c.category] = c.completed_weeks
 
     # Cohort Defs
-    cohorts = db.query(Cohort).filter(Cohort.year_id == req.year_id).all()
+    cohorts = db.query(Cohort).filter(Cohort.year_id == year_id).all()
     cohort_defs = []
     for c in cohorts:
         try:
@@ -241,87 +330,226 @@ def _solve_logic(req: GenerateScheduleRequest, db: Session, job_id: str):
     # TESTING: skip vacation preferences; solver places 4 weeks freely per resident
     vacations = []
 
-    assignments, status, conflicts = solve(
-        residents=residents_data,
-        requirements_by_pgy=requirements_by_pgy,
-        completions_by_resident=completions_by_resident,
-        vacation_requests=vacations,
-        cohort_defs=cohort_defs,
-        time_limit=req.time_limit_seconds,
+    # Coverage rules; an empty table falls back to the engine's default teams
+    coverage_rules = []
+    for rule in db.query(CoverageRule).filter(CoverageRule.year_id == year_id).all():
+        try:
+            pool_codes(rule.pool)
+            parse_week_scope(rule.week_scope)
+        except ValueError as e:
+            raise HTTPException(400, f"Coverage rule {rule.id}: {e}")
+        coverage_rules.append({
+            "pool": rule.pool,
+            "week_scope": rule.week_scope,
+            "required_units_per_week": rule.required_units_per_week,
+            "seniors_per_unit": rule.seniors_per_unit,
+            "interns_per_unit": rule.interns_per_unit,
+            "optional": rule.optional,
+        })
+
+    return {
+        "residents": residents_data,
+        "requirements_by_pgy": requirements_by_pgy,
+        "completions_by_resident": completions_by_resident,
+        "vacation_requests": vacations,
+        "cohort_defs": cohort_defs,
+        "coverage_rules": coverage_rules or None,
+    }
+
+
+def _stop_rules(req: GenerateScheduleRequest) -> StopRules:
+    return stop_rules(relative_gap=req.relative_gap, absolute_gap=req.absolute_gap,
+                      stagnation_seconds=req.stagnation_seconds, max_clean_solutions=req.max_clean_solutions)
+
+
+def _partial(req: GenerateScheduleRequest) -> dict:
+    """The request's partial regeneration options that are set ({} = regenerate the whole year)."""
+    return {k: v for k, v in (("freeze_before_week", req.freeze_before_week), ("week_start", req.week_start),
+                              ("week_end", req.week_end), ("resident_ids", req.resident_ids)) if v is not None}
+
+
+def _frozen_cells(req: GenerateScheduleRequest, db: Session, inputs: Dict[str, Any]) -> Optional[Dict]:
+    """
+    {(resident_id, week): code or None} for every cell a partial regeneration keeps: all cells
+    outside the chosen residents x weeks, as the current schedule holds them. None for a full solve.
+    """
+    if not _partial(req):
+        return None
+    ids = [r["id"] for r in inputs["residents"]]
+    unknown = sorted(set(req.resident_ids or []) - set(ids))
+    if unknown:
+        raise HTTPException(400, f"Residents not in this year: {', '.join(map(str, unknown))}")
+    first = max(req.week_start or 1, req.freeze_before_week or 1)
+    last = req.week_end or 52
+    free_ids = set(req.resident_ids if req.resident_ids is not None else ids)
+    if first > last or not free_ids:
+        raise HTTPException(400, "Nothing left to regenerate: the chosen weeks or residents are all frozen")
+    grid = versions.load_grid(db, req.year_id)
+    if not grid:
+        raise HTTPException(400, "This year has no schedule to keep; generate the full year first")
+    return {(rid, w): grid.get((rid, w)) for rid in ids for w in range(1, 53)
+            if rid not in free_ids or not first <= w <= last}
+
+
+def _describe_partial(req: GenerateScheduleRequest) -> str:
+    first = max(req.week_start or 1, req.freeze_before_week or 1)
+    weeks = f"weeks {first}-{req.week_end or 52}"
+    if req.resident_ids is None:
+        return weeks
+    return f"{weeks} for {len(req.resident_ids)} resident{'s' if len(req.resident_ids) != 1 else ''}"
+
+
+def _run_params(req: GenerateScheduleRequest, **extra) -> dict:
+    return {"time_limit": req.time_limit_seconds, "random_seed": req.random_seed, "use_lns": req.use_lns,
+            "anytime": req.anytime, "block_weeks": req.block_weeks,
+            "formulation": req.formulation, "priority": req.priority, "deterministic": req.deterministic,
+            **({"deterministic_budget": req.deterministic_budget} if req.deterministic else {}),
+            "stop_rules": _stop_rules(req).to_dict(), **_partial(req), **extra}
+
+
+def _replace_assignments(db: Session, year_id: int, assignments: Dict, source: str, description: str) -> int:
+    """
+    Make {resident_id: {week: rotation_code}} the year's schedule, writing only the cells that
+    change, and record the change as a schedule version (not committed). Returns the cell count.
+    """
+    target = {(int(rid), int(w)): str(rot) for rid, weeks in assignments.items() for w, rot in weeks.items()}
+    delta = versions.grid_delta(versions.load_grid(db, year_id), target)
+    versions.apply_delta(db, year_id, delta)
+    versions.record(db, year_id, delta, source, description)
+    return len(target)
+
+
+def _draft_sink(db: Session, year_id: int, job_id: str):
+    """on_draft callback for solve_anytime(): one schedule_drafts row per stored schedule."""
+    # Drafts of earlier jobs for this year are superseded (promoted ones stay as history)
+    db.query(ScheduleDraft).filter(ScheduleDraft.year_id == year_id, ScheduleDraft.promoted == False).delete()  # noqa: E712
+    db.commit()
+    drafts = JOBS[job_id].setdefault("drafts", [])
+
+    def on_draft(assignments, objective, elapsed, phase):
+        draft = ScheduleDraft(
+            year_id=year_id, job_id=job_id, seq=len(drafts) + 1, phase=phase,
+            objective=objective, elapsed_seconds=elapsed, assignments_json=json.dumps(assignments),
+        )
+        db.add(draft)
+        db.commit()
+        drafts.append(draft.id)
+        logging.info(f"Job {job_id}: draft {draft.seq} ({phase}) at {elapsed}s, objective {objective}")
+
+    return on_draft
+
+
+def _solve_logic(req: GenerateScheduleRequest, db: Session, job_id: str, inputs: Optional[Dict[str, Any]] = None,
+                 frozen: Optional[Dict] = None):
+    """Solve, diagnose if infeasible, write the schedule. frozen: cells kept by a partial regeneration."""
+    from engine import solve, diagnose_infeasibility, format_core
+    from lns import solve_lns
+    from anytime import solve_anytime
+    from precheck import capacity_precheck
+    timings = JOBS[job_id].setdefault("timings", {})
+    if inputs is None:
+        t_load = time.time()
+        inputs = _load_solver_inputs(db, req.year_id)
+        timings["load_seconds"] = round(time.time() - t_load, 3)
+    if req.anytime:
+        run = partial(solve_anytime, on_draft=_draft_sink(db, req.year_id, job_id))
+    else:
+        run = solve_lns if req.use_lns else solve
+    limit = req.time_limit_seconds
+    if req.deterministic:
+        run = partial(solve, deterministic=True)
+        limit = req.deterministic_budget
+
+    stats = {}
+    assignments, status, conflicts = run(
+        **inputs,
+        time_limit=limit,
         random_seed=req.random_seed,
+        block_weeks=req.block_weeks,
+        formulation=req.formulation,
+        stop_rules=_stop_rules(req),
+        frozen=frozen,
+        stats=stats,
     )
 
+    # On INFEASIBLE, one diagnostic solve names the conflicting hard-rule families instead of
+    # retrying blind relaxations; vacation blocks are only relaxed when they are in the conflict.
+    core = []
+    if assignments is None and status == "INFEASIBLE":
+        JOBS[job_id]["status"] = "diagnosing"
+        t_diag = time.time()
+        _, core = diagnose_infeasibility(**inputs, time_limit=DIAGNOSE_TIME_LIMIT, frozen=frozen)
+        timings["diagnose_seconds"] = round(time.time() - t_diag, 3)
+
     vacation_relaxed = False
-    if assignments is None and vacations:
-        assignments, status, conflicts = solve(
-            residents=residents_data,
-            requirements_by_pgy=requirements_by_pgy,
-            completions_by_resident=completions_by_resident,
-            vacation_requests=vacations,
-            cohort_defs=cohort_defs,
-            time_limit=req.time_limit_seconds,
+    relax_retry = assignments is None and bool(inputs["vacation_requests"]) and any("vacation Block" in f for f in core)
+    if relax_retry:
+        JOBS[job_id]["status"] = "running"
+        assignments, status, conflicts = run(
+            **inputs,
+            time_limit=limit,
             random_seed=req.random_seed,
             relax_vacation_blocks=True,
+            block_weeks=req.block_weeks,
+            formulation=req.formulation,
+            stop_rules=_stop_rules(req),
+            frozen=frozen,
+            stats=stats,
         )
         if assignments is not None:
             vacation_relaxed = True
             conflicts = conflicts + ["Vacation Block A/B preferences could not be satisfied; schedule placed 4 weeks freely per resident."]
 
-    geriatrics_relaxed = False
-    if assignments is None:
-        assignments, status, conflicts = solve(
-            residents=residents_data,
-            requirements_by_pgy=requirements_by_pgy,
-            completions_by_resident=completions_by_resident,
-            vacation_requests=vacations,
-            cohort_defs=cohort_defs,
-            time_limit=req.time_limit_seconds,
-            random_seed=req.random_seed,
-            relax_geriatrics_coverage=True,
-        )
-        if assignments is not None:
-            geriatrics_relaxed = True
-            conflicts = conflicts + ["GERIATRICS coverage (1 senior/week) could not be satisfied; schedule generated without it."]
-
     if assignments is None:
-        hints = _infeasibility_hints(residents_data, cohort_defs, status)
+        hints = _infeasibility_hints(inputs["residents"], status, capacity_precheck(**inputs))
         if status == "UNKNOWN":
             message = "Solver ran out of time before finding a solution. Try again—a valid schedule may exist."
+        elif core:
+            message = f"Schedule infeasible: {format_core(core[:MAX_CORE_SHOWN])}"
         else:
             message = "Schedule infeasible"
-            
+        if core:
+            hints = [f"Conflicting rules: {format_core(core[:MAX_CORE_SHOWN])}"
+                     + (f" (+{len(core) - MAX_CORE_SHOWN} more)" if len(core) > MAX_CORE_SHOWN else "")] + hints
+
         JOBS[job_id]["status"] = "failed"
         JOBS[job_id]["result"] = {
             "success": False,
             "status": status,
             "message": message,
             "conflicts": conflicts + hints,
+            "conflicting_rules": core,
+            "stop_reason": stats.get("stop_reason"),
         }
+        record_run(db, job_id, req.year_id, inputs, _run_params(req, relax_vacation_blocks=relax_retry),
+                   status, timings=timings, stats=stats, message=message, frozen=frozen)
         return
 
-    # Clear old assignments for this year
-    db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == req.year_id).delete()
-
+    # A draft promoted while the job ran is the scheduler's choice; keep it
+    promoted = req.anytime and db.query(ScheduleDraft).filter(
+        ScheduleDraft.job_id == job_id, ScheduleDraft.promoted == True).first() is not None  # noqa: E712
     count = 0
-    for resident_id, weeks in assignments.items():
-        for week_num, rot in weeks.items():
-            a = ScheduleAssignment(
-                resident_id=resident_id,
-                year_id=req.year_id,
-                week_number=week_num,
-                rotation_code=rot,
-            )
-            db.add(a)
-            count += 1
-    db.commit()
+    if not promoted:
+        t_write = time.time()
+        description = f"Regenerated {_describe_partial(req)} ({status})" if frozen else f"Generated schedule ({status})"
+        count = _replace_assignments(db, req.year_id, assignments, "generate", description)
+        db.commit()
+        timings["write_seconds"] = round(time.time() - t_write, 3)
+    version = versions.latest(db, req.year_id)
+    record_run(db, job_id, req.year_id, inputs, _run_params(req, relax_vacation_blocks=relax_retry),
+               status, success=True, timings=timings, stats=stats, version_id=version.id if version else None,
+               frozen=frozen)
 
     JOBS[job_id]["status"] = "completed"
     JOBS[job_id]["result"] = {
         "success": True,
         "status": status,
         "assignment_count": count,
-        "conflicts": conflicts if (vacation_relaxed or geriatrics_relaxed) else [],
+        "conflicts": conflicts if vacation_relaxed else [],
+        "stop_reason": stats.get("stop_reason"),
     }
+    if promoted:
+        JOBS[job_id]["result"]["message"] = "A draft was promoted during the run; the published schedule was left as promoted."
 
     # cleanup old jobs
     for jid, j in list(JOBS.items()):
@@ -331,9 +559,96 @@ def _solve_logic(req: GenerateScheduleRequest, db: Session, job_id: str):
     return
 
 
+@router.get("/runs")
+def list_runs(year_id: Optional[int] = None, limit: int = 50, db: Session = Depends(get_db)):
+    """Recorded solve runs, newest first (phase timings, search counters, status; no curves)."""
+    q = db.query(SolveRun)
+    if year_id is not None:
+        q = q.filter(SolveRun.year_id == year_id)
+    rows = q.order_by(SolveRun.id.desc()).limit(max(1, min(limit, 500))).all()
+    return [run_out(r) for r in rows]
+
+
+@router.get("/runs/compare")
+def compare_solve_runs(a: int, b: int, db: Session = Depends(get_db)):
+    """Compare two runs: b minus a per timing/counter, same-inputs flag, roster and curve differences."""
+    runs = {r.id: r for r in db.query(SolveRun).filter(SolveRun.id.in_([a, b])).all()}
+    if a not in runs or b not in runs:
+        raise HTTPException(404, "Solve run not found")
+    return compare_runs(runs[a], runs[b])
+
+
+def _current_input_hash(db: Session, row: SolveRun) -> Optional[str]:
+    """input_hash() of the run's year as it is now; a partial run also hashes the cells it would keep now."""
+    inputs = _load_solver_inputs(db, row.year_id)
+    partial_keys = {k: v for k, v in (row.params_json or {}).items()
+                    if k in ("freeze_before_week", "week_start", "week_end", "resident_ids")}
+    try:
+        frozen = _frozen_cells(GenerateScheduleRequest(year_id=row.year_id, **partial_keys), db, inputs)
+    except HTTPException:
+        return None  # the kept cells can no longer be taken from the grid (residents or grid gone)
+    return input_hash(inputs, frozen)
+
+
+@router.get("/runs/{run_id}/reproduce")
+def reproduce_run(run_id: int, db: Session = Depends(get_db)):
+    """
+    The generate request that re-solves a deterministic run to the same schedule, and whether
+    the year's inputs and the installed OR-Tools still match the run.
+    """
+    from importlib.metadata import version
+    row = db.query(SolveRun).filter(SolveRun.id == run_id).first()
+    if not row:
+        raise HTTPException(404, "Solve run not found")
+    if not row.reproducible:
+        raise HTTPException(409, "Only deterministic runs that finished within their budget can be reproduced")
+    params = row.params_json or {}
+    return {
+        # Runs from before deterministic_budget kept the budget in time_limit (0 meant 300 units)
+        "request": {"year_id": row.year_id,
+                    "deterministic_budget": params.get("deterministic_budget") or params.get("time_limit") or 300,
+                    "random_seed": params.get("random_seed"), "block_weeks": params.get("block_weeks", 1),
+                    "formulation": params.get("formulation", "grid"), "deterministic": True,
+                    **params.get("stop_rules", {}),
+                    **{k: params[k] for k in ("freeze_before_week", "week_start", "week_end", "resident_ids")
+                       if k in params}},
+        "relax_vacation_blocks": bool(params.get("relax_vacation_blocks")),
+        "same_inputs": _current_input_hash(db, row) == row.input_hash,
+        "solver_version": row.solver_version,
+        "same_solver": version("ortools") == row.solver_version,
+        "model_hash": row.model_hash,
+        "version_id": row.version_id,
+    }
+
+
+@router.get("/runs/{run_id}")
+def get_run(run_id: int, db: Session = Depends(get_db)):
+    row = db.query(SolveRun).filter(SolveRun.id == run_id).first()
+    if not row:
+        raise HTTPException(404, "Solve run not found")
+    return run_out(row, with_curve=True)
+
+
 @router.get("/assignments")
-def get_assignments(year_id: int, db: Session = Depends(get_db)):
-    """Returns {resident_id: {week: rotation_code}}"""
+def get_assignments(year_id: int, request: Request, response: Response, format: str = "nested",
+                    db: Session = Depends(get_db)):
+    """
+    Returns {resident_id: {week: rotation_code}}, or with format=compact a codebook and one
+    packed index array (compact.py); 304 when If-None-Match names the current version.
+    """
+    if format not in ("nested", "compact"):
+        raise HTTPException(400, "format must be nested or compact")
+    tag = etag("grid" if format == "nested" else "grid-compact", year_id, versions.schedule_version(db, year_id))
+    cached = not_modified(request, tag)
+    if cached is not None:
+        return cached
+    if format == "compact":
+        grid = versions.load_grid(db, year_id)
+        codes = compact.codebook([grid])
+        return compact.json_response(
+            {"year_id": year_id, "codes": codes, **compact.pack_grid(grid, _resident_ids(db, year_id, grid), codes)},
+            headers=cache_headers(tag))
+    response.headers.update(cache_headers(tag))
     rows = db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == year_id).all()
     result = {}
     for r in rows:
@@ -341,6 +656,38 @@ def get_assignments(year_id: int, db: Session = Depends(get_db)):
     return result
 
 
+def _resident_ids(db: Session, year_id: int, grid: versions.Grid) -> List[int]:
+    """Row order of a compact grid: the year's residents by id, then any other resident with cells."""
+    ids = [rid for (rid,) in db.query(Resident.id).filter(Resident.year_id == year_id).order_by(Resident.id).all()]
+    known = set(ids)
+    return ids + sorted({rid for rid, _ in grid} - known)
+
+
+@router.get("/compact")
+def get_compact(year_ids: str, db: Session = Depends(get_db)):
+    """
+    Grids and remaining requirements of several years in one compact payload sharing one
+    codebook: {"codes": [...], "years": [{year_id, version, grid, remaining}]}.
+    year_ids is comma-separated.
+    """
+    try:
+        ids = [int(x) for x in year_ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(400, "year_ids must be comma-separated integers")
+    grids = {y: versions.load_grid(db, y) for y in ids}
+    codes = compact.codebook(grids.values())
+    years = []
+    for y, grid in grids.items():
+        rids = _resident_ids(db, y, grid)
+        years.append({
+            "year_id": y,
+            "version": versions.schedule_version(db, y),
+            "grid": compact.pack_grid(grid, rids, codes),
+            "remaining": compact.pack_remaining(_remaining_rows(db, y), rids),
+        })
+    return compact.json_response({"codes": codes, "years": years})
+
+
 @router.put("/assignment")
 def update_assignment(data: UpdateAssignmentRequest, db: Session = Depends(get_db)):
     """Update or create a single schedule assignment. Use empty string to clear."""
@@ -351,6 +698,7 @@ def update_assignment(data: UpdateAssignmentRequest, db: Session = Depends(get_d
         ScheduleAssignment.year_id == data.year_id,
         ScheduleAssignment.week_number == data.week_number,
     ).first()
+    old = existing.rotation_code if existing else None
     if data.rotation_code:
         if existing:
             existing.rotation_code = data.rotation_code
@@ -364,14 +712,139 @@ def update_assignment(data: UpdateAssignmentRequest, db: Session = Depends(get_d
     else:
         if existing:
             db.delete(existing)
+    new = data.rotation_code or None
+    if old != new:
+        versions.record(db, data.year_id, [[data.resident_id, data.week_number, old, new]], "edit",
+                        f"Week {data.week_number}: {old or 'empty'} -> {new or 'empty'}")
     db.commit()
     return {"ok": True}
 
 
+@router.post("/assignments/batch")
+def batch_update_assignments(data: BatchUpdateRequest, db: Session = Depends(get_db)):
+    """
+    Apply many cell changes (empty rotation_code clears) in one transaction, recorded as one
+    version, then validate the touched weeks and residents once (validation.check_edit).
+    Returns the applied delta, the tally change per resident and category, and the violations.
+    """
+    if not data.changes:
+        raise HTTPException(400, "No changes given")
+    seen = set()
+    for c in data.changes:
+        if not 1 <= c.week_number <= 52:
+            raise HTTPException(400, "week_number must be 1-52")
+        if (c.resident_id, c.week_number) in seen:
+            raise HTTPException(400, f"Resident {c.resident_id} week {c.week_number} is changed more than once")
+        seen.add((c.resident_id, c.week_number))
+    inputs = _load_solver_inputs(db, data.year_id)
+    in_year = {r["id"] for r in inputs["residents"]}
+    missing = sorted({c.resident_id for c in data.changes} - in_year)
+    if missing:
+        raise HTTPException(404, f"Residents not found in this year: {missing}")
+
+    before = versions.load_grid(db, data.year_id)
+    after = dict(before)
+    for c in data.changes:
+        if c.rotation_code:
+            after[(c.resident_id, c.week_number)] = c.rotation_code
+        else:
+            after.pop((c.resident_id, c.week_number), None)
+    delta = versions.grid_delta(before, after)
+    from validation import check_edit
+    versions.apply_delta(db, data.year_id, delta)
+    weeks = sorted({w for _, w, _, _ in delta})
+    description = data.description or (
+        f"{len(delta)} cells, weeks {weeks[0]}-{weeks[-1]}" if delta else "")
+    version = versions.record(db, data.year_id, delta, "bulk", description)
+    db.commit()
+    return {
+        "ok": True,
+        "version_id": version.id if version else None,
+        "changes": delta,
+        **check_edit(inputs, before, after, delta),
+    }
+
+
+def _feed(db: Session, year_id: int, since: int) -> dict:
+    """changefeed.changes_since() plus the remaining rows of the residents the patch touches."""
+    feed = changefeed.changes_since(db, year_id, since)
+    touched = sorted({rid for rid, _, _, _ in feed["changes"]})
+    return {
+        "year_id": year_id,
+        "since": since,
+        **feed,
+        "schedule_version": versions.schedule_version(db, year_id),
+        "remaining": _remaining_rows(db, year_id, touched) if touched else [],
+    }
+
+
+@router.get("/changes")
+def get_changes(year_id: int, since: int = 0, db: Session = Depends(get_db)):
+    """
+    Cell changes after sequence number since (a version id): the net patch, the new seq and the
+    remaining rows of the touched residents. reset=True means reload the grid instead.
+    schedule_version moving without changes means only the roster changed.
+    """
+    return _feed(db, year_id, since)
+
+
+@router.get("/changes/stream")
+async def stream_changes(year_id: int, request: Request, since: Optional[int] = None):
+    """
+    Server-sent events: a "changes" event (the /changes payload, id = seq) whenever the year's
+    schedule or roster changes. Without since (or Last-Event-ID) the stream starts from now.
+    """
+    def read(seq):
+        with SessionLocal() as db:
+            if seq is None:
+                return {"seq": changefeed.latest_seq(db, year_id), "schedule_version": versions.schedule_version(db, year_id)}
+            return _feed(db, year_id, seq)
+
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        since = int(last_id)
+
+    async def events():
+        head = await run_in_threadpool(read, None)
+        seq = since if since is not None else head["seq"]
+        version = head["schedule_version"]
+        seen, last_read = changefeed.counter(year_id), time.monotonic()
+        yield f"event: ready\ndata: {json.dumps({'seq': head['seq']})}\n\n"
+        if since is not None and since < head["seq"]:
+            seen = None  # catch up first
+        while not await request.is_disconnected():
+            now = time.monotonic()
+            if changefeed.counter(year_id) != seen or now - last_read >= changefeed.POLL_SECONDS:
+                seen, last_read = changefeed.counter(year_id), now
+                feed = await run_in_threadpool(read, seq)
+                if feed["changes"] or feed["reset"] or feed["schedule_version"] != version:
+                    seq, version = feed["seq"], feed["schedule_version"]
+                    yield f"id: {seq}\nevent: changes\ndata: {json.dumps(feed)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+            await asyncio.sleep(STREAM_TICK)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @router.get("/remaining")
-def get_remaining_requirements(year_id: int, db: Session = Depends(get_db)):
-    """Compute remaining weeks per resident per category after schedule."""
-    residents = db.query(Resident).filter(Resident.year_id == year_id).all()
+def get_remaining_requirements(year_id: int, format: str = "rows", db: Session = Depends(get_db)):
+    """Remaining weeks per resident per category after schedule; format=compact returns matrices (compact.py)."""
+    if format not in ("rows", "compact"):
+        raise HTTPException(400, "format must be rows or compact")
+    rows = _remaining_rows(db, year_id)
+    if format == "rows":
+        return rows
+    ids = [rid for (rid,) in db.query(Resident.id).filter(Resident.year_id == year_id).order_by(Resident.id).all()]
+    return compact.json_response({"year_id": year_id, **compact.pack_remaining(rows, ids)})
+
+
+def _remaining_rows(db: Session, year_id: int, resident_ids: Optional[List[int]] = None) -> List[dict]:
+    """One row per resident and category: required, completed (manual completions + schedule) and remaining."""
+    q = db.query(Resident).filter(Resident.year_id == year_id)
+    if resident_ids is not None:
+        q = q.filter(Resident.id.in_(resident_ids))
+    residents = q.all()
     if not residents:
         return []
 
@@ -390,18 +863,7 @@ def get_remaining_requirements(year_id: int, db: Session = Depends(get_db)):
     for c in db.query(Completion).all():
         comps.setdefault(c.resident_id, {})[c.category] = c.completed_weeks
 
-    CAT_ROTS = {
-        "CLINIC": ["CLINIC", "CLINIC *"],
-        "CARDIO": ["CARDIO"],
-        "ED": ["ED"], "ID": ["ID"], "NEURO": ["NEURO"],
-        "VACATION": ["VACATION"],
-        "GERIATRICS": ["GERIATRICS"],
-        "GEN SURG": ["GEN SURG"],
-        "ELECTIVE": ["ELECTIVE", "CARDIO", "ID", "NEURO", "GERIATRICS", "GEN SURG"],
-        "TY CLINIC": ["TY CLINIC"],
-    }
-    FLOOR_ROTS = ["A", "B", "C", "D", "G"]
-    ICU_ROTS = ["ICU"]
+    catalog = get_catalog()
 
     assignments = {}
     for a in db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == year_id).all():
@@ -413,45 +875,16 @@ def get_remaining_requirements(year_id: int, db: Session = Depends(get_db)):
         assigns = assignments.get(r.id, {}) or {}
         resident_reqs = reqs_by_res.get(r.id, [])
 
-        def _eff(cat):
-            return max(0, comp.get(cat, 0))
-
-        # 1. Baseline from manual completions
-        done = {cat: _eff(cat) for cat in CAT_ROTS.keys()}
-        for k in ["FLOORS", "ICU", "NF", "ICU_NIGHT", "SWING"]:
-            done[k] = _eff(k)
-
-        # 2. Add current schedule assignments
-        for w, rot in assigns.items():
-            # Match engine.py logic:
-            # FLOORS = A, B, C, D, G + NF + SWING
-            if rot in FLOOR_ROTS or rot == "NF" or rot == "SWING":
-                done["FLOORS"] = done.get("FLOORS", 0) + 1
-            
-            # ICU = ICU + ICU N + SWING (matches engine REQ_TO_IDX)
-            if rot in ICU_ROTS or rot == "ICU N" or rot == "SWING":
-                done["ICU"] = done.get("ICU", 0) + 1
-            
-            # ICU_NIGHT = ICU N + SWING
-            if rot == "ICU N" or rot == "SWING":
-                done["ICU_NIGHT"] = done.get("ICU_NIGHT", 0) + 1
-            
-            # NF = NF + SWING
-            if rot == "NF" or rot == "SWING":
-                done["NF"] = done.get("NF", 0) + 1
-            
-            # SWING is its own category too
-            if rot == "SWING":
-                done["SWING"] = done.get("SWING", 0) + 1
-            
-            for cat, rots in CAT_ROTS.items():
-                if rot in rots:
-                    done[cat] = done.get(cat, 0) + 1
+        # 1. Baseline from manual completions, 2. plus current schedule weeks per category
+        # (same category membership as the engine, from the rotation catalog)
+        done = {cat: max(0, n) for cat, n in comp.items()}
+        for cat, n in catalog.tally(assigns.values()).items():
+            done[cat] = done.get(cat, 0) + n
 
         # 3. Clinic overflow
         clinic_cnt = sum(1 for rot in assigns.values() if rot in ("CLINIC", "CLINIC *"))
         req_clinic = next((x.required_weeks for x in resident_reqs if x.category == "CLINIC"), 0)
-        clinic_overflow = max(0, _eff("CLINIC") + clinic_cnt - req_clinic)
+        clinic_overflow = max(0, max(0, comp.get("CLINIC", 0)) + clinic_cnt - req_clinic)
         done["ELECTIVE"] = done.get("ELECTIVE", 0) + clinic_overflow
 
         # 4. Format output
@@ -485,82 +918,126 @@ def get_remaining_requirements(year_id: int, db: Session = Depends(get_db)):
 
 @router.post("/clear")
 def clear_schedule(req: ClearScheduleRequest, db: Session = Depends(get_db)):
-    """Clear rotations for a resident or whole schedule. Creates backup first. Requires confirm_text='DELETE'."""
+    """Clear rotations for a resident or whole schedule, recorded as a version. Requires confirm_text='DELETE'."""
     if req.confirm_text != "DELETE":
         raise HTTPException(400, "You must type DELETE to confirm. No changes were made.")
     rows = db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == req.year_id)
     if req.resident_id is not None:
         rows = rows.filter(ScheduleAssignment.resident_id == req.resident_id)
-    assignments_list = rows.all()
-    if not assignments_list:
+    delta = [[rid, w, code, None] for rid, w, code in rows.with_entities(
+        ScheduleAssignment.resident_id, ScheduleAssignment.week_number, ScheduleAssignment.rotation_code).all()]
+    if not delta:
         return {"ok": True, "cleared": 0, "message": "Nothing to clear"}
-    backup_data = {}
-    for a in assignments_list:
-        backup_data.setdefault(a.resident_id, {})[a.week_number] = a.rotation_code
     resident = db.query(Resident).filter(Resident.id == req.resident_id).first() if req.resident_id else None
-    desc = f"Before clearing {resident.name}" if resident else "Before clearing entire schedule"
-    backup = ScheduleBackup(
-        year_id=req.year_id,
-        description=desc,
-        assignments_json=json.dumps(backup_data),
-    )
-    db.add(backup)
-    for a in assignments_list:
-        db.delete(a)
-    affected = {}  # (resident_id, category) -> True
-    for resid, weeks in backup_data.items():
-        for rot in set(weeks.values()):
-            for cat in get_categories_for_rotation(rot):
-                affected[(resid, cat)] = True
-    for (resid, cat) in affected:
-        c = db.query(Completion).filter(
-            Completion.resident_id == resid,
-            Completion.category == cat,
-        ).first()
-        if c:
-            c.completed_weeks = 0
-            c.source = "manual"
-        else:
-            db.add(Completion(resident_id=resid, category=cat, completed_weeks=0, source="manual"))
+    desc = f"Cleared {resident.name}" if resident else "Cleared entire schedule"
+    rows.delete(synchronize_session=False)
+    version = versions.record(db, req.year_id, delta, "clear", desc)
+
+    # Completions of every category the cleared cells counted toward are reset to 0:
+    # one UPDATE for the pairs that have a row, one bulk INSERT for the rest
+    catalog = get_catalog()
+    affected = {(rid, cat) for rid, _, code, _ in delta for cat in catalog.categories_for(code)}
+    existing = set(db.query(Completion.resident_id, Completion.category)
+                   .filter(Completion.resident_id.in_({rid for rid, _ in affected})).all())
+    reset = affected & existing
+    if reset:
+        db.query(Completion).filter(
+            tuple_(Completion.resident_id, Completion.category).in_(sorted(reset))
+        ).update({Completion.completed_weeks: 0, Completion.source: "manual"}, synchronize_session=False)
+    missing = sorted(affected - existing)
+    if missing:
+        db.execute(insert(Completion), [
+            {"resident_id": rid, "category": cat, "completed_weeks": 0, "source": "manual"} for rid, cat in missing
+        ])
     db.commit()
-    db.refresh(backup)
-    return {"ok": True, "cleared": len(assignments_list), "backup_id": backup.id}
+    # The version before the clear restores it
+    return {"ok": True, "cleared": len(delta), "restore_version_id": version.parent_id}
+
+
+def _get_version(db: Session, version_id: int) -> ScheduleVersion:
+    version = db.query(ScheduleVersion).filter(ScheduleVersion.id == version_id).first()
+    if not version:
+        raise HTTPException(404, "Version not found")
+    return version
+
 
+@router.get("/versions", response_model=list)
+def list_versions(year_id: int, limit: int = 100, db: Session = Depends(get_db)):
+    """Schedule versions for a year (generate, edits, clears, restores...), newest first."""
+    rows = db.query(ScheduleVersion).filter(ScheduleVersion.year_id == year_id) \
+        .order_by(ScheduleVersion.id.desc()).limit(max(1, limit)).all()
+    return [versions.version_out(v) for v in rows]
 
-@router.get("/backups", response_model=list)
-def list_backups(year_id: int, db: Session = Depends(get_db)):
-    """List schedule backups for a year, newest first."""
-    backups = db.query(ScheduleBackup).filter(ScheduleBackup.year_id == year_id).order_by(ScheduleBackup.created_at.desc()).all()
+
+@router.get("/versions/diff")
+def diff_versions(a: int, b: int, db: Session = Depends(get_db)):
+    """Cells that differ between versions a and b: [[resident_id, week, code_in_a, code_in_b], ...]."""
+    va, vb = _get_version(db, a), _get_version(db, b)
+    if va.year_id != vb.year_id:
+        raise HTTPException(400, "Versions belong to different years")
+    changes = versions.grid_delta(versions.grid_at(db, va), versions.grid_at(db, vb))
+    return {"a": a, "b": b, "change_count": len(changes), "changes": changes}
+
+
+@router.get("/versions/{version_id}")
+def get_version(version_id: int, db: Session = Depends(get_db)):
+    """A version with its own cell changes ([[resident_id, week, old, new], ...])."""
+    version = _get_version(db, version_id)
+    return {**versions.version_out(version), "changes": json.loads(version.delta_json or "[]")}
+
+
+@router.get("/versions/{version_id}/assignments")
+def get_version_assignments(version_id: int, db: Session = Depends(get_db)):
+    """The schedule as of a version, same shape as /assignments: {resident_id: {week: rotation_code}}."""
+    return versions.nested(versions.grid_at(db, _get_version(db, version_id)))
+
+
+@router.post("/versions/{version_id}/restore")
+def restore_version(version_id: int, db: Session = Depends(get_db)):
+    """Make a version's schedule current again (only the differing cells are written)."""
+    version = _get_version(db, version_id)
+    restored = versions.restore(db, version)
+    db.commit()
+    return {"ok": True, "restored": restored.change_count if restored else 0,
+            "version_id": restored.id if restored else None}
+
+
+@router.get("/drafts", response_model=list)
+def list_drafts(year_id: int, db: Session = Depends(get_db)):
+    """Draft schedules stored by anytime generate jobs, newest first."""
+    drafts = db.query(ScheduleDraft).filter(ScheduleDraft.year_id == year_id).order_by(ScheduleDraft.id.desc()).all()
     return [
         {
-            "id": b.id,
-            "year_id": b.year_id,
-            "description": b.description,
-            "created_at": b.created_at.isoformat() if b.created_at else None,
+            "id": d.id,
+            "job_id": d.job_id,
+            "seq": d.seq,
+            "phase": d.phase,
+            "objective": d.objective,
+            "elapsed_seconds": d.elapsed_seconds,
+            "promoted": bool(d.promoted),
+            "created_at": d.created_at.isoformat() if d.created_at else None,
         }
-        for b in backups
+        for d in drafts
     ]
 
 
-@router.post("/restore/{backup_id}")
-def restore_backup(backup_id: int, db: Session = Depends(get_db)):
-    """Restore schedule from a backup."""
-    backup = db.query(ScheduleBackup).filter(ScheduleBackup.id == backup_id).first()
-    if not backup:
-        raise HTTPException(404, "Backup not found")
-    data = json.loads(backup.assignments_json)
-    existing = db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == backup.year_id).all()
-    for a in existing:
-        db.delete(a)
-    count = 0
-    for resident_id, weeks in data.items():
-        for week_num, rot in weeks.items():
-            db.add(ScheduleAssignment(
-                resident_id=int(resident_id),
-                year_id=backup.year_id,
-                week_number=int(week_num),
-                rotation_code=str(rot),
-            ))
-            count += 1
+@router.get("/drafts/{draft_id}/assignments")
+def get_draft_assignments(draft_id: int, db: Session = Depends(get_db)):
+    """A draft's grid, same shape as /assignments: {resident_id: {week: rotation_code}}."""
+    draft = db.query(ScheduleDraft).filter(ScheduleDraft.id == draft_id).first()
+    if not draft:
+        raise HTTPException(404, "Draft not found")
+    return json.loads(draft.assignments_json)
+
+
+@router.post("/drafts/{draft_id}/promote")
+def promote_draft(draft_id: int, db: Session = Depends(get_db)):
+    """Publish a draft as the year's schedule, recorded as a version (restore its parent to undo)."""
+    draft = db.query(ScheduleDraft).filter(ScheduleDraft.id == draft_id).first()
+    if not draft:
+        raise HTTPException(404, "Draft not found")
+    count = _replace_assignments(db, draft.year_id, json.loads(draft.assignments_json),
+                                 "promote", f"Promoted draft {draft.seq}")
+    draft.promoted = True
     db.commit()
-    return {"ok": True, "restored": count}
+    return {"ok": True, "assigned": count}
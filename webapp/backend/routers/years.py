@@ -2,10 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from database import get_db
-from models import (
-    Year, Cohort, Resident, Week, CoverageRule,
-    ScheduleAssignment, ScheduleBackup, VacationRequest, Completion,
-)
+from models import Year, Cohort
 
 router = APIRouter()
 
@@ -44,23 +41,13 @@ def create_year(data: YearCreate, db: Session = Depends(get_db)):
 
 @router.delete("/{year_id}")
 def delete_year(year_id: int, db: Session = Depends(get_db)):
-    """Delete a year and all its data (residents, cohorts, schedule, backups, vacation requests, etc.)."""
+    """Delete a year and all its data (residents, cohorts, schedule, versions, drafts, vacation requests, etc.)."""
     y = db.query(Year).filter(Year.id == year_id).first()
     if not y:
         raise HTTPException(404, "Year not found")
-    resident_ids = [r.id for r in db.query(Resident).filter(Resident.year_id == year_id).all()]
-    db.query(Resident).filter(Resident.prior_resident_id.in_(resident_ids)).update(
-        {Resident.prior_resident_id: None}, synchronize_session=False
-    )
-    db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == year_id).delete()
-    db.query(ScheduleBackup).filter(ScheduleBackup.year_id == year_id).delete()
-    db.query(VacationRequest).filter(VacationRequest.year_id == year_id).delete()
-    for rid in resident_ids:
-        db.query(Completion).filter(Completion.resident_id == rid).delete()
-    db.query(Resident).filter(Resident.year_id == year_id).delete()
-    db.query(Cohort).filter(Cohort.year_id == year_id).delete()
-    db.query(Week).filter(Week.year_id == year_id).delete()
-    db.query(CoverageRule).filter(CoverageRule.year_id == year_id).delete()
-    db.delete(y)
+    name = y.name
+    # One statement: rows owned by the year and by its residents go through ON DELETE CASCADE
+    # (models.py); residents rolled over from this year get prior_resident_id set to NULL.
+    db.query(Year).filter(Year.id == year_id).delete(synchronize_session=False)
     db.commit()
-    return {"ok": True, "deleted": y.name}
+    return {"ok": True, "deleted": name}
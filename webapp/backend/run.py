@@ -1,23 +1,58 @@
-import uvicorn
-import webbrowser
-import os
-import sys
-import threading
 import time
+T0 = time.time()  # before the heavy imports: startup timings include them
+
+import argparse
+import threading
+import urllib.request
+import webbrowser
+
+import uvicorn
+
+READY_TIMEOUT = 60  # seconds to wait for the server before giving up on the browser
+
+
+def open_browser_when_ready(port: int):
+    """Poll the health endpoint and open the browser as soon as the server answers."""
+    url = f"http://127.0.0.1:{port}/api/health"
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        return
+    webbrowser.open(f"http://localhost:{port}")
 
-def open_browser():
-    time.sleep(2)  # Wait for server to start
-    webbrowser.open("http://localhost:8000")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the scheduler app")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-browser", action="store_true", help="Do not open a browser window")
+    parser.add_argument("--reserve-cpus", type=int, default=None,
+                        help="CPUs the solver leaves for the app and the OS (default 1, see governor.py)")
+    args, _ = parser.parse_known_args()  # PyInstaller/macOS may pass extra arguments
+
+    # The engine compiles coverage with the scheduler package at the repo root (PyInstaller
+    # bundles it via --paths)
+    import sys
+    from pathlib import Path
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
     # If we are packaged, we need to make sure we serve static content correctly
     # The main.py logic handles looking for static files in sys._MEIPASS
-    
+    import startup
+    startup.begin(T0)
+    if args.reserve_cpus is not None:
+        import os
+        os.environ["SCHEDULER_RESERVE_CPUS"] = str(args.reserve_cpus)
+
     # Launch browser in a separate thread
-    threading.Thread(target=open_browser).start()
-    
+    if not args.no_browser:
+        threading.Thread(target=open_browser_when_ready, args=(args.port,), daemon=True).start()
+
     # Run server
     # workers=1 is standard for desktop apps
-    # loop="asyncio" ensures compatibility
     from main import app
-    uvicorn.run(app, host="0.0.0.0", port=8000, workers=1)
+    uvicorn.run(app, host="0.0.0.0", port=args.port, workers=1)
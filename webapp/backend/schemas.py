@@ -130,10 +130,41 @@ class UpdateAssignmentRequest(BaseModel):
     rotation_code: str = ""  # empty = clear cell
 
 
+class CellChange(BaseModel):
+    resident_id: int
+    week_number: int
+    rotation_code: str = ""  # empty = clear cell
+
+
+class BatchUpdateRequest(BaseModel):
+    year_id: int
+    changes: List[CellChange]
+    description: Optional[str] = None  # version history label; defaults to a summary of the cells
+
+
 class GenerateScheduleRequest(BaseModel):
     year_id: int
-    time_limit_seconds: int = 0  # 0 = unlimited; else seconds
+    time_limit_seconds: int = 0  # 0 = the engine default (300s); else seconds. Not used by deterministic mode
     random_seed: Optional[int] = None
+    use_lns: bool = False  # improve the first solution with Large Neighborhood Search (lns.py)
+    anytime: bool = False  # fast first schedule, then optimize; improving schedules are stored as drafts (anytime.py)
+    block_weeks: int = 1  # 2 = assign rotations per 2-week block (engine block mode)
+    formulation: str = "grid"  # "interval" = build each resident's year from rotation blocks (interval_engine.py)
+    priority: str = "normal"  # CPU share: "interactive" (larger), "normal" or "overnight" (smaller); governor.py
+    deterministic: bool = False  # reproducible solve, limited by deterministic_budget instead of wall time
+    # Required with deterministic: CP-SAT deterministic time units (about 6 wall seconds each on one CPU)
+    deterministic_budget: Optional[float] = None
+    # Stopping rules (scheduler/stopping.py); None keeps the default, 0 turns a rule off
+    relative_gap: Optional[float] = None  # stop within this fraction of the best bound
+    absolute_gap: Optional[float] = None  # stop within this objective distance of the best bound
+    stagnation_seconds: Optional[float] = None  # stop after this long without a better schedule
+    max_clean_solutions: Optional[int] = None  # stop after this many schedules without any penalty
+    # Partial regeneration: only the chosen weeks / residents are re-solved, every other cell of the
+    # current schedule is kept as it is. None = no limit on that side
+    freeze_before_week: Optional[int] = None  # keep weeks before this one (the part of the year already worked)
+    week_start: Optional[int] = None  # first week to re-solve
+    week_end: Optional[int] = None  # last week to re-solve
+    resident_ids: Optional[List[int]] = None  # residents to re-solve
 
 
 class GenerateScheduleResponse(BaseModel):
@@ -148,13 +179,3 @@ class ClearScheduleRequest(BaseModel):
     year_id: int
     resident_id: Optional[int] = None  # If set, clear only this resident; else clear all
     confirm_text: str  # Must be exactly "DELETE" to proceed
-
-
-class ScheduleBackupOut(BaseModel):
-    id: int
-    year_id: int
-    description: str
-    created_at: str
-
-    class Config:
-        from_attributes = True
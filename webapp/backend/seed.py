@@ -87,7 +87,7 @@ coverage = [
     ("ICU_DAY", 1, 2, 2, False),
     ("NF", 1, 1, 1, False),
     ("ICUN", 1, 1, 1, False),
-    ("SWING", 1, 1, 0, False),
+    ("SWING", 1, 1, 1, False),
     ("TEAM_G", 0, 1, 0, True),
 ]
 for pool, units, sr, ir, opt in coverage:
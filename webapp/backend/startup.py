@@ -0,0 +1,33 @@
+"""
+Startup timing: seconds from process start to each phase of bringing the app up.
+
+run.py calls begin() first thing, so marks include interpreter and import time; under a plain
+`uvicorn main:app` the clock starts when main.py imports this module. Phases:
+
+  imported    main.py finished (routers; the solver and Excel stacks load on first use)
+  database    the startup hook brought the database up to date (migrations, catalog, backups)
+  ready       the server accepted its first health check (run.py opens the browser then)
+  first_page  the first page or API root was served
+
+GET /api/health reports them; benchmarks/startup.py records them in the benchmark history.
+"""
+import time
+
+_t0 = time.time()
+_marks = {}
+
+
+def begin(t0: float) -> None:
+    """Start the clock at t0 (time.time() taken before the heavy imports)."""
+    global _t0
+    _t0 = t0
+
+
+def mark(phase: str) -> None:
+    """Record the first time phase is reached; later calls are ignored."""
+    if phase not in _marks:
+        _marks[phase] = round(time.time() - _t0, 3)
+
+
+def report() -> dict:
+    return {f"{phase}_seconds": secs for phase, secs in _marks.items()}
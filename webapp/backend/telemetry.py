@@ -0,0 +1,179 @@
+"""
+Solve telemetry: one solve_runs row per generate job.
+
+Each row keeps what is needed to tell whether a rule or roster change made solving slower:
+a hash of the solver inputs (equal hashes mean the same problem), the roster shape, phase
+timings (load inputs, build model, solve, write assignments), CP-SAT's search counters, the
+stopping rule that ended the search and a sampled objective-over-time curve. compare_runs() lines two rows up side by side.
+Deterministic runs also keep what reproduces their schedule bit-for-bit: OR-Tools version,
+the CP-SAT parameters as set and a hash of the model, next to the input hash and run params.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models import SolveRun
+
+MAX_CURVE_POINTS = 50
+TIMING_FIELDS = ["load_seconds", "build_seconds", "presolve_seconds", "first_solution_seconds",
+                 "solve_seconds", "diagnose_seconds", "write_seconds"]
+SEARCH_FIELDS = ["objective", "best_bound", "num_branches", "num_conflicts", "deterministic_time"]
+
+
+def input_hash(inputs: dict, frozen: Optional[dict] = None) -> str:
+    """
+    Stable sha256 of _load_solver_inputs() output; key order and dict ordering do not matter.
+    frozen: the cells a partial regeneration kept ({(resident_id, week): code}), hashed with them.
+    """
+    if frozen:
+        inputs = {**inputs, "frozen": sorted([rid, w, code or ""] for (rid, w), code in frozen.items())}
+    blob = json.dumps(inputs, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def roster_shape(inputs: dict) -> Dict[str, int]:
+    residents = inputs["residents"]
+    shape = {
+        "residents": len(residents),
+        "seniors": sum(1 for r in residents if r.get("is_senior")),
+        "interns": sum(1 for r in residents if r.get("is_intern")),
+        "cohorts": len(inputs.get("cohort_defs") or []),
+        "vacation_requests": len(inputs.get("vacation_requests") or []),
+        "hard_locks": sum(len(v.get("hard_locks", [])) for v in inputs.get("vacation_requests") or []),
+        "coverage_rules": len(inputs.get("coverage_rules") or []),
+    }
+    for r in residents:
+        pgy = r.get("pgy") or "?"
+        shape[pgy] = shape.get(pgy, 0) + 1
+    return shape
+
+
+def sample_curve(points: Sequence[Tuple[float, float]], max_points: int = MAX_CURVE_POINTS) -> List[list]:
+    """Keep at most max_points of an objective curve, always including the first and last solution."""
+    points = [list(p) for p in points]
+    if len(points) <= max_points:
+        return points
+    step = (len(points) - 1) / (max_points - 1)
+    return [points[round(i * step)] for i in range(max_points)]
+
+
+def record_run(
+    db,
+    job_id: str,
+    year_id: int,
+    inputs: dict,
+    params: dict,
+    status: str,
+    success: bool = False,
+    timings: Optional[dict] = None,
+    stats: Optional[dict] = None,
+    message: Optional[str] = None,
+    version_id: Optional[int] = None,
+    frozen: Optional[dict] = None,
+) -> Optional[SolveRun]:
+    """
+    Insert and commit one solve_runs row. stats is engine.solve() / solve_lns() stats; frozen
+    (partial regeneration) is part of the input hash.
+    Telemetry never fails a job: errors are logged and the row is dropped (returns None).
+    """
+    try:
+        return _insert_run(db, job_id, year_id, inputs, params, status, success, timings, stats or {}, message,
+                           version_id, frozen)
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Job {job_id}: could not record solve run: {e}")
+        return None
+
+
+def _insert_run(db, job_id, year_id, inputs, params, status, success, timings, stats, message,
+                version_id=None, frozen=None) -> SolveRun:
+    timings = {**(timings or {}), **{k: stats.get(k) for k in TIMING_FIELDS if stats.get(k) is not None}}
+    row = SolveRun(
+        job_id=job_id,
+        year_id=year_id,
+        engine="anytime" if params.get("anytime") else "lns" if params.get("use_lns") else "cp-sat",
+        input_hash=input_hash(inputs, frozen),
+        roster_json=roster_shape(inputs),
+        params_json=params,
+        status=status,
+        success=success,
+        curve_json=sample_curve(stats.get("curve", [])),
+        message=message,
+        stop_reason=stats.get("stop_reason"),
+        solver_version=stats.get("solver_version"),
+        solver_params_json=stats.get("solver_params") or {},
+        model_hash=stats.get("model_hash"),
+        reproducible=bool(stats.get("reproducible")),
+        version_id=version_id,
+        **{k: timings.get(k) for k in TIMING_FIELDS},
+        **{k: stats.get(k) for k in SEARCH_FIELDS},
+    )
+    db.add(row)
+    db.commit()
+    return row
+
+
+def run_out(row: SolveRun, with_curve: bool = False) -> dict:
+    out = {
+        "id": row.id,
+        "job_id": row.job_id,
+        "year_id": row.year_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "engine": row.engine,
+        "input_hash": row.input_hash,
+        "roster": row.roster_json or {},
+        "params": row.params_json or {},
+        "status": row.status,
+        "success": bool(row.success),
+        "message": row.message,
+        "stop_reason": row.stop_reason,
+        "solver_version": row.solver_version,
+        "solver_params": row.solver_params_json or {},
+        "model_hash": row.model_hash,
+        "reproducible": bool(row.reproducible),
+        "version_id": row.version_id,
+        **{k: getattr(row, k) for k in TIMING_FIELDS + SEARCH_FIELDS},
+        "solutions": len(row.curve_json or []),
+    }
+    if with_curve:
+        out["curve"] = row.curve_json or []
+    return out
+
+
+def objective_at(curve: List[list], t: float) -> Optional[float]:
+    """Best objective found by t seconds (curves are (seconds, objective), improving)."""
+    best = None
+    for secs, obj in curve:
+        if secs > t:
+            break
+        best = obj
+    return best
+
+
+def compare_runs(a: SolveRun, b: SolveRun) -> dict:
+    """
+    Side-by-side view of two runs: b minus a for every timing and search counter, whether
+    they solved the same inputs, roster-shape differences, and both curves sampled on a
+    common time grid (objective reached by each run at that second).
+    """
+    ra, rb = run_out(a, with_curve=True), run_out(b, with_curve=True)
+    delta = {}
+    for k in TIMING_FIELDS + SEARCH_FIELDS:
+        if ra[k] is not None and rb[k] is not None:
+            delta[k] = round(rb[k] - ra[k], 3)
+    shape_keys = sorted(set(ra["roster"]) | set(rb["roster"]))
+    roster_diff = {k: [ra["roster"].get(k, 0), rb["roster"].get(k, 0)] for k in shape_keys
+                   if ra["roster"].get(k, 0) != rb["roster"].get(k, 0)}
+    horizon = max([p[0] for p in ra["curve"] + rb["curve"]] or [0])
+    grid = sorted({round(horizon * i / 10, 1) for i in range(1, 11)}) if horizon else []
+    return {
+        "a": ra,
+        "b": rb,
+        "same_inputs": ra["input_hash"] == rb["input_hash"],
+        "same_model": ra["model_hash"] is not None and ra["model_hash"] == rb["model_hash"],
+        "roster_diff": roster_diff,
+        "delta": delta,
+        "curve_grid": [{"seconds": t, "a": objective_at(ra["curve"], t), "b": objective_at(rb["curve"], t)}
+                       for t in grid],
+    }
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# The backend modules, and the repo root for the scheduler and benchmarks packages
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database import Base  # noqa: E402
+from models import Resident, Year  # noqa: E402
+import versions  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory database with the app's tables."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def year(db):
+    """A year with four residents; returns (year_id, [resident ids])."""
+    y = Year(name="2026-2027", start_date="2026-07-01")
+    db.add(y)
+    db.flush()
+    residents = [Resident(name=f"Resident {i}", pgy="PGY1", year_id=y.id) for i in range(4)]
+    db.add_all(residents)
+    db.commit()
+    return y.id, [r.id for r in residents]
+
+
+def edit(db, year_id, cells, source="edit"):
+    """Write {(resident_id, week): code or None} the way the routers do; returns the new version."""
+    before = versions.load_grid(db, year_id)
+    after = dict(before)
+    for key, code in cells.items():
+        if code is None:
+            after.pop(key, None)
+        else:
+            after[key] = code
+    delta = versions.grid_delta(before, after)
+    versions.apply_delta(db, year_id, delta)
+    db.flush()
+    version = versions.record(db, year_id, delta, source, f"{source} {len(delta)} cells")
+    db.commit()
+    return version
@@ -0,0 +1,73 @@
+"""changes_since(): net cell patches and the cases where the client must reload instead."""
+import changefeed
+import versions
+from conftest import edit
+from models import ScheduleVersion
+
+
+def test_folds_versions_into_net_patch(db, year):
+    year_id, ids = year
+    start = edit(db, year_id, {(ids[0], 1): "A", (ids[1], 1): "B"})
+    edit(db, year_id, {(ids[0], 1): "ICU", (ids[2], 3): "NF"})
+    edit(db, year_id, {(ids[0], 1): "NF", (ids[2], 3): None, (ids[1], 1): "CLINIC"})
+    last = edit(db, year_id, {(ids[1], 1): "B"})
+
+    feed = changefeed.changes_since(db, year_id, start.id)
+    assert feed["seq"] == last.id
+    assert not feed["reset"]
+    # First old and last new per cell; cells changed and changed back drop out
+    assert sorted(feed["changes"]) == [[ids[0], 1, "A", "NF"]]
+
+
+def test_patch_brings_client_grid_up_to_date(db, year):
+    year_id, ids = year
+    start = edit(db, year_id, {(rid, w): "A" for rid in ids for w in (1, 2)})
+    client = versions.load_grid(db, year_id)
+    edit(db, year_id, {(ids[0], 1): "B", (ids[1], 2): None})
+    edit(db, year_id, {(ids[0], 1): "ICU", (ids[3], 5): "NF"})
+
+    feed = changefeed.changes_since(db, year_id, start.id)
+    for rid, w, _, new in feed["changes"]:
+        if new is None:
+            client.pop((rid, w))
+        else:
+            client[(rid, w)] = new
+    assert client == versions.load_grid(db, year_id)
+
+
+def test_up_to_date_and_unknown_seq(db, year):
+    year_id, ids = year
+    last = edit(db, year_id, {(ids[0], 1): "A"})
+    assert changefeed.changes_since(db, year_id, last.id) == {"seq": last.id, "reset": False, "changes": []}
+    # A seq past the year's last version comes from another database state
+    assert changefeed.changes_since(db, year_id, last.id + 10) == {"seq": last.id, "reset": True, "changes": []}
+
+
+def test_reset_across_baseline(db, year):
+    year_id, ids = year
+    first = edit(db, year_id, {(ids[0], 1): "A"})
+    baseline = db.query(ScheduleVersion).filter(ScheduleVersion.id == first.parent_id).one()
+    feed = changefeed.changes_since(db, year_id, baseline.id - 1)
+    assert feed == {"seq": first.id, "reset": True, "changes": []}
+    assert not changefeed.changes_since(db, year_id, baseline.id)["reset"]
+
+
+def test_reset_when_patch_too_large(db, year, monkeypatch):
+    year_id, ids = year
+    start = edit(db, year_id, {(ids[0], 1): "A"})
+    last = edit(db, year_id, {(rid, w): "CLINIC" for rid in ids for w in range(1, 4)})
+    monkeypatch.setattr(changefeed, "MAX_PATCH_CELLS", 10)
+    assert changefeed.changes_since(db, year_id, start.id) == {"seq": last.id, "reset": True, "changes": []}
+    monkeypatch.setattr(changefeed, "MAX_PATCH_CELLS", 12)
+    assert len(changefeed.changes_since(db, year_id, start.id)["changes"]) == 12
+
+
+def test_bump_advances_counter_on_commit_only(db, year):
+    year_id, _ = year
+    before = changefeed.counter(year_id)
+    versions.bump(db, year_id)
+    db.rollback()
+    assert changefeed.counter(year_id) == before
+    versions.bump(db, year_id)
+    db.commit()
+    assert changefeed.counter(year_id) == before + 1
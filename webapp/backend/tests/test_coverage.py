@@ -0,0 +1,45 @@
+"""Coverage rule compiler: the default rules give the web engine's former fixed coverage."""
+import pytest
+
+from engine import ROT_CODES, ROT_IDX
+from scheduler.coverage import DEFAULT_RULES, HOLIDAY_WEEKS, compile_rules
+
+REGULAR_WEEKS = tuple(w for w in range(1, 53) if w not in HOLIDAY_WEEKS)
+
+# The engine's hard-coded coverage before the rules were compiled: per regular week seniors and
+# interns, per holiday week the team total and its minimum seniors, and whether it may be off
+FIXED = {
+    "A": (1, 2, 3, 1, False),
+    "B": (1, 2, 3, 1, False),
+    "C": (1, 2, 3, 1, False),
+    "D": (1, 2, 3, 1, False),
+    "ICU": (2, 2, 4, 1, False),
+    "NF": (1, 1, 2, 0, False),
+    "ICU N": (1, 1, 2, 0, False),
+    "SWING": (1, 1, 2, 0, False),
+    "G": (1, 0, 0, 0, True),  # seniors only, preferred but optional, never on holiday weeks
+}
+
+
+def test_default_rules_reproduce_fixed_coverage():
+    plans = compile_rules(DEFAULT_RULES, ROT_IDX)
+    got = {p.label: (p.seniors, p.interns, p.holiday_total, p.holiday_min_seniors, p.optional) for p in plans}
+    assert got == FIXED
+    for p in plans:
+        assert p.weeks == REGULAR_WEEKS
+        assert p.holiday_weeks == HOLIDAY_WEEKS
+        assert p.idx == tuple(ROT_IDX[c] for c in p.codes)
+
+
+def test_unknown_pool():
+    rules = DEFAULT_RULES + [{"pool": "FLOOR_Z9", "required_units_per_week": 1, "seniors_per_unit": 1}]
+    with pytest.raises(ValueError, match="Unknown coverage pool"):
+        compile_rules(rules, ROT_IDX)
+    # The workbook solver skips rows it cannot place, as it always has
+    with pytest.warns(UserWarning, match="FLOOR_Z9"):
+        plans = compile_rules(rules, ROT_IDX, skip_unknown=True)
+    assert len(plans) == len(DEFAULT_RULES)
+    # FLOOR_E is a valid pool, but this code table has no E team
+    with pytest.warns(UserWarning, match="no rotation code"):
+        compile_rules([{"pool": "FLOOR_E", "required_units_per_week": 1}], ROT_IDX, skip_unknown=True)
+    assert "E" not in ROT_CODES
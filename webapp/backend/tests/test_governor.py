@@ -0,0 +1,61 @@
+"""CPU governor: leases never hold more workers than the machine's capacity."""
+import threading
+import time
+
+import pytest
+
+import governor
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    """Set the machine's CPU count; no load from other processes."""
+    monkeypatch.setattr(governor, "RESERVE_CPUS", 1)
+    monkeypatch.setattr(governor, "QUEUE_RECHECK", 0.05)
+    monkeypatch.setattr(governor.os, "getloadavg", lambda: (0.0, 0.0, 0.0))
+
+    def set_count(n):
+        monkeypatch.setattr(governor.os, "cpu_count", lambda: n)
+    return set_count
+
+
+def _run_jobs(priorities, hold=0.2):
+    """Run one lease per priority concurrently; returns (workers per job, peak leased total)."""
+    got, peak = [], [0]
+
+    def job(priority):
+        with governor.lease(priority) as n:
+            got.append(n)
+            peak[0] = max(peak[0], sum(w for _, w in governor._leases.values()))
+            time.sleep(hold)
+
+    threads = [threading.Thread(target=job, args=(p,)) for p in priorities]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return got, peak[0]
+
+
+def test_small_machine_queues_instead_of_oversubscribing(cpus):
+    cpus(2)
+    got, peak = _run_jobs(["normal", "normal", "interactive"])
+    assert got == [governor.MIN_WORKERS] * 3
+    assert peak == governor.MIN_WORKERS
+    assert not governor._leases
+
+
+def test_leases_share_capacity(cpus):
+    cpus(9)
+    with governor.lease("overnight") as first:
+        assert first == 8
+        assert governor.share("interactive") == 0  # nothing free until the first solve ends
+    got, peak = _run_jobs(["normal", "overnight", "interactive"])
+    assert peak <= 8
+    assert all(n >= governor.MIN_WORKERS for n in got)
+
+
+def test_share_outside_a_lease(cpus):
+    cpus(1)
+    assert governor.share() == governor.MIN_WORKERS
+    assert governor.workers() == governor.MIN_WORKERS
@@ -0,0 +1,75 @@
+"""Capacity pre-check: a blocking issue names the week and roles that cannot be covered."""
+import pytest
+
+from benchmarks.roster import generate_roster
+from benchmarks.scenarios import SCENARIOS
+from precheck import HOLIDAY_WEEKS, capacity_precheck
+
+
+@pytest.fixture
+def roster():
+    """base-50 (14 PGY1, 14 PGY2, 14 PGY3, 8 TY in 4 cohorts), which passes the pre-check."""
+    return generate_roster(SCENARIOS["base-50"], 1)
+
+
+def _blocking(report, rule):
+    return [i for i in report["issues"] if i["rule"] == rule and i["blocking"]]
+
+
+def test_feasible_roster_passes(roster):
+    report = capacity_precheck(**roster)
+    assert report["ok"]
+    assert report["issues"] == []
+
+
+def test_too_few_seniors(roster):
+    seniors = [r["id"] for r in roster["residents"] if r["is_senior"]]
+    roster["residents"] = [r for r in roster["residents"] if r["id"] not in seniors[8:]]
+    report = capacity_precheck(**roster)
+    assert not report["ok"]
+    week2 = [i for i in _blocking(report, "week_capacity") if i["week"] == 2]
+    # Nine senior slots a week (A-D, ICU 2, NF, ICU N, SWING); cohort clinic takes some of the eight
+    assert [(i["roles"], i["demand"]) for i in week2] == [(["senior"], 9)]
+    assert week2[0]["supply"] < 8
+    assert "in cohort clinic" in week2[0]["message"]
+
+
+def test_vacation_lock_on_cohort_clinic_week(roster):
+    member = next(r for r in roster["residents"] if r["cohort_id"] == 1 and r["pgy"] == "PGY1")
+    week = next(w for w in roster["cohort_defs"][0]["clinic_weeks"] if w != 1)
+    roster["vacation_requests"] = [{"resident_id": member["id"], "hard_locks": [(week, 1)]}]
+    report = capacity_precheck(**roster)
+    assert not report["ok"]
+    issues = _blocking(report, "vacation_vs_clinic")
+    assert [(i["week"], i["roles"], i["resident_id"]) for i in issues] == [(week, ["clinic"], member["id"])]
+
+
+def test_too_few_residents_for_holiday_coverage(roster):
+    pgy3 = [r["id"] for r in roster["residents"] if r["pgy"] == "PGY3"][:7]
+    roster["residents"] = [r for r in roster["residents"] if r["id"] not in pgy3]
+    report = capacity_precheck(**roster)
+    issues = _blocking(report, "holiday_coverage")
+    # 22 holiday slots per week, each resident works at most one of the two weeks
+    assert [(i["week"], i["roles"], i["demand"], i["supply"]) for i in issues] == \
+        [(HOLIDAY_WEEKS[0], ["senior", "intern"], 44, 43)]
+
+
+def test_holiday_capacity(roster):
+    extra = roster["residents"][0]
+    roster["residents"] += [dict(extra, id=100 + i, name=f"Extra {i}", cohort_id=None) for i in range(15)]
+    report = capacity_precheck(**roster)
+    assert not report["ok"]
+    # 51 non-PGY3 residents must each work a holiday week; coverage 44 + clinic 3 per week holds 50
+    assert [(i["week"], i["demand"], i["supply"]) for i in _blocking(report, "holiday_capacity")] == \
+        [(HOLIDAY_WEEKS[0], 51, 50)]
+
+
+def test_tys_do_not_count_toward_cohort_size(roster):
+    # TYs skip cohort clinic, so a cohort of 11 IM residents and 8 TYs is schedulable
+    for r in roster["residents"]:
+        if r["is_ty"]:
+            r["cohort_id"] = 1
+    assert sum(r["cohort_id"] == 1 for r in roster["residents"]) > 12
+    report = capacity_precheck(**roster)
+    assert report["ok"]
+    assert [i for i in report["issues"] if i["rule"] == "cohort_size"] == []
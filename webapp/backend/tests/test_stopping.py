@@ -0,0 +1,110 @@
+"""Stopping rules: gap and improvement thresholds, and the Stopper that applies them to a solve."""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from scheduler import stopping
+from scheduler.stopping import StopRules, Stopper, significant, stop_rules, within_gap
+
+
+class FakeSolver:
+    """The parts of CpSolver a Stopper touches."""
+
+    def __init__(self):
+        self.parameters = SimpleNamespace(relative_gap_limit=0.0, absolute_gap_limit=0.0)
+        self.stopped = 0
+
+    def stop_search(self):
+        self.stopped += 1
+
+
+class FakeCallback:
+    def __init__(self, objective, penalty=0):
+        self.objective, self.penalty = objective, penalty
+
+    def ObjectiveValue(self):
+        return self.objective
+
+    def Value(self, expr):
+        return self.penalty
+
+
+def test_within_gap():
+    rules = StopRules(relative_gap=0.01, absolute_gap=5)
+    assert within_gap(rules, 1000, 996) == "absolute_gap"
+    assert within_gap(rules, 1000, 991) == "relative_gap"
+    assert within_gap(rules, 1000, 989) is None
+    # Proven optimal, or nothing to compare: no gap rule ended the search
+    assert within_gap(rules, 1000, 1000) is None
+    assert within_gap(rules, None, 990) is None
+    assert within_gap(StopRules(), 1000, 999) is None
+    # The relative gap is taken against at least 1, as CP-SAT does
+    assert within_gap(StopRules(relative_gap=0.5), 0.2, 0) == "relative_gap"
+
+
+def test_significant():
+    assert significant(None, 5e9)
+    assert significant(1e9, 1e9 * (1 - stopping.STAGNATION_MIN_IMPROVEMENT))
+    assert not significant(1e9, 1e9 - 1000)
+    assert not significant(1e9, 1e9 + 1)
+    # Near zero the threshold is absolute
+    assert significant(0.5, 0.499)
+
+
+def test_stop_rules_defaults_and_off():
+    assert stop_rules() == stopping.DEFAULT_STOP_RULES
+    assert stop_rules(stagnation_seconds=0, relative_gap=0.02) == StopRules(stagnation_seconds=0, relative_gap=0.02)
+    assert stop_rules(stagnation_seconds=0).to_dict() == {
+        "relative_gap": 0, "absolute_gap": 0, "stagnation_seconds": 0, "max_clean_solutions": 0}
+
+
+def test_gap_rules_set_solver_limits():
+    solver = FakeSolver()
+    Stopper(solver, StopRules(relative_gap=0.02, absolute_gap=10))
+    assert (solver.parameters.relative_gap_limit, solver.parameters.absolute_gap_limit) == (0.02, 10)
+
+
+def test_stagnation_watchdog_stops_search(monkeypatch):
+    monkeypatch.setattr(stopping, "WATCH_INTERVAL", 0.01)
+    solver = FakeSolver()
+    with Stopper(solver, StopRules(stagnation_seconds=0.2)) as stopper:
+        for objective in (1000, 900, 800):
+            stopper.on_solution(FakeCallback(objective))
+            time.sleep(0.1)
+        assert stopper.fired is None  # each improvement reset the clock
+        stopper.on_solution(FakeCallback(799.9))  # too small to count
+        deadline = time.time() + 5
+        while stopper.fired is None and time.time() < deadline:
+            time.sleep(0.01)
+    assert stopper.fired == "stagnation_seconds"
+    assert solver.stopped == 1
+    assert stopper.reason("FEASIBLE", 799.9, 500) == "stagnation_seconds"
+
+
+def test_watchdog_waits_for_first_solution(monkeypatch):
+    monkeypatch.setattr(stopping, "WATCH_INTERVAL", 0.01)
+    solver = FakeSolver()
+    with Stopper(solver, StopRules(stagnation_seconds=0.05)) as stopper:
+        time.sleep(0.2)
+    assert stopper.fired is None and solver.stopped == 0
+
+
+def test_max_clean_solutions():
+    solver = FakeSolver()
+    stopper = Stopper(solver, StopRules(max_clean_solutions=2), clean="penalty")
+    for objective, penalty in ((900, 3), (800, 0), (700, 1), (600, 0)):
+        stopper.on_solution(FakeCallback(objective, penalty))
+    assert stopper.clean_solutions == 2
+    assert stopper.fired == "max_clean_solutions" and solver.stopped == 1
+
+
+@pytest.mark.parametrize("status, bound, reason", [
+    ("OPTIMAL", 1000, "optimal"),
+    ("OPTIMAL", 995, "relative_gap"),
+    ("FEASIBLE", 500, "time_limit"),
+    ("INFEASIBLE", None, "infeasible"),
+])
+def test_reason_without_a_fired_rule(status, bound, reason):
+    stopper = Stopper(FakeSolver(), StopRules(relative_gap=0.01))
+    assert stopper.reason(status, 1000 if bound else None, bound) == reason
@@ -0,0 +1,96 @@
+"""Version chain invariant: grid_at(v) is the live grid right after v was recorded."""
+import random
+
+import versions
+from conftest import edit
+from models import Resident, ScheduleVersion
+
+CODES = ["A", "B", "ICU", "NF", "CLINIC", "VACATION"]
+
+
+def test_first_record_adds_baseline_before_change(db, year):
+    year_id, ids = year
+    first = edit(db, year_id, {(ids[0], 1): "A", (ids[1], 1): "B"})
+    second = edit(db, year_id, {(ids[0], 1): "ICU", (ids[1], 1): None, (ids[2], 2): "NF"})
+
+    baseline = db.query(ScheduleVersion).filter(ScheduleVersion.id == first.parent_id).one()
+    assert baseline.source == "baseline"
+    assert versions.grid_at(db, baseline) == {}
+    assert versions.grid_at(db, first) == {(ids[0], 1): "A", (ids[1], 1): "B"}
+    assert versions.grid_at(db, second) == {(ids[0], 1): "ICU", (ids[2], 2): "NF"}
+    assert second.parent_id == first.id
+    assert versions.schedule_version(db, year_id) == 2
+
+
+def test_baseline_reverses_the_first_delta(db, year):
+    year_id, ids = year
+    # Cells written before versioning existed: the first recorded change must not lose them
+    versions.apply_delta(db, year_id, [[ids[0], w, None, "CLINIC"] for w in range(1, 5)])
+    db.flush()
+    first = edit(db, year_id, {(ids[0], 2): "A", (ids[0], 3): None})
+
+    baseline = db.query(ScheduleVersion).filter(ScheduleVersion.id == first.parent_id).one()
+    assert versions.grid_at(db, baseline) == {(ids[0], w): "CLINIC" for w in range(1, 5)}
+    assert versions.grid_at(db, first) == {(ids[0], 1): "CLINIC", (ids[0], 2): "A", (ids[0], 4): "CLINIC"}
+
+
+def test_replay_matches_live_grid_across_snapshots(db, year):
+    year_id, ids = year
+    rng = random.Random(7)
+    edit(db, year_id, {(rid, w): rng.choice(CODES) for rid in ids for w in range(1, 53)}, "generate")
+    expected = {}
+    for _ in range(3 * versions.SNAPSHOT_EVERY):
+        cells = {(rng.choice(ids), rng.randint(1, 52)): rng.choice(CODES + [None]) for _ in range(rng.randint(1, 4))}
+        version = edit(db, year_id, cells)
+        if version is not None:
+            expected[version.id] = versions.load_grid(db, year_id)
+
+    for vid, grid in expected.items():
+        version = db.query(ScheduleVersion).filter(ScheduleVersion.id == vid).one()
+        assert versions.grid_at(db, version) == grid
+    # Small edits still get a snapshot every SNAPSHOT_EVERY versions, so replays stay short
+    chain = db.query(ScheduleVersion).filter(ScheduleVersion.year_id == year_id).order_by(ScheduleVersion.id).all()
+    gap = 0
+    for v in chain:
+        gap = 0 if v.snapshot_json is not None else gap + 1
+        assert gap < versions.SNAPSHOT_EVERY
+
+
+def test_large_delta_is_stored_as_snapshot(db, year):
+    year_id, ids = year
+    edit(db, year_id, {(ids[0], 1): "A"})
+    big = edit(db, year_id, {(rid, w): "CLINIC" for rid in ids for w in range(1, 53)})
+    small = edit(db, year_id, {(ids[1], 5): "NF"})
+    assert big.snapshot_json is not None
+    assert small.snapshot_json is None
+    assert versions.grid_at(db, small) == {**versions.grid_at(db, big), (ids[1], 5): "NF"}
+
+
+def test_restore_round_trip(db, year):
+    year_id, ids = year
+    target = edit(db, year_id, {(rid, w): "A" for rid in ids[:2] for w in range(1, 5)})
+    kept = versions.grid_at(db, target)
+    edit(db, year_id, {(ids[0], 1): "ICU", (ids[1], 2): None, (ids[2], 3): "NF"})
+
+    restored = versions.restore(db, target)
+    db.commit()
+    assert restored.source == "restore"
+    assert versions.load_grid(db, year_id) == kept
+    assert versions.grid_at(db, restored) == kept
+    # Only the cells that differed are written back
+    assert restored.change_count == 3
+    # Restoring the current grid changes nothing and records nothing
+    assert versions.restore(db, restored) is None
+
+
+def test_restore_skips_removed_residents(db, year):
+    year_id, ids = year
+    target = edit(db, year_id, {(ids[0], 1): "A", (ids[3], 1): "B"})
+    edit(db, year_id, {(ids[0], 1): "NF", (ids[3], 1): None})
+    db.query(Resident).filter(Resident.id == ids[3]).delete()
+    db.commit()
+
+    restored = versions.restore(db, target)
+    db.commit()
+    assert versions.load_grid(db, year_id) == {(ids[0], 1): "A"}
+    assert versions.grid_at(db, restored) == {(ids[0], 1): "A"}
@@ -0,0 +1,108 @@
+"""
+Rule check for manual edits: the hard rules a batch of cell changes can break, without solving.
+
+check_edit() compares the grid before and after the batch. Single-cell rules (track and TY
+restrictions, locks, cohort clinic, holidays, ...) come from the engine's cell domains and are
+checked for the changed cells only; weekly coverage and the clinic 8-12 band are recounted only
+for the weeks the batch touches, and category tallies only for the residents it touches.
+Violations that exist after the edit but not before are flagged new.
+"""
+from typing import Dict, List, Optional
+
+from domains import HOLIDAY_WEEKS
+from engine import CLINIC_MAX_PER_WEEK, CLINIC_MIN_PER_WEEK, ROT_CODES, compile_domains
+from rotation_catalog import get_catalog
+from scheduler.coverage import DEFAULT_RULES, compile_rules, extra_floor_codes
+from versions import Delta, Grid
+
+CLINIC_CODES = ("CLINIC", "CLINIC *")
+
+
+def _violation(rule: str, message: str, week: int, resident_id: Optional[int] = None) -> dict:
+    return {"rule": rule, "week": week, "resident_id": resident_id, "message": message}
+
+
+def _week_violations(residents: List[dict], grid: Grid, w: int, plans) -> List[dict]:
+    """Coverage and clinic-band violations of week w (counts as the engine's coverage constraints)."""
+    out = []
+    column = {r["id"]: grid.get((r["id"], w)) for r in residents}
+    for plan in plans:
+        if w not in plan.weeks and w not in plan.holiday_weeks:
+            continue
+        sr = sum(1 for r in residents if r["is_senior"] and column[r["id"]] in plan.codes)
+        jr = sum(1 for r in residents if r["is_intern"] and column[r["id"]] in plan.codes)
+        if w in plan.holiday_weeks:
+            if sr + jr != plan.holiday_total:
+                out.append(_violation("coverage", f"Week {w}: {plan.label} has {sr + jr} residents, "
+                                                  f"holiday coverage needs {plan.holiday_total}", w))
+            if sr < plan.holiday_min_seniors:
+                out.append(_violation("coverage", f"Week {w}: {plan.label} has {sr} seniors, "
+                                                  f"holiday coverage needs at least {plan.holiday_min_seniors}", w))
+        elif plan.optional:
+            if (sr or jr) and (sr, jr) != (plan.seniors, plan.interns):
+                out.append(_violation("coverage", f"Week {w}: {plan.label} is partly staffed ({sr} seniors, "
+                                                  f"{jr} interns); staff {plan.seniors}+{plan.interns} or none", w))
+        else:
+            if sr != plan.seniors:
+                out.append(_violation("coverage", f"Week {w}: {plan.label} has {sr} seniors, needs {plan.seniors}", w))
+            if jr != plan.interns:
+                out.append(_violation("coverage", f"Week {w}: {plan.label} has {jr} interns, needs {plan.interns}", w))
+    if w not in HOLIDAY_WEEKS:
+        clinic = sum(1 for r in residents if not r.get("is_ty") and column[r["id"]] in CLINIC_CODES)
+        if not CLINIC_MIN_PER_WEEK <= clinic <= CLINIC_MAX_PER_WEEK:
+            out.append(_violation("clinic", f"Week {w}: {clinic} residents in clinic, "
+                                            f"needs {CLINIC_MIN_PER_WEEK}-{CLINIC_MAX_PER_WEEK}", w))
+    return out
+
+
+def _violations(inputs: dict, grid: Grid, weeks, cells, domains, plans) -> List[dict]:
+    residents = inputs["residents"]
+    index = {r["id"]: i for i, r in enumerate(residents)}
+    out = []
+    for rid, w in sorted(cells):
+        code = grid.get((rid, w))
+        if not code:
+            continue
+        for label in domains.why(index[rid], w, code):
+            out.append(_violation("cell", f"{residents[index[rid]]['name']} week {w}: {code} ({label})", w, rid))
+    for w in sorted(weeks):
+        out.extend(_week_violations(residents, grid, w, plans))
+    return out
+
+
+def tally_delta(before: Grid, after: Grid, resident_ids, weeks=range(1, 53)) -> Dict[int, Dict[str, int]]:
+    """Per resident, the change in weeks per requirement category (zero changes left out)."""
+    catalog = get_catalog()
+    out = {}
+    for rid in sorted(resident_ids):
+        old = catalog.tally(before.get((rid, w)) for w in weeks)
+        new = catalog.tally(after.get((rid, w)) for w in weeks)
+        diff = {cat: new.get(cat, 0) - old.get(cat, 0) for cat in set(old) | set(new)}
+        diff = {cat: n for cat, n in sorted(diff.items()) if n}
+        if diff:
+            out[rid] = diff
+    return out
+
+
+def check_edit(inputs: dict, before: Grid, after: Grid, delta: Delta) -> dict:
+    """
+    One validation pass over the weeks and residents a delta touches. inputs are
+    _load_solver_inputs() kwargs for the year. Returns {"tally_delta", "violations", "resolved"}:
+    violations after the edit (each with new=True when the edit introduced it) and the number of
+    violations in the touched weeks and cells that the edit removed.
+    """
+    cells = {(rid, w) for rid, w, _, _ in delta}
+    weeks = {w for _, w in cells}
+    rules = inputs.get("coverage_rules") or DEFAULT_RULES
+    codes = ROT_CODES + extra_floor_codes(rules, ROT_CODES)
+    plans = compile_rules(rules, {c: i for i, c in enumerate(codes)})
+    domains = compile_domains(**inputs)
+    old = _violations(inputs, before, weeks, cells, domains, plans)
+    new = _violations(inputs, after, weeks, cells, domains, plans)
+    old_keys = {tuple(v.values()) for v in old}
+    new_keys = {tuple(v.values()) for v in new}
+    return {
+        "tally_delta": tally_delta(before, after, {rid for rid, _ in cells}),
+        "violations": [{**v, "new": tuple(v.values()) not in old_keys} for v in new],
+        "resolved": len(old_keys - new_keys),
+    }
@@ -0,0 +1,242 @@
+"""
+Versioned schedule store: every write to a year's schedule records a cell-level delta.
+
+Each version holds [[resident_id, week, old, new], ...] against its parent (the year's
+previous version), so storage grows with the number of changed cells, not with grid copies.
+Every SNAPSHOT_EVERY versions, and for changes touching most of the grid (generate, clear),
+the version also stores the full grid. grid_at() starts from the nearest snapshot and
+replays the deltas after it; restore() writes back only the cells that differ.
+
+Callers change schedule_assignments as before and then call record() with the delta
+(grid_delta() of the before/after grids, or built directly for single-cell edits) in the
+same transaction. record() also bumps years.schedule_version, the counter behind the grid
+and export ETags (http_cache.py); roster writes that change exports call bump() directly.
+"""
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import changefeed
+from models import Resident, ScheduleAssignment, ScheduleVersion, Year
+
+SNAPSHOT_EVERY = 25
+SNAPSHOT_FRACTION = 0.5  # a delta touching at least this share of the grid is stored as a snapshot too
+
+Grid = Dict[Tuple[int, int], str]  # (resident_id, week) -> rotation_code
+Delta = List[list]                  # [[resident_id, week, old_code | None, new_code | None], ...]
+
+
+def load_grid(db: Session, year_id: int) -> Grid:
+    rows = db.query(ScheduleAssignment.resident_id, ScheduleAssignment.week_number, ScheduleAssignment.rotation_code) \
+        .filter(ScheduleAssignment.year_id == year_id).all()
+    return {(rid, w): code for rid, w, code in rows}
+
+
+def grid_delta(before: Grid, after: Grid) -> Delta:
+    out = []
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key), after.get(key)
+        if old != new:
+            out.append([key[0], key[1], old, new])
+    return out
+
+
+def grid_to_json(grid: Grid) -> str:
+    nested = {}
+    for (rid, w), code in grid.items():
+        nested.setdefault(str(rid), {})[str(w)] = code
+    return json.dumps(nested)
+
+
+def grid_from_json(data: str) -> Grid:
+    return {(int(rid), int(w)): code for rid, weeks in json.loads(data).items() for w, code in weeks.items()}
+
+
+def nested(grid: Grid) -> Dict[int, Dict[int, str]]:
+    """{resident_id: {week: rotation_code}}, the /assignments shape."""
+    out = {}
+    for (rid, w), code in grid.items():
+        out.setdefault(rid, {})[w] = code
+    return out
+
+
+def _apply(grid: Grid, delta: Delta, reverse: bool = False) -> None:
+    for rid, w, old, new in delta:
+        value = old if reverse else new
+        if value is None:
+            grid.pop((rid, w), None)
+        else:
+            grid[(rid, w)] = value
+
+
+def bump(db: Session, year_id: int) -> None:
+    """Advance the year's schedule_version (part of the caller's transaction); wakes change-feed streams on commit."""
+    db.query(Year).filter(Year.id == year_id).update(
+        {Year.schedule_version: Year.schedule_version + 1}, synchronize_session=False)
+    changefeed.mark(db, year_id)
+
+
+def schedule_version(db: Session, year_id: int) -> int:
+    row = db.query(Year.schedule_version).filter(Year.id == year_id).first()
+    return (row[0] or 0) if row else 0
+
+
+def latest(db: Session, year_id: int) -> Optional[ScheduleVersion]:
+    return db.query(ScheduleVersion).filter(ScheduleVersion.year_id == year_id) \
+        .order_by(ScheduleVersion.id.desc()).first()
+
+
+def record(db: Session, year_id: int, delta: Delta, source: str, description: str) -> Optional[ScheduleVersion]:
+    """
+    Record a change already applied to schedule_assignments (flushed, not committed).
+    The year's first version is preceded by a baseline snapshot of the grid before the change.
+    Returns None when nothing changed.
+    """
+    if not delta:
+        return None
+    bump(db, year_id)
+    db.flush()
+    parent = latest(db, year_id)
+    after = None
+    if parent is None:
+        after = load_grid(db, year_id)
+        before = dict(after)
+        _apply(before, delta, reverse=True)
+        parent = ScheduleVersion(year_id=year_id, source="baseline", description="Schedule before versioning",
+                                 snapshot_json=grid_to_json(before))
+        db.add(parent)
+        db.flush()
+    since_snapshot = db.query(ScheduleVersion).filter(
+        ScheduleVersion.year_id == year_id,
+        ScheduleVersion.id > _last_snapshot_id(db, year_id, parent.id),
+    ).count()
+    version = ScheduleVersion(
+        year_id=year_id,
+        parent_id=parent.id,
+        source=source,
+        description=description[:200],
+        change_count=len(delta),
+        delta_json=json.dumps(delta),
+    )
+    if since_snapshot + 1 >= SNAPSHOT_EVERY or len(delta) >= SNAPSHOT_FRACTION * max(1, _grid_size(db, year_id)):
+        version.snapshot_json = grid_to_json(after if after is not None else load_grid(db, year_id))
+    db.add(version)
+    db.flush()
+    return version
+
+
+def _grid_size(db: Session, year_id: int) -> int:
+    return db.query(ScheduleAssignment).filter(ScheduleAssignment.year_id == year_id).count()
+
+
+def _last_snapshot_id(db: Session, year_id: int, upto: int) -> int:
+    row = db.query(ScheduleVersion.id).filter(
+        ScheduleVersion.year_id == year_id,
+        ScheduleVersion.id <= upto,
+        ScheduleVersion.snapshot_json.isnot(None),
+    ).order_by(ScheduleVersion.id.desc()).first()
+    return row[0] if row else 0
+
+
+def grid_at(db: Session, version: ScheduleVersion) -> Grid:
+    """The year's grid right after version: nearest snapshot, then the deltas after it."""
+    start = _last_snapshot_id(db, version.year_id, version.id)
+    rows = db.query(ScheduleVersion.id, ScheduleVersion.delta_json, ScheduleVersion.snapshot_json).filter(
+        ScheduleVersion.year_id == version.year_id,
+        ScheduleVersion.id >= start,
+        ScheduleVersion.id <= version.id,
+    ).order_by(ScheduleVersion.id).all()
+    grid: Grid = {}
+    for vid, delta_json, snapshot_json in rows:
+        if vid == start and snapshot_json is not None:
+            grid = grid_from_json(snapshot_json)
+        else:
+            _apply(grid, json.loads(delta_json))
+    return grid
+
+
+def apply_delta(db: Session, year_id: int, delta: Delta) -> None:
+    """Write a delta's new values to schedule_assignments, touching only the changed cells."""
+    existing = {}
+    if delta:
+        keys = {(rid, w) for rid, w, _, _ in delta}
+        for a in db.query(ScheduleAssignment).filter(
+            ScheduleAssignment.year_id == year_id,
+            ScheduleAssignment.resident_id.in_({rid for rid, _ in keys}),
+            ScheduleAssignment.week_number.in_({w for _, w in keys}),
+        ).all():
+            existing[(a.resident_id, a.week_number)] = a
+    for rid, w, _, new in delta:
+        row = existing.get((rid, w))
+        if new is None:
+            if row is not None:
+                db.delete(row)
+        elif row is not None:
+            row.rotation_code = new
+        else:
+            db.add(ScheduleAssignment(resident_id=rid, year_id=year_id, week_number=w, rotation_code=new))
+
+
+def restore(db: Session, version: ScheduleVersion) -> Optional[ScheduleVersion]:
+    """
+    Make version's grid current again; recorded as a new 'restore' version (not committed).
+    Cells of residents no longer in the year (removed, or re-created by an import) are skipped.
+    """
+    current = {rid for (rid,) in db.query(Resident.id).filter(Resident.year_id == version.year_id).all()}
+    target = {key: code for key, code in grid_at(db, version).items() if key[0] in current}
+    delta = grid_delta(load_grid(db, version.year_id), target)
+    apply_delta(db, version.year_id, delta)
+    return record(db, version.year_id, delta, "restore", f"Restored version {version.id} ({version.description})")
+
+
+def version_out(v: ScheduleVersion) -> dict:
+    return {
+        "id": v.id,
+        "year_id": v.year_id,
+        "parent_id": v.parent_id,
+        "source": v.source,
+        "description": v.description,
+        "change_count": v.change_count or 0,
+        "snapshot": v.snapshot_json is not None,
+        "created_at": v.created_at.isoformat() if v.created_at else None,
+    }
+
+
+def import_backups(db: Session) -> int:
+    """
+    One-time migration of the legacy schedule_backups table (full JSON grids) into snapshot
+    versions, followed by a baseline of each year's current grid. Runs only while
+    schedule_versions is empty; the legacy table is dropped once imported.
+    """
+    if db.query(ScheduleVersion).first() is not None:
+        _drop_legacy_backups(db)
+        return 0
+    try:
+        rows = db.execute(text(
+            "SELECT year_id, description, assignments_json, created_at FROM schedule_backups ORDER BY created_at, id"
+        )).fetchall()
+    except Exception:
+        return 0
+    years = []
+    for year_id, description, assignments_json, created_at in rows:
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        db.add(ScheduleVersion(year_id=year_id, source="backup", description=description,
+                               snapshot_json=grid_to_json(grid_from_json(assignments_json)), created_at=created_at))
+        if year_id not in years:
+            years.append(year_id)
+    for year_id in years:
+        db.add(ScheduleVersion(year_id=year_id, source="baseline", description="Schedule before versioning",
+                               snapshot_json=grid_to_json(load_grid(db, year_id))))
+    db.commit()
+    _drop_legacy_backups(db)
+    return len(rows)
+
+
+def _drop_legacy_backups(db: Session) -> None:
+    # Its rows live on as versions, and its plain foreign key to years would block year deletes
+    db.execute(text("DROP TABLE IF EXISTS schedule_backups"))
+    db.commit()
@@ -11,6 +11,22 @@ export async function fetchApi<T>(path: string, opts?: RequestInit): Promise<T>
   return res.json();
 }
 
+export type CompactGrid = { codes: string[]; residents: number[]; weeks: number; cells: number[] };
+
+// Compact grid (codebook + packed index array, see backend compact.py) -> {resident_id: {week: code}}
+export function unpackGrid(g: CompactGrid): Record<number, Record<number, string>> {
+  const out: Record<number, Record<number, string>> = {};
+  g.residents.forEach((rid, i) => {
+    for (let w = 1; w <= g.weeks; w++) {
+      const k = g.cells[i * g.weeks + w - 1];
+      if (!k) continue;
+      if (!out[rid]) out[rid] = {};
+      out[rid][w] = g.codes[k];
+    }
+  });
+  return out;
+}
+
 export const api = {
   years: () => fetchApi<{ id: number; name: string; start_date?: string }[]>('/api/years/'),
   getYear: (yearId: number) => fetchApi<{ id: number; name: string; start_date?: string }>(`/api/years/${yearId}`),
@@ -69,35 +85,57 @@ export const api = {
       body: JSON.stringify({ ...data, source: data.source ?? 'manual' }),
     }),
   scheduleAssignments: (yearId: number) =>
-    fetchApi<Record<number, Record<number, string>>>(`/api/schedule/assignments?year_id=${yearId}`),
+    fetchApi<CompactGrid>(`/api/schedule/assignments?year_id=${yearId}&format=compact`).then(unpackGrid),
   updateAssignment: (data: { resident_id: number; year_id: number; week_number: number; rotation_code: string }) =>
     fetchApi<{ ok: boolean }>('/api/schedule/assignment', {
       method: 'PUT',
       body: JSON.stringify(data),
     }),
+  batchUpdate: (yearId: number, changes: { resident_id: number; week_number: number; rotation_code: string }[], description?: string) =>
+    fetchApi<{
+      ok: boolean
+      version_id: number | null
+      changes: [number, number, string | null, string | null][]
+      tally_delta: Record<number, Record<string, number>>
+      violations: { rule: string; week: number; resident_id: number | null; message: string; new: boolean }[]
+      resolved: number
+    }>('/api/schedule/assignments/batch', {
+      method: 'POST',
+      body: JSON.stringify({ year_id: yearId, changes, description }),
+    }),
+  // Server-sent "changes" events: {seq, reset, changes: [[rid, week, old, new]], remaining, schedule_version}
+  changeStream: (yearId: number) => new EventSource(`${BACKEND}/api/schedule/changes/stream?year_id=${yearId}`),
   remaining: (yearId: number) =>
     fetchApi<{ resident_id: number; resident_name: string; pgy: string; category: string; required: number; completed: number; remaining: number }[]>(
       `/api/schedule/remaining?year_id=${yearId}`
     ),
-  generate: (yearId: number, timeLimit = 0) =>
+  generate: (yearId: number, timeLimit = 0, anytime = false, blockWeeks = 1, formulation: 'grid' | 'interval' = 'grid',
+             priority: 'interactive' | 'normal' | 'overnight' = 'normal',
+             partial: { freeze_before_week?: number; week_start?: number; week_end?: number; resident_ids?: number[] } = {}) =>
     fetch(`${BACKEND}/api/schedule/generate`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ year_id: yearId, time_limit_seconds: timeLimit }),
+      body: JSON.stringify({ year_id: yearId, time_limit_seconds: timeLimit, anytime, block_weeks: blockWeeks, formulation, priority, ...partial }),
     }).then(async (res) => {
       const text = await res.text();
       if (!res.ok) throw new Error(text || res.statusText);
-      return JSON.parse(text) as { success: boolean; status: string; message?: string; conflicts: string[] };
+      return JSON.parse(text) as { job_id?: string; success: boolean; status: string; message?: string; conflicts: string[] };
     }),
   clearSchedule: (yearId: number, residentId?: number, confirmText = '') =>
-    fetchApi<{ ok: boolean; cleared: number; backup_id: number }>('/api/schedule/clear', {
+    fetchApi<{ ok: boolean; cleared: number; restore_version_id: number | null }>('/api/schedule/clear', {
       method: 'POST',
       body: JSON.stringify({ year_id: yearId, resident_id: residentId ?? null, confirm_text: confirmText }),
     }),
-  scheduleBackups: (yearId: number) =>
-    fetchApi<{ id: number; year_id: number; description: string; created_at: string }[]>(
-      `/api/schedule/backups?year_id=${yearId}`
+  scheduleVersions: (yearId: number) =>
+    fetchApi<{ id: number; year_id: number; source: string; description: string; change_count: number; created_at: string }[]>(
+      `/api/schedule/versions?year_id=${yearId}`
+    ),
+  restoreVersion: (versionId: number) =>
+    fetchApi<{ ok: boolean; restored: number; version_id: number | null }>(`/api/schedule/versions/${versionId}/restore`, { method: 'POST' }),
+  drafts: (yearId: number) =>
+    fetchApi<{ id: number; job_id: string; seq: number; phase: string; objective: number | null; elapsed_seconds: number; promoted: boolean; created_at: string }[]>(
+      `/api/schedule/drafts?year_id=${yearId}`
     ),
-  restoreBackup: (backupId: number) =>
-    fetchApi<{ ok: boolean; restored: number }>(`/api/schedule/restore/${backupId}`, { method: 'POST' }),
+  promoteDraft: (draftId: number) =>
+    fetchApi<{ ok: boolean; assigned: number }>(`/api/schedule/drafts/${draftId}/promote`, { method: 'POST' }),
 };
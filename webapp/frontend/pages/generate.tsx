@@ -3,11 +3,27 @@ import { api } from '../lib/api'
 
 const API = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
+// Why the solver stopped (scheduler/stopping.py)
+const STOP_REASONS: Record<string, string> = {
+  optimal: 'proven optimal',
+  relative_gap: 'within the relative gap of the best bound',
+  absolute_gap: 'within the absolute gap of the best bound',
+  stagnation_seconds: 'no improvement for a while',
+  max_clean_solutions: 'enough schedules without any penalty',
+  time_limit: 'time limit reached',
+}
+
 export default function GeneratePage() {
   const [years, setYears] = useState<{ id: number; name: string }[]>([])
   const [yearId, setYearId] = useState<number | null>(null)
   const [loading, setLoading] = useState(false)
-  const [result, setResult] = useState<{ success: boolean; status: string; message?: string; conflicts: string[] } | null>(null)
+  const [result, setResult] = useState<{ success: boolean; status: string; message?: string; conflicts: string[]; stop_reason?: string } | null>(null)
+  const [anytime, setAnytime] = useState(true)
+  const [model, setModel] = useState<'weekly' | 'blocks' | 'interval'>('weekly')
+  const [priority, setPriority] = useState<'interactive' | 'normal' | 'overnight'>('normal')
+  const [fromWeek, setFromWeek] = useState('')  // '' = the whole year
+  const [draft, setDraft] = useState<{ id: number; count: number } | null>(null)
+  const [promoted, setPromoted] = useState<number | null>(null)
 
   useEffect(() => {
     api.years().then((y) => { setYears(y); if (y[0]) setYearId(y[0].id); }).catch(console.error)
@@ -17,9 +33,12 @@ export default function GeneratePage() {
     if (!yearId) return
     setLoading(true)
     setResult(null)
+    setDraft(null)
+    setPromoted(null)
     try {
       // 1. Start job
-      const startRes = await api.generate(yearId, 0)
+      const startRes = await api.generate(yearId, 0, anytime, model === 'blocks' ? 2 : 1, model === 'interval' ? 'interval' : 'grid', priority,
+        fromWeek && model !== 'interval' ? { freeze_before_week: Number(fromWeek) } : {})
       if (!startRes.job_id) {
         throw new Error("No job_id returned")
       }
@@ -36,6 +55,9 @@ export default function GeneratePage() {
         }
 
         const statusRes = await res.json()
+        if (statusRes.latest_draft_id) {
+          setDraft({ id: statusRes.latest_draft_id, count: statusRes.drafts })
+        }
 
         if (statusRes.status === "completed" || statusRes.status === "failed") {
           setResult(statusRes.result)
@@ -50,6 +72,16 @@ export default function GeneratePage() {
     }
   }
 
+  async function promote() {
+    if (!draft) return
+    try {
+      await api.promoteDraft(draft.id)
+      setPromoted(draft.id)
+    } catch (e: any) {
+      setResult({ success: false, status: 'ERROR', message: e.message, conflicts: [] })
+    }
+  }
+
   function exportExcel() {
     if (!yearId) return
     window.open(`${API}/api/export/excel?year_id=${yearId}`, '_blank')
@@ -66,6 +98,33 @@ export default function GeneratePage() {
           ))}
         </select>
       </div>
+      <div className="form-group">
+        <label>
+          <input type="checkbox" checked={anytime} onChange={(e) => setAnytime(e.target.checked)} disabled={loading} />{' '}
+          Save draft schedules while optimizing (first draft in seconds)
+        </label>
+      </div>
+      <div className="form-group">
+        <label>Model</label>
+        <select value={model} onChange={(e) => setModel(e.target.value as typeof model)} disabled={loading}>
+          <option value="weekly">Week by week</option>
+          <option value="blocks">2-week blocks (single weeks only around holidays, cohort clinic and PGY2 week 1)</option>
+          <option value="interval">Rotation blocks of 1-4 weeks</option>
+        </select>
+      </div>
+      <div className="form-group">
+        <label>CPU share</label>
+        <select value={priority} onChange={(e) => setPriority(e.target.value as typeof priority)} disabled={loading}>
+          <option value="interactive">Interactive (larger share, for quick repairs)</option>
+          <option value="normal">Normal</option>
+          <option value="overnight">Overnight (smaller share while other jobs run)</option>
+        </select>
+      </div>
+      <div className="form-group">
+        <label>Regenerate from week (weeks before it are kept as scheduled; empty = whole year)</label>
+        <input type="number" min={2} max={52} value={fromWeek} onChange={(e) => setFromWeek(e.target.value)}
+               disabled={loading || model === 'interval'} />
+      </div>
       <div style={{ display: 'flex', gap: 12, marginBottom: 24 }}>
         <button className="btn" onClick={generate} disabled={loading || !yearId}>
           {loading ? 'Solving... (no time limit—leave tab open)' : 'Generate Schedule'}
@@ -74,9 +133,20 @@ export default function GeneratePage() {
           Export to Excel
         </button>
       </div>
+      {draft && (
+        <div className="alert">
+          Draft {draft.count} ready{loading ? ' — still improving' : ''}.{' '}
+          {promoted === draft.id ? (
+            <strong>Published.</strong>
+          ) : (
+            <button className="btn secondary" onClick={promote}>Publish this draft</button>
+          )}
+        </div>
+      )}
       {result && (
         <div className={`alert ${result.success ? 'success' : 'error'}`}>
           <strong>{result.success ? 'Success' : 'Failed'}</strong> — {result.status}
+          {result.stop_reason && STOP_REASONS[result.stop_reason] && <> (stopped: {STOP_REASONS[result.stop_reason]})</>}
           {result.message && <p>{result.message}</p>}
           {result.conflicts?.length > 0 && (
             <ul style={{ marginTop: 8 }}>
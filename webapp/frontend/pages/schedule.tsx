@@ -69,12 +69,13 @@ export default function SchedulePage() {
   const [searchResident, setSearchResident] = useState<string>('')
   const [editingCell, setEditingCell] = useState<{ residentId: number; week: number } | null>(null)
   const [savingCell, setSavingCell] = useState(false)
+  const [fillWeeks, setFillWeeks] = useState(1)
   const [msg, setMsg] = useState<string | null>(null)
   const [clearModal, setClearModal] = useState<{ type: 'resident' | 'all'; resident?: { id: number; name: string } } | null>(null)
   const [clearConfirmText, setClearConfirmText] = useState('')
   const [clearing, setClearing] = useState(false)
-  const [backups, setBackups] = useState<{ id: number; description: string; created_at: string }[]>([])
-  const [showBackups, setShowBackups] = useState(false)
+  const [versions, setVersions] = useState<{ id: number; description: string; change_count: number; created_at: string }[]>([])
+  const [showHistory, setShowHistory] = useState(false)
   const [restoring, setRestoring] = useState(false)
   const scrollTopRef = useRef<HTMLDivElement>(null)
   const scrollBottomRef = useRef<HTMLDivElement>(null)
@@ -175,9 +176,44 @@ export default function SchedulePage() {
     return () => window.removeEventListener('storage', onStorage)
   }, [refetchSchedule])
 
+  // Live patches from other editors (and our own saves) via the change feed
   useEffect(() => {
-    if (yearId && showBackups) api.scheduleBackups(yearId).then(setBackups).catch(() => setBackups([]))
-  }, [yearId, showBackups])
+    if (!yearId) return
+    const es = api.changeStream(yearId)
+    es.addEventListener('changes', (e) => {
+      const feed = JSON.parse((e as MessageEvent).data)
+      if (feed.reset) {
+        refetchSchedule()
+        return
+      }
+      if (!feed.changes.length) {
+        api.residents(yearId).then(setResidents)
+        return
+      }
+      setAssignments((prev) => {
+        const next = { ...prev }
+        for (const [rid, w, , code] of feed.changes) {
+          const row = { ...(next[rid] || {}) }
+          if (code) row[w] = code
+          else delete row[w]
+          next[rid] = row
+        }
+        return next
+      })
+      // Replace the touched residents' rows in place, keeping the table order
+      const fresh: Record<number, any[]> = {}
+      for (const row of feed.remaining) (fresh[row.resident_id] = fresh[row.resident_id] || []).push(row)
+      setRemaining((prev) => prev.flatMap((x, i) => {
+        if (!fresh[x.resident_id]) return [x]
+        return i === prev.findIndex((y) => y.resident_id === x.resident_id) ? fresh[x.resident_id] : []
+      }))
+    })
+    return () => es.close()
+  }, [yearId, refetchSchedule])
+
+  useEffect(() => {
+    if (yearId && showHistory) api.scheduleVersions(yearId).then(setVersions).catch(() => setVersions([]))
+  }, [yearId, showHistory])
 
   let filtered = residents
   if (filterPgy) filtered = filtered.filter((r) => r.pgy === filterPgy)
@@ -246,20 +282,28 @@ export default function SchedulePage() {
     setSavingCell(true)
     setMsg(null)
     try {
-      await api.updateAssignment({
-        resident_id: residentId,
-        year_id: yearId,
-        week_number: week,
-        rotation_code: rotationCode,
+      // One batch for the whole block: one version, one validation pass, no grid reload
+      const weeks = Array.from({ length: fillWeeks }, (_, i) => week + i).filter((w) => w <= 52)
+      const res = await api.batchUpdate(
+        yearId,
+        weeks.map((w) => ({ resident_id: residentId, week_number: w, rotation_code: rotationCode })),
+      )
+      setAssignments((prev) => {
+        const next = { ...prev }
+        for (const [rid, w, , code] of res.changes) {
+          const row = { ...(next[rid] || {}) }
+          if (code) row[w] = code
+          else delete row[w]
+          next[rid] = row
+        }
+        return next
       })
-      const [assigns, rem] = await Promise.all([
-        api.scheduleAssignments(yearId),
-        api.remaining(yearId),
-      ])
-      setAssignments(assigns)
-      setRemaining(rem)
+      setRemaining(await api.remaining(yearId))
       setEditingCell(null)
-      setMsg('Saved. Resident requirements updated.')
+      const added = res.violations.filter((v) => v.new)
+      setMsg(added.length
+        ? `Saved with ${added.length} new rule violation(s): ${added.slice(0, 3).map((v) => v.message).join('; ')}`
+        : 'Saved. Resident requirements updated.')
     } catch (e: any) {
       setMsg(`Error: ${e?.message || 'Could not save'}`)
     } finally {
@@ -279,11 +323,11 @@ export default function SchedulePage() {
       )
       setClearModal(null)
       setClearConfirmText('')
-      setMsg(`Cleared ${res.cleared} rotation(s). Backup saved.`)
+      setMsg(`Cleared ${res.cleared} rotation(s). Restore the previous version in Schedule history to undo.`)
       const [assigns, rem] = await Promise.all([api.scheduleAssignments(yearId), api.remaining(yearId)])
       setAssignments(assigns)
       setRemaining(rem)
-      if (showBackups) api.scheduleBackups(yearId).then(setBackups)
+      if (showHistory) api.scheduleVersions(yearId).then(setVersions)
     } catch (e: any) {
       setMsg(`Error: ${e?.message || 'Could not clear'}`)
     } finally {
@@ -291,13 +335,14 @@ export default function SchedulePage() {
     }
   }
 
-  async function handleRestore(backupId: number) {
+  async function handleRestore(versionId: number) {
     if (!yearId) return
     setRestoring(true)
     setMsg(null)
     try {
-      const res = await api.restoreBackup(backupId)
-      setMsg(`Restored ${res.restored} rotation(s).`)
+      const res = await api.restoreVersion(versionId)
+      setMsg(`Restored: ${res.restored} cell(s) changed.`)
+      if (showHistory) api.scheduleVersions(yearId).then(setVersions)
       const [assigns, rem] = await Promise.all([api.scheduleAssignments(yearId), api.remaining(yearId)])
       setAssignments(assigns)
       setRemaining(rem)
@@ -370,6 +415,13 @@ export default function SchedulePage() {
             </select>
           </div>
 
+          <div style={{ display: 'flex', alignItems: 'center', gap: '0.4rem' }}>
+            <span style={{ fontSize: '0.75rem', fontWeight: 600, color: '#64748b' }}>Edit</span>
+            <select value={fillWeeks} onChange={(e) => setFillWeeks(Number(e.target.value))} title="Weeks an edit fills, starting at the clicked cell" style={{ padding: '2px 4px', fontSize: '0.8125rem' }}>
+              {[1, 2, 3, 4].map((n) => <option key={n} value={n}>{n === 1 ? '1 week' : `${n} weeks`}</option>)}
+            </select>
+          </div>
+
           <div style={{ flex: 1 }} />
 
           <button className="btn" onClick={() => { if (yearId) window.open(`/api/export/excel?year_id=${yearId}`, '_blank') }} disabled={!yearId} style={{ padding: '4px 8px', fontSize: '0.75rem' }}>
@@ -378,25 +430,28 @@ export default function SchedulePage() {
           <button className="btn secondary" onClick={() => refetchSchedule()} disabled={!yearId} style={{ padding: '4px 8px', fontSize: '0.75rem' }}>
             ⟳ Refresh
           </button>
+          <button className="btn secondary" onClick={() => setShowHistory((v) => !v)} disabled={!yearId} style={{ padding: '4px 8px', fontSize: '0.75rem' }}>
+            History
+          </button>
           <button className="btn danger" onClick={() => setClearModal({ type: 'all' })} disabled={!yearId || totalRotations === 0} style={{ padding: '4px 8px', fontSize: '0.75rem' }}>
             Clear
           </button>
         </div>
       </div>
       {
-        showBackups && (
+        showHistory && (
           <div style={{ marginBottom: 16, padding: 16, background: '#1e293b', borderRadius: 8, maxWidth: 560 }}>
-            <h4 style={{ marginTop: 0, marginBottom: 12 }}>Schedule backups</h4>
+            <h4 style={{ marginTop: 0, marginBottom: 12 }}>Schedule history</h4>
             <p style={{ fontSize: '0.85rem', color: '#94a3b8', marginBottom: 12 }}>
-              Backups are created automatically before clearing. Restore to undo a clear.
+              Every generate, edit, paste and clear is saved as a version. Restore a version to return the schedule to that point.
             </p>
-            {backups.length === 0 ? (
-              <p style={{ color: '#64748b', fontSize: '0.9rem' }}>No backups yet.</p>
+            {versions.length === 0 ? (
+              <p style={{ color: '#64748b', fontSize: '0.9rem' }}>No versions yet.</p>
             ) : (
               <ul style={{ listStyle: 'none', padding: 0, margin: 0 }}>
-                {backups.map((b) => (
+                {versions.map((b) => (
                   <li key={b.id} style={{ display: 'flex', alignItems: 'center', gap: 12, marginBottom: 8 }}>
-                    <span style={{ flex: 1, fontSize: '0.9rem' }}>{b.description}</span>
+                    <span style={{ flex: 1, fontSize: '0.9rem' }}>{b.description}{b.change_count ? ` (${b.change_count} cells)` : ''}</span>
                     <span style={{ fontSize: '0.8rem', color: '#64748b' }}>{b.created_at ? new Date(b.created_at).toLocaleString() : ''}</span>
                     <button
                       type="button"
@@ -424,8 +479,8 @@ export default function SchedulePage() {
               </h3>
               <p style={{ color: '#94a3b8', marginBottom: 16, fontSize: '0.95rem' }}>
                 {clearModal.type === 'all'
-                  ? `This will delete ${totalRotations} rotation(s) for all residents. A backup will be created.`
-                  : `This will delete ${countRotationsForResident(clearModal.resident?.id ?? 0)} rotation(s) for this resident. A backup will be created.`}
+                  ? `This will delete ${totalRotations} rotation(s) for all residents. It can be restored from Schedule history.`
+                  : `This will delete ${countRotationsForResident(clearModal.resident?.id ?? 0)} rotation(s) for this resident. It can be restored from Schedule history.`}
               </p>
               <p style={{ color: '#e2e8f0', marginBottom: 8, fontSize: '0.9rem' }}>
                 Type <strong>DELETE</strong> below to confirm:
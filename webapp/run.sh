@@ -4,7 +4,7 @@ cd "$(dirname "$0")"
 
 echo "Starting backend on http://localhost:8000..."
 cd backend
-python3 -m uvicorn main:app --host 127.0.0.1 --port 8000 &
+PYTHONPATH=../.. python3 -m uvicorn main:app --host 127.0.0.1 --port 8000 &
 BACKEND_PID=$!
 cd ..
 